@@ -1,12 +1,14 @@
 """
 Aplicación principal del chatbot con RAG
 """
+import os
 from flask import Flask, jsonify
 from flask_socketio import SocketIO
 from flask_cors import CORS
 from funcionalidades.core.infraestructura.database import init_database
 from funcionalidades.core.infraestructura.config import Config
 from funcionalidades.documentos.presentation.controllers.documento_controller import documento_bp
+from funcionalidades.documentos.presentation.commands.indice_commands import evaluar_indice_command
 from funcionalidades.chat.presentation.controllers.chat_controller import (
     chat_bp, on_connect, on_disconnect, on_unirse_sala, on_salir_sala,
     on_enviar_mensaje, on_solicitar_historial, on_limpiar_historial
@@ -29,6 +31,9 @@ init_database(app)
 app.register_blueprint(documento_bp)
 app.register_blueprint(chat_bp)
 
+# Registrar comandos de consola (flask evaluar-indice)
+app.cli.add_command(evaluar_indice_command)
+
 # Inicializar SocketIO después de registrar blueprints
 socketio = SocketIO(
     app, 
@@ -80,6 +85,17 @@ def health_check():
     })
 
 
+def precargar_indices():
+    """Cargar los índices de búsqueda en segundo plano para que la primera pregunta no los espere"""
+    from funcionalidades.chat.presentation.controllers.chat_controller import documento_repository
+    with app.app_context():
+        try:
+            documento_repository.precargar_indices()
+            print("Índices de búsqueda cargados")
+        except Exception as e:
+            print(f"Warning: No se pudieron precargar los índices de búsqueda: {e}")
+
+
 @app.errorhandler(404)
 def not_found(error):
     """Manejar errores 404"""
@@ -98,5 +114,14 @@ if __name__ == '__main__':
         from funcionalidades.core.infraestructura.database import db
         db.create_all()
     
+        # Los trabajos que quedaron en ejecución no se retoman tras un reinicio
+        from funcionalidades.documentos.presentation.controllers.documento_controller import trabajo_repository
+        trabajo_repository.marcar_interrumpidos()
+    
+    # Con el recargador de debug, solo en el proceso que atiende las peticiones
+    debug = True
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        socketio.start_background_task(precargar_indices)
+    
     # Ejecutar aplicación
-    socketio.run(app, debug=True, host='0.0.0.0', port=5000)
+    socketio.run(app, debug=debug, host='0.0.0.0', port=5000)
@@ -0,0 +1,123 @@
+"""
+Construcción del contexto de los prompts a partir de fragmentos de documentos
+"""
+from typing import List, Optional, Tuple
+from funcionalidades.documentos.domain.entities.fragmento_entity import FragmentoEntity
+from funcionalidades.core.infraestructura.contador_tokens import ContadorTokens, contador_tokens
+from funcionalidades.core.infraestructura.config import Config
+from funcionalidades.core.infraestructura.hash_utils import calcular_hash_texto
+
+
+class ConstructorContexto:
+    """
+    Armar el contexto de un prompt sin superar un límite de tokens
+    
+    Los fragmentos llegan ordenados por relevancia. Se descartan los repetidos
+    (mismo texto salvo mayúsculas y espacios) y se toman en ese orden mientras
+    quepan en el límite. Los elegidos se presentan en el orden del documento y
+    los fragmentos consecutivos se unen sin repetir el texto que comparten por
+    el solapamiento de la fragmentación.
+    """
+    
+    SEPARADOR = "\n\n"
+    
+    # Solapamiento mínimo, en caracteres, para considerar que dos fragmentos consecutivos comparten texto
+    SOLAPAMIENTO_MINIMO = 20
+    
+    def __init__(self, limite_tokens: int = None, contador: ContadorTokens = None):
+        self.limite_tokens = limite_tokens or Config.CHAT_CONTEXTO_TOKENS
+        self.contador = contador or contador_tokens
+    
+    def fragmentos_que_caben(self, limite_tokens: int = None) -> int:
+        """Número aproximado de fragmentos completos que caben en el límite"""
+        limite = limite_tokens or self.limite_tokens
+        tokens_fragmento = max(1, (Config.FRAGMENTO_TAMANO - Config.FRAGMENTO_SOLAPAMIENTO) // ContadorTokens.CARACTERES_POR_TOKEN)
+        return max(1, limite // tokens_fragmento)
+    
+    def construir(self, fragmentos: List[FragmentoEntity], limite_tokens: int = None) -> str:
+        """
+        Construir el contexto con los fragmentos más relevantes que caben
+        
+        Args:
+            fragmentos: Fragmentos candidatos, del más al menos relevante
+            limite_tokens: Límite del contexto (por defecto Config.CHAT_CONTEXTO_TOKENS)
+            
+        Returns:
+            str: Contexto con la página de origen de cada pasaje, o '' si no cabe ninguno
+        """
+        limite = limite_tokens or self.limite_tokens
+        separador = self.contador.contar(self.SEPARADOR)
+        
+        seleccionados = []
+        vistos = set()
+        usados = 0
+        for fragmento in fragmentos:
+            clave = calcular_hash_texto(" ".join(fragmento.contenido.lower().split()))
+            if clave in vistos:
+                continue
+            vistos.add(clave)
+            
+            # Un fragmento que no cabe no impide probar con los siguientes, que pueden ser más cortos
+            tokens = self.contador.contar(self._formatear_pasaje(fragmento)) + separador
+            if usados + tokens > limite:
+                continue
+            
+            seleccionados.append(fragmento)
+            usados += tokens
+        
+        seleccionados.sort(key=lambda fragmento: (fragmento.documento_id, fragmento.indice))
+        return self.SEPARADOR.join(self._unir_consecutivos(seleccionados))
+    
+    def construir_resumenes(self, resumenes: List[Tuple[str, str]], limite_tokens: int = None) -> str:
+        """
+        Construir el contexto con los resúmenes de varios documentos
+        
+        El límite se reparte a partes iguales y cada resumen se recorta a su
+        parte, para que un resumen largo no deje fuera a los demás.
+        
+        Args:
+            resumenes: Pares (nombre del documento, resumen)
+            limite_tokens: Límite del contexto (por defecto Config.CHAT_CONTEXTO_TOKENS)
+        """
+        if not resumenes:
+            return ''
+        
+        limite = limite_tokens or self.limite_tokens
+        por_resumen = max(1, limite // len(resumenes) - self.contador.contar(self.SEPARADOR))
+        return self.SEPARADOR.join(
+            self.contador.recortar(f"Resumen del documento {nombre}:\n{resumen}", por_resumen)
+            for nombre, resumen in resumenes
+        )
+    
+    def _unir_consecutivos(self, fragmentos: List[FragmentoEntity]) -> List[str]:
+        """Formatear los pasajes uniendo los fragmentos contiguos del mismo documento"""
+        pasajes = []
+        anterior: Optional[FragmentoEntity] = None
+        for fragmento in fragmentos:
+            contiguo = (anterior is not None and anterior.documento_id == fragmento.documento_id
+                        and anterior.indice + 1 == fragmento.indice)
+            if not contiguo:
+                pasajes.append(self._formatear_pasaje(fragmento))
+            else:
+                texto = fragmento.contenido[self._longitud_solapamiento(anterior.contenido, fragmento.contenido):].lstrip()
+                if fragmento.pagina is not None and fragmento.pagina != anterior.pagina:
+                    texto = f"[Página {fragmento.pagina}] {texto}"
+                if texto:
+                    pasajes[-1] = f"{pasajes[-1]} {texto}"
+            anterior = fragmento
+        return pasajes
+    
+    def _longitud_solapamiento(self, anterior: str, siguiente: str) -> int:
+        """Longitud del comienzo de siguiente que repite el final de anterior (0 si no lo hay)"""
+        maximo = min(len(anterior), len(siguiente), Config.FRAGMENTO_SOLAPAMIENTO * 2)
+        for longitud in range(maximo, self.SOLAPAMIENTO_MINIMO - 1, -1):
+            if anterior.endswith(siguiente[:longitud]):
+                return longitud
+        return 0
+    
+    @staticmethod
+    def _formatear_pasaje(fragmento: FragmentoEntity) -> str:
+        """Anteponer la página de origen al contenido del fragmento, si se conoce"""
+        if fragmento.pagina is not None:
+            return f"[Página {fragmento.pagina}] {fragmento.contenido}"
+        return fragmento.contenido
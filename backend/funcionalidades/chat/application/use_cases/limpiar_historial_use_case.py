@@ -2,14 +2,16 @@
 Caso de uso para limpiar historial de mensajes
 """
 from funcionalidades.chat.domain.repositories.mensaje_repository import MensajeRepository
+from funcionalidades.chat.domain.repositories.resumen_conversacion_repository import ResumenConversacionRepository
 from funcionalidades.core.exceptions.domain_exceptions import ProcessingError
 
 
 class LimpiarHistorialUseCase:
     """Caso de uso para limpiar historial de mensajes"""
     
-    def __init__(self, mensaje_repository: MensajeRepository):
+    def __init__(self, mensaje_repository: MensajeRepository, resumen_repository: ResumenConversacionRepository = None):
         self.mensaje_repository = mensaje_repository
+        self.resumen_repository = resumen_repository
     
     def ejecutar(self) -> bool:
         """
@@ -23,6 +25,11 @@ class LimpiarHistorialUseCase:
         """
         try:
             resultado = self.mensaje_repository.limpiar_historial()
+            
+            # Sin mensajes, los resúmenes de conversación ya no corresponden a nada
+            if self.resumen_repository:
+                self.resumen_repository.limpiar()
+            
             return resultado
             
         except Exception as e:
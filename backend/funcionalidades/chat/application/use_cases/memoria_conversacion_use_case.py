@@ -0,0 +1,125 @@
+"""
+Caso de uso para la memoria de la conversación
+"""
+from typing import List, Optional, Tuple
+from funcionalidades.chat.domain.entities.mensaje_entity import MensajeEntity
+from funcionalidades.chat.domain.entities.resumen_conversacion_entity import ResumenConversacionEntity
+from funcionalidades.chat.domain.repositories.mensaje_repository import MensajeRepository
+from funcionalidades.chat.domain.repositories.resumen_conversacion_repository import ResumenConversacionRepository
+from funcionalidades.core.infraestructura.openai_service import OpenAIService
+from funcionalidades.core.infraestructura.contador_tokens import ContadorTokens, contador_tokens
+from funcionalidades.core.infraestructura.config import Config
+
+
+class MemoriaConversacionUseCase:
+    """
+    Historial de la conversación de cada sesión para las preguntas de seguimiento
+    
+    Cada sesión del cliente tiene su propia conversación por documento (y una
+    general): las preguntas de otros clientes no forman parte del historial.
+    
+    Los mensajes recientes se envían tal cual, hasta Config.CHAT_HISTORIAL_TOKENS.
+    Los anteriores se condensan en un resumen guardado que se actualiza de forma
+    incremental: cuando se acumulan Config.CHAT_RESUMEN_CADA mensajes fuera de los
+    Config.CHAT_HISTORIAL_MENSAJES más recientes, se incorporan al resumen con una
+    sola llamada a OpenAI, en lugar de reenviar la transcripción completa en cada
+    pregunta.
+    """
+    
+    def __init__(self, mensaje_repository: MensajeRepository, resumen_repository: ResumenConversacionRepository,
+                 openai_service: OpenAIService, contador: ContadorTokens = None):
+        self.mensaje_repository = mensaje_repository
+        self.resumen_repository = resumen_repository
+        self.openai_service = openai_service
+        self.contador = contador or contador_tokens
+    
+    def obtener(self, documento_id: Optional[int], sesion: Optional[str],
+                antes_de_id: Optional[int] = None) -> Tuple[Optional[str], List[dict]]:
+        """
+        Obtener el resumen y los turnos recientes que caben en el presupuesto
+        
+        Args:
+            documento_id: Documento de la conversación (None: sin documento)
+            sesion: Sesión del cliente (None: sin memoria)
+            antes_de_id: ID del mensaje actual, que no forma parte del historial
+            
+        Returns:
+            Tuple[Optional[str], List[dict]]: (resumen, turnos {"role", "content"} del más antiguo al más nuevo)
+        """
+        if not sesion:
+            return None, []
+        
+        resumen = self.resumen_repository.obtener(documento_id, sesion)
+        texto_resumen = resumen.resumen if resumen else None
+        
+        # Mensajes aún no resumidos (a lo sumo los que caben antes de la próxima actualización)
+        mensajes = self._mensajes_sin_resumir(documento_id, sesion, resumen, antes_de_id)
+        
+        # Del más nuevo al más antiguo mientras quepan
+        presupuesto = Config.CHAT_HISTORIAL_TOKENS - self.contador.contar(texto_resumen)
+        turnos = []
+        for mensaje in reversed(mensajes):
+            tokens = self.contador.contar_mensaje(mensaje.contenido)
+            if tokens > presupuesto:
+                break
+            presupuesto -= tokens
+            turnos.append(self._como_turno(mensaje))
+        turnos.reverse()
+        
+        # Una respuesta sin la pregunta que la originó no aporta contexto
+        while turnos and turnos[0]['role'] == 'assistant':
+            turnos.pop(0)
+        
+        return texto_resumen, turnos
+    
+    def actualizar(self, documento_id: Optional[int], sesion: Optional[str]) -> bool:
+        """
+        Incorporar al resumen los mensajes que ya no están entre los recientes
+        
+        Solo llama a OpenAI cuando hay al menos Config.CHAT_RESUMEN_CADA mensajes
+        por incorporar.
+        
+        Returns:
+            bool: True si se actualizó el resumen
+            
+        Raises:
+            OpenAIError: Si hay error al generar el resumen
+            ProcessingError: Si hay error al leer o guardar
+        """
+        if not sesion:
+            return False
+        
+        resumen = self.resumen_repository.obtener(documento_id, sesion)
+        mensajes = self._mensajes_sin_resumir(documento_id, sesion, resumen)
+        
+        a_resumir = mensajes[:-Config.CHAT_HISTORIAL_MENSAJES] if Config.CHAT_HISTORIAL_MENSAJES > 0 else mensajes
+        if not a_resumir or len(a_resumir) < Config.CHAT_RESUMEN_CADA:
+            return False
+        
+        texto = self.openai_service.resumir_conversacion(
+            resumen.resumen if resumen else None,
+            [self._como_turno(mensaje) for mensaje in a_resumir],
+            Config.CHAT_RESUMEN_TOKENS
+        )
+        self.resumen_repository.guardar(ResumenConversacionEntity(
+            id=None,
+            documento_id=documento_id,
+            resumen=texto,
+            ultimo_mensaje_id=a_resumir[-1].id,
+            sesion=sesion
+        ))
+        return True
+    
+    def _mensajes_sin_resumir(self, documento_id: Optional[int], sesion: str, resumen: Optional[ResumenConversacionEntity],
+                              antes_de_id: Optional[int] = None) -> List[MensajeEntity]:
+        """Últimos mensajes de la sesión posteriores al resumen, en orden cronológico"""
+        mensajes = self.mensaje_repository.listar_por_sesion(
+            sesion, documento_id, Config.CHAT_HISTORIAL_MENSAJES + Config.CHAT_RESUMEN_CADA, antes_de=antes_de_id
+        )
+        if resumen is None:
+            return mensajes
+        return [mensaje for mensaje in mensajes if mensaje.id > resumen.ultimo_mensaje_id]
+    
+    @staticmethod
+    def _como_turno(mensaje: MensajeEntity) -> dict:
+        return {"role": "user" if mensaje.es_usuario else "assistant", "content": mensaje.contenido}
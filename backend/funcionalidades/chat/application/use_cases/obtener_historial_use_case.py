@@ -1,10 +1,11 @@
 """
 Caso de uso para obtener historial de mensajes
 """
-from typing import List
+from typing import List, Optional, Tuple
 from funcionalidades.chat.domain.entities.mensaje_entity import MensajeEntity
 from funcionalidades.chat.domain.repositories.mensaje_repository import MensajeRepository
-from funcionalidades.core.exceptions.domain_exceptions import ProcessingError
+from funcionalidades.core.infraestructura.config import Config
+from funcionalidades.core.exceptions.domain_exceptions import ValidationError, ProcessingError
 
 
 class ObtenerHistorialUseCase:
@@ -13,22 +14,51 @@ class ObtenerHistorialUseCase:
     def __init__(self, mensaje_repository: MensajeRepository):
         self.mensaje_repository = mensaje_repository
     
-    def ejecutar(self, limite: int = 50) -> List[MensajeEntity]:
+    def ejecutar(self, limite: int = None, documento_id: Optional[int] = None, antes_de: Optional[int] = None,
+                 despues_de: Optional[int] = None) -> Tuple[List[MensajeEntity], bool]:
         """
         Ejecutar el caso de uso para obtener historial
         
+        Sin cursor devuelve los mensajes más recientes. Con antes_de devuelve
+        los anteriores a ese mensaje y con despues_de los posteriores; en los
+        dos casos en orden cronológico.
+        
         Args:
-            limite: Número máximo de mensajes a obtener
+            limite: Número máximo de mensajes a obtener (por defecto Config.HISTORIAL_POR_PAGINA)
+            documento_id: Solo los mensajes de este documento
+            antes_de: ID del mensaje a partir del cual leer hacia atrás
+            despues_de: ID del mensaje a partir del cual leer hacia adelante
             
         Returns:
-            List[MensajeEntity]: Lista de mensajes del historial
+            Tuple[List[MensajeEntity], bool]: (mensajes, si quedan más en la dirección leída)
             
         Raises:
+            ValidationError: Si los parámetros son inválidos
             ProcessingError: Si hay error en el procesamiento
         """
+        limite = limite if limite is not None else Config.HISTORIAL_POR_PAGINA
+        if limite < 1:
+            raise ValidationError("El límite debe ser mayor a 0")
+        if antes_de is not None and despues_de is not None:
+            raise ValidationError("Usa antes_de o despues_de, no ambos")
+        limite = min(limite, Config.HISTORIAL_POR_PAGINA_MAXIMO)
+        
         try:
-            mensajes = self.mensaje_repository.listar_ultimos(limite)
-            return mensajes
+            # Pedir uno más para saber si hay otra página
+            if documento_id is not None:
+                mensajes = self.mensaje_repository.listar_por_documento(
+                    documento_id, limite + 1, antes_de=antes_de, despues_de=despues_de
+                )
+            else:
+                mensajes = self.mensaje_repository.listar_ultimos(limite + 1, antes_de=antes_de, despues_de=despues_de)
+            
+            hay_mas = len(mensajes) > limite
+            if hay_mas:
+                # El sobrante es el más lejano al cursor: el más antiguo hacia atrás, el más nuevo hacia adelante
+                mensajes = mensajes[:limite] if despues_de is not None else mensajes[1:]
+            return mensajes, hay_mas
             
+        except ValidationError:
+            raise
         except Exception as e:
             raise ProcessingError(f"Error al obtener historial: {str(e)}")
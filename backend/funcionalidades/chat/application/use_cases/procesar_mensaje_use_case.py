@@ -1,12 +1,19 @@
 """
 Caso de uso para procesar mensajes del chat
 """
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 from funcionalidades.chat.domain.entities.mensaje_entity import MensajeEntity
 from funcionalidades.chat.domain.repositories.mensaje_repository import MensajeRepository
+from funcionalidades.documentos.domain.entities.fragmento_entity import FragmentoEntity
 from funcionalidades.documentos.domain.repositories.documento_repository import DocumentoRepository
 from funcionalidades.core.infraestructura.openai_service import OpenAIService
 from funcionalidades.core.infraestructura.embeddings_service import EmbeddingsService
+from funcionalidades.chat.application.use_cases.memoria_conversacion_use_case import MemoriaConversacionUseCase
+from funcionalidades.chat.application.constructor_contexto import ConstructorContexto
+from funcionalidades.core.infraestructura.cache_respuestas import CacheRespuestas, cache_respuestas
+from funcionalidades.core.infraestructura.reordenador_service import ReordenadorService
+from funcionalidades.core.infraestructura.contador_tokens import contador_tokens
+from funcionalidades.core.infraestructura.config import Config
 from funcionalidades.core.exceptions.domain_exceptions import ValidationError, ProcessingError, NotFoundError, OpenAIError
 
 
@@ -14,18 +21,28 @@ class ProcesarMensajeUseCase:
     """Caso de uso para procesar mensajes del chat"""
     
     def __init__(self, mensaje_repository: MensajeRepository, documento_repository: DocumentoRepository, 
-                 openai_service: OpenAIService, embeddings_service: EmbeddingsService):
+                 openai_service: OpenAIService, embeddings_service: EmbeddingsService,
+                 cache: CacheRespuestas = None, memoria: MemoriaConversacionUseCase = None,
+                 constructor_contexto: ConstructorContexto = None, reordenador: ReordenadorService = None):
         self.mensaje_repository = mensaje_repository
         self.documento_repository = documento_repository
         self.openai_service = openai_service
         self.embeddings_service = embeddings_service
+        self.cache = cache if cache is not None else cache_respuestas
+        self.memoria = memoria
+        self.constructor_contexto = constructor_contexto or ConstructorContexto()
+        self.reordenador = reordenador
     
-    def ejecutar(self, contenido_mensaje: str, documento_id: int = None) -> MensajeEntity:
+    def ejecutar(self, contenido_mensaje: str, documento_id: int = None,
+                 documentos_ids: Optional[List[int]] = None, sesion: Optional[str] = None) -> MensajeEntity:
         """
         Ejecutar el caso de uso para procesar un mensaje
         
         Args:
             contenido_mensaje: Contenido del mensaje del usuario
+            documento_id: ID del documento seleccionado
+            documentos_ids: IDs de varios documentos en los que buscar
+            sesion: Sesión del cliente, dueña de la memoria de la conversación
             
         Returns:
             MensajeEntity: Respuesta del bot
@@ -39,28 +56,32 @@ class ProcesarMensajeUseCase:
             if not contenido_mensaje or not contenido_mensaje.strip():
                 raise ValidationError("El mensaje no puede estar vacío")
             
-            # Guardar mensaje del usuario
+            alcance = self._normalizar_alcance(documento_id, documentos_ids)
+            documento_id = self._documento_unico(alcance)
+            
+            # El mensaje del usuario se guarda junto con la respuesta (y se fecha al guardarlo)
             mensaje_usuario = MensajeEntity(
                 id=None,
                 contenido=contenido_mensaje.strip(),
                 es_usuario=True,
                 fecha_creacion=None,
-                documento_id=documento_id
+                documento_id=documento_id,
+                sesion=sesion
             )
-            mensaje_usuario_guardado = self.mensaje_repository.agregar(mensaje_usuario)
             
             # Procesar mensaje y generar respuesta
-            respuesta = self._generar_respuesta(contenido_mensaje.strip(), documento_id)
+            respuesta = self._generar_respuesta(contenido_mensaje.strip(), alcance, sesion)
             
-            # Guardar respuesta del bot
+            # Guardar la pregunta y la respuesta del bot en una sola transacción
             mensaje_bot = MensajeEntity(
                 id=None,
                 contenido=respuesta,
                 es_usuario=False,
                 fecha_creacion=None,
-                documento_id=documento_id
+                documento_id=documento_id,
+                sesion=sesion
             )
-            mensaje_bot_guardado = self.mensaje_repository.agregar(mensaje_bot)
+            _, mensaje_bot_guardado = self.mensaje_repository.agregar_turno(mensaje_usuario, mensaje_bot)
             
             return mensaje_bot_guardado
             
@@ -69,6 +90,130 @@ class ProcesarMensajeUseCase:
         except Exception as e:
             raise ProcessingError(f"Error al procesar mensaje: {str(e)}")
     
+    def ejecutar_stream(self, contenido_mensaje: str, documento_id: int = None,
+                        al_recibir_texto: Optional[Callable[[str], None]] = None,
+                        documentos_ids: Optional[List[int]] = None, sesion: Optional[str] = None) -> MensajeEntity:
+        """
+        Ejecutar el caso de uso generando la respuesta en streaming
+        
+        Cada fragmento de texto que llega de OpenAI se entrega a al_recibir_texto;
+        la respuesta completa se guarda como un único mensaje al terminar.
+        
+        Args:
+            contenido_mensaje: Contenido del mensaje del usuario
+            documento_id: ID del documento seleccionado
+            al_recibir_texto: Función que recibe cada fragmento de la respuesta
+            documentos_ids: IDs de varios documentos en los que buscar
+            sesion: Sesión del cliente, dueña de la memoria de la conversación
+            
+        Returns:
+            MensajeEntity: Respuesta completa del bot
+            
+        Raises:
+            ValidationError: Si el mensaje es inválido
+            ProcessingError: Si hay error en el procesamiento
+        """
+        try:
+            # Validar mensaje
+            if not contenido_mensaje or not contenido_mensaje.strip():
+                raise ValidationError("El mensaje no puede estar vacío")
+            
+            alcance = self._normalizar_alcance(documento_id, documentos_ids)
+            documento_id = self._documento_unico(alcance)
+            
+            # El mensaje del usuario se guarda junto con la respuesta (y se fecha al guardarlo)
+            mensaje_usuario = MensajeEntity(
+                id=None,
+                contenido=contenido_mensaje.strip(),
+                es_usuario=True,
+                fecha_creacion=None,
+                documento_id=documento_id,
+                sesion=sesion
+            )
+            
+            # Generar la respuesta notificando cada fragmento
+            respuesta = self._generar_respuesta_stream(
+                contenido_mensaje.strip(), alcance, al_recibir_texto, sesion
+            )
+            
+            # Guardar la pregunta y la respuesta completa del bot en una sola transacción
+            mensaje_bot = MensajeEntity(
+                id=None,
+                contenido=respuesta,
+                es_usuario=False,
+                fecha_creacion=None,
+                documento_id=documento_id,
+                sesion=sesion
+            )
+            _, mensaje_bot_guardado = self.mensaje_repository.agregar_turno(mensaje_usuario, mensaje_bot)
+            
+            return mensaje_bot_guardado
+            
+        except ValidationError:
+            raise
+        except Exception as e:
+            raise ProcessingError(f"Error al procesar mensaje: {str(e)}")
+    
+    def actualizar_memoria(self, documento_id: int = None, sesion: Optional[str] = None) -> bool:
+        """
+        Incorporar los turnos antiguos al resumen de la conversación
+        
+        Se llama después de entregar la respuesta para no retrasarla; un error
+        aquí no afecta al mensaje ya respondido.
+        
+        Returns:
+            bool: True si se actualizó el resumen
+        """
+        if not self.memoria or not Config.CHAT_MEMORIA:
+            return False
+        
+        try:
+            return self.memoria.actualizar(documento_id, sesion)
+        except Exception as e:
+            print(f"Error actualizando el resumen de la conversación: {str(e)}")
+            return False
+    
+    @staticmethod
+    def _normalizar_alcance(documento_id: Optional[int], documentos_ids: Optional[List[int]]) -> Optional[List[int]]:
+        """
+        Unir el documento seleccionado y la lista de documentos en una lista ordenada sin repetidos
+        
+        Returns:
+            Optional[List[int]]: IDs de los documentos en los que buscar, o None para todos
+            
+        Raises:
+            ValidationError: Si algún ID no es un número entero
+        """
+        ids = list(documentos_ids or [])
+        if documento_id:
+            ids.append(documento_id)
+        
+        try:
+            alcance = sorted({int(documento) for documento in ids})
+        except (TypeError, ValueError):
+            raise ValidationError("Los IDs de documento deben ser números enteros")
+        
+        if len(alcance) > Config.CHAT_MAX_DOCUMENTOS:
+            raise ValidationError(f"Se pueden consultar como máximo {Config.CHAT_MAX_DOCUMENTOS} documentos a la vez")
+        return alcance or None
+    
+    @staticmethod
+    def _documento_unico(alcance: Optional[List[int]]) -> Optional[int]:
+        """
+        Documento al que pertenece la conversación
+        
+        Las preguntas sobre varios documentos se guardan, como las preguntas
+        sobre todos, en la conversación general.
+        """
+        return alcance[0] if alcance and len(alcance) == 1 else None
+    
+    @staticmethod
+    def _clave_cache(alcance: Optional[List[int]]):
+        """Alcance de la caché: None para todos, el ID de un documento o la tupla de varios"""
+        if not alcance:
+            return None
+        return alcance[0] if len(alcance) == 1 else tuple(alcance)
+    
     def _es_pregunta_general(self, mensaje: str) -> bool:
         """Detectar si es una pregunta general sobre el documento"""
         mensaje_lower = mensaje.lower().strip()
@@ -109,86 +254,35 @@ class ProcesarMensajeUseCase:
             
         return False
     
-    def _generar_respuesta(self, mensaje: str, documento_id: int = None) -> str:
+    def _generar_respuesta(self, mensaje: str, alcance: Optional[List[int]] = None,
+                           sesion: Optional[str] = None) -> str:
         """
         Generar respuesta basada en RAG
         
         Args:
             mensaje: Mensaje del usuario
+            alcance: IDs de los documentos en los que buscar (None para todos)
+            sesion: Sesión del cliente, dueña de la memoria de la conversación
             
         Returns:
             str: Respuesta generada
         """
         try:
-            # Si se especifica un documento, usarlo; sino usar todos
-            if documento_id:
-                documento = self.documento_repository.get_by_id(documento_id)
-                if not documento:
-                    return "El documento seleccionado no existe."
-                
-                if not documento.tiene_embeddings():
-                    return "El documento seleccionado no ha sido procesado aún. Por favor, procesa el documento primero."
-                
-                documentos = [documento]
-            else:
-                # Obtener documentos disponibles
-                documentos = self.documento_repository.listar()
-                
-                if not documentos:
-                    return "No hay documentos cargados en el sistema. Por favor, carga un documento PDF primero."
-                
-                # Verificar si hay documentos con embeddings
-                documentos_con_embeddings = [doc for doc in documentos if doc.tiene_embeddings()]
-                
-                if not documentos_con_embeddings:
-                    return "Los documentos cargados no han sido procesados aún. Por favor, espera a que se procesen los embeddings."
-                
-                documentos = documentos_con_embeddings
-            
-            # Detectar si es una pregunta general sobre el documento
-            es_pregunta_general = self._es_pregunta_general(mensaje)
-            
-            if es_pregunta_general and documento_id:
-                # Para preguntas generales, usar todo el contenido del documento
-                print(f"Pregunta general detectada, usando todo el contenido del documento ID: {documento_id}")
-                documento_completo = self.documento_repository.get_by_id(documento_id)
-                if documento_completo and documento_completo.contenido:
-                    contexto = documento_completo.contenido
-                    respuesta = self.openai_service.generar_respuesta(mensaje, contexto)
-                    return respuesta
-                else:
-                    return "No poseo información sobre ese tema en el documento cargado."
-            
-            # Generar embedding del mensaje del usuario
-            query_embedding = self.embeddings_service.generar_embedding(mensaje)
+            # La memoria se lee antes que la caché: con ella la caché no se consulta
+            historial, resumen = self._obtener_memoria(self._documento_unico(alcance), sesion)
+            clave_cache = self._clave_cache(alcance)
+            respuesta_cache, query_embedding = self._buscar_en_cache(mensaje, clave_cache, historial, resumen)
+            if respuesta_cache is not None:
+                return respuesta_cache
             
-            # Buscar documentos similares
-            if documento_id:
-                # Si se especifica un documento, buscar solo en ese documento
-                print(f"Buscando solo en documento ID: {documento_id}")
-                documentos_similares = self.documento_repository.buscar_por_similitud_en_documento(query_embedding, documento_id, limite=3)
-            else:
-                # Si no se especifica documento, buscar en todos
-                print("Buscando en todos los documentos")
-                documentos_similares = self.documento_repository.buscar_por_similitud(query_embedding, limite=3)
-            
-            if not documentos_similares:
-                # Si no se encuentran fragmentos similares, usar todo el contenido del documento
-                if documento_id:
-                    print(f"No se encontraron fragmentos similares, usando todo el contenido del documento ID: {documento_id}")
-                    documento_completo = self.documento_repository.get_by_id(documento_id)
-                    if documento_completo and documento_completo.contenido:
-                        contexto = documento_completo.contenido
-                    else:
-                        return "No poseo información sobre ese tema en el documento cargado."
-                else:
-                    return "No poseo información sobre ese tema en el documento cargado."
-            else:
-                # Construir contexto con documentos similares
-                contexto = "\n\n".join([doc.contenido for doc in documentos_similares])
-            
-            # Generar respuesta usando OpenAI
-            respuesta = self.openai_service.generar_respuesta(mensaje, contexto)
+            contexto, respuesta_directa = self._preparar_contexto(mensaje, alcance, query_embedding)
+            if respuesta_directa is not None:
+                return respuesta_directa
+            
+            # Generar respuesta usando OpenAI, con la memoria de la conversación
+            contexto = self._ajustar_contexto(mensaje, contexto, historial, resumen)
+            respuesta = self.openai_service.generar_respuesta(mensaje, contexto, historial, resumen)
+            self._guardar_en_cache(clave_cache, mensaje, respuesta, query_embedding, historial, resumen)
             
             return respuesta
             
@@ -196,3 +290,256 @@ class ProcesarMensajeUseCase:
             return f"Error al comunicarse con OpenAI: {str(e)}"
         except Exception as e:
             return f"Error al procesar la consulta: {str(e)}"
+    
+    def _generar_respuesta_stream(self, mensaje: str, alcance: Optional[List[int]] = None,
+                                  al_recibir_texto: Optional[Callable[[str], None]] = None,
+                                  sesion: Optional[str] = None) -> str:
+        """
+        Generar respuesta basada en RAG notificando cada fragmento de texto recibido
+        
+        Args:
+            mensaje: Mensaje del usuario
+            alcance: IDs de los documentos en los que buscar (None para todos)
+            al_recibir_texto: Función que recibe cada fragmento de la respuesta
+            sesion: Sesión del cliente, dueña de la memoria de la conversación
+            
+        Returns:
+            str: Respuesta completa
+        """
+        try:
+            historial, resumen = self._obtener_memoria(self._documento_unico(alcance), sesion)
+            clave_cache = self._clave_cache(alcance)
+            respuesta_cache, query_embedding = self._buscar_en_cache(mensaje, clave_cache, historial, resumen)
+            if respuesta_cache is not None:
+                return respuesta_cache
+            
+            contexto, respuesta_directa = self._preparar_contexto(mensaje, alcance, query_embedding)
+            if respuesta_directa is not None:
+                return respuesta_directa
+            
+            contexto = self._ajustar_contexto(mensaje, contexto, historial, resumen)
+            partes = []
+            for texto in self.openai_service.generar_respuesta_stream(mensaje, contexto, historial, resumen):
+                partes.append(texto)
+                if al_recibir_texto:
+                    al_recibir_texto(texto)
+            
+            respuesta = "".join(partes).strip()
+            if not respuesta:
+                return "No poseo información sobre ese tema en el documento cargado."
+            
+            self._guardar_en_cache(clave_cache, mensaje, respuesta, query_embedding, historial, resumen)
+            return respuesta
+            
+        except OpenAIError as e:
+            return f"Error al comunicarse con OpenAI: {str(e)}"
+        except Exception as e:
+            return f"Error al procesar la consulta: {str(e)}"
+    
+    def _buscar_en_cache(self, mensaje: str, documento_id, historial: List[dict],
+                         resumen: Optional[str]) -> Tuple[Optional[str], Optional[List[float]]]:
+        """
+        Buscar una respuesta previa a la misma pregunta o a una casi idéntica
+        
+        Con memoria de la conversación no se busca: la pregunta puede referirse a
+        turnos anteriores ("¿y el segundo?") y la respuesta guardada sería la de
+        otra conversación.
+        
+        Returns:
+            Tuple[Optional[str], Optional[List[float]]]: (respuesta guardada, embedding
+            de la pregunta). El embedding se reutiliza en la búsqueda de pasajes
+        """
+        if historial or resumen:
+            return None, None
+        
+        respuesta = self.cache.obtener(documento_id, mensaje)
+        if respuesta is not None:
+            return respuesta, None
+        
+        query_embedding = self.embeddings_service.generar_embedding(mensaje)
+        return self.cache.obtener_similar(documento_id, query_embedding), query_embedding
+    
+    def _obtener_memoria(self, documento_id: Optional[int], sesion: Optional[str]) -> Tuple[List[dict], Optional[str]]:
+        """
+        Obtener la memoria de la conversación de la sesión
+        
+        Returns:
+            Tuple[List[dict], Optional[str]]: (historial, resumen)
+        """
+        if not self.memoria or not Config.CHAT_MEMORIA:
+            return [], None
+        
+        try:
+            resumen, historial = self.memoria.obtener(documento_id, sesion)
+            return historial, resumen
+        except Exception as e:
+            # Sin memoria se puede responder igual
+            print(f"Error obteniendo el historial de la conversación: {str(e)}")
+            return [], None
+    
+    def _ajustar_contexto(self, mensaje: str, contexto: str, historial: List[dict], resumen: Optional[str]) -> str:
+        """
+        Ajustar el contexto al presupuesto de tokens del prompt
+        
+        El resumen y los turnos recientes se reservan primero (hasta
+        Config.CHAT_HISTORIAL_TOKENS); el contexto ocupa lo que queda de
+        Config.CHAT_PRESUPUESTO_TOKENS y se recorta si no cabe.
+        """
+        disponible = Config.CHAT_PRESUPUESTO_TOKENS - self.openai_service.contar_tokens_prompt(mensaje, historial, resumen)
+        contexto_ajustado = contador_tokens.recortar(contexto, disponible)
+        if len(contexto_ajustado) < len(contexto):
+            print(f"Contexto recortado a {disponible} tokens para respetar el presupuesto del prompt")
+        
+        return contexto_ajustado
+    
+    def _guardar_en_cache(self, documento_id, mensaje: str, respuesta: str,
+                          query_embedding: Optional[List[float]], historial: List[dict], resumen: Optional[str]):
+        """
+        Guardar la respuesta en la caché solo si no depende de la conversación
+        
+        Una respuesta generada con historial puede referirse a turnos anteriores
+        ("¿y el segundo?") y no sirve para la misma pregunta en otra conversación.
+        """
+        if historial or resumen:
+            return
+        self.cache.guardar(documento_id, mensaje, respuesta, query_embedding)
+    
+    def _preparar_contexto(self, mensaje: str, alcance: Optional[List[int]] = None,
+                           query_embedding: Optional[List[float]] = None) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Recuperar el contexto RAG para un mensaje
+        
+        Los documentos seleccionados se validan solo con sus metadatos; su
+        contenido no se lee, la búsqueda se filtra dentro del índice.
+        
+        Args:
+            mensaje: Mensaje del usuario
+            alcance: IDs de los documentos en los que buscar (None para todos)
+            query_embedding: Embedding del mensaje, si ya se calculó
+            
+        Returns:
+            Tuple[Optional[str], Optional[str]]: (contexto, respuesta_directa). Si no hay
+            contexto posible se devuelve una respuesta directa que no requiere OpenAI
+        """
+        # Si se especifican documentos, usarlos; sino usar todos
+        if alcance:
+            documentos = self.documento_repository.obtener_metadatos(alcance)
+            if len(documentos) < len(alcance):
+                if len(alcance) == 1:
+                    return None, "El documento seleccionado no existe."
+                return None, "Alguno de los documentos seleccionados no existe."
+                
+            if not all(documento.procesado for documento in documentos):
+                if len(alcance) == 1:
+                    return None, "El documento seleccionado no ha sido procesado aún. Por favor, procesa el documento primero."
+                return None, "Alguno de los documentos seleccionados no ha sido procesado aún. Por favor, procesa los documentos primero."
+        else:
+            # Verificar que hay documentos, sin leer su contenido
+            if not self.documento_repository.listar_resumen(1):
+                return None, "No hay documentos cargados en el sistema. Por favor, carga un documento PDF primero."
+                
+            # Verificar si hay documentos con embeddings
+            if not self.documento_repository.listar_resumen(1, procesado=True):
+                return None, "Los documentos cargados no han sido procesados aún. Por favor, espera a que se procesen los embeddings."
+            
+        # Detectar si es una pregunta general sobre el documento
+        es_pregunta_general = self._es_pregunta_general(mensaje)
+            
+        if es_pregunta_general and alcance:
+            # Para preguntas generales bastan los resúmenes generados al procesar los documentos
+            resumenes = self.documento_repository.obtener_resumenes(alcance)
+            if len(resumenes) == len(alcance):
+                print(f"Pregunta general detectada, usando el resumen de los documentos: {alcance}")
+                nombres = {documento.id: documento.nombre for documento in documentos}
+                return self.constructor_contexto.construir_resumenes(
+                    [(nombres[documento_id], resumenes[documento_id]) for documento_id in alcance]
+                ), None
+            
+            # Sin resumen, fragmentos repartidos por todos los documentos en lugar de su contenido entero
+            print(f"Pregunta general detectada, usando fragmentos repartidos de los documentos: {alcance}")
+            return self._contexto_repartido(alcance)
+            
+        # Generar embedding del mensaje del usuario
+        if query_embedding is None:
+            query_embedding = self.embeddings_service.generar_embedding(mensaje)
+            
+        # Buscar los pasajes más similares; el constructor se queda con los que caben en el límite
+        candidatos = Config.CHAT_PASAJES_CANDIDATOS
+        if alcance and len(alcance) == 1:
+            # Si se especifica un documento, buscar solo en ese documento
+            print(f"Buscando solo en documento ID: {alcance[0]}")
+            fragmentos_similares = self.documento_repository.buscar_por_similitud_en_documento(query_embedding, alcance[0], limite=candidatos)
+        elif alcance:
+            # Con varios documentos el filtro se aplica dentro del índice
+            print(f"Buscando en los documentos: {alcance}")
+            fragmentos_similares = self.documento_repository.buscar_por_similitud_en_documentos(query_embedding, alcance, limite=candidatos)
+        else:
+            # Si no se especifica documento, buscar en todos
+            print("Buscando en todos los documentos")
+            fragmentos_similares = self.documento_repository.buscar_por_similitud(query_embedding, limite=candidatos)
+            
+        # Sumar las coincidencias exactas de términos (números, códigos, nombres) que la similitud pasa por alto
+        if Config.BUSQUEDA_HIBRIDA:
+            fragmentos_lexicos = self.documento_repository.buscar_por_texto(mensaje, limite=candidatos, documentos_ids=alcance)
+            fragmentos_similares = self._fusionar_resultados([fragmentos_similares, fragmentos_lexicos], candidatos)
+        
+        # Con el reordenador basta con los pocos pasajes realmente relevantes
+        if self.reordenador and fragmentos_similares:
+            fragmentos_similares = self._reordenar(mensaje, fragmentos_similares)
+        
+        if not fragmentos_similares:
+            # Si no se encuentran fragmentos similares, usar fragmentos de todos los documentos seleccionados
+            if alcance:
+                print(f"No se encontraron fragmentos similares, usando fragmentos repartidos de los documentos: {alcance}")
+                return self._contexto_repartido(alcance)
+            return None, "No poseo información sobre ese tema en el documento cargado."
+        
+        # Construir contexto solo con los pasajes relevantes, indicando su página para poder citarla
+        return self.constructor_contexto.construir(fragmentos_similares), None
+    
+    @staticmethod
+    def _fusionar_resultados(listas: List[List[FragmentoEntity]], limite: int) -> List[FragmentoEntity]:
+        """
+        Combinar varias listas de resultados por fusión de rangos recíprocos (RRF)
+        
+        Cada fragmento suma 1 / (k + posición) por cada lista en la que aparece,
+        así que no hace falta que las puntuaciones de cada búsqueda sean comparables.
+        """
+        puntuaciones: Dict[int, float] = {}
+        fragmentos: Dict[int, FragmentoEntity] = {}
+        for lista in listas:
+            for posicion, fragmento in enumerate(lista, start=1):
+                puntuaciones[fragmento.id] = puntuaciones.get(fragmento.id, 0.0) + 1.0 / (Config.BUSQUEDA_RRF_K + posicion)
+                fragmentos.setdefault(fragmento.id, fragmento)
+        
+        ordenados = sorted(puntuaciones, key=lambda fragmento_id: puntuaciones[fragmento_id], reverse=True)
+        return [fragmentos[fragmento_id] for fragmento_id in ordenados[:limite]]
+            
+    def _reordenar(self, mensaje: str, fragmentos: List[FragmentoEntity]) -> List[FragmentoEntity]:
+        """
+        Quedarse con los Config.CHAT_REORDENADOR_PASAJES mejores según el cross-encoder
+        
+        Si el reordenador no responde dentro de su presupuesto se devuelven los
+        candidatos en el orden de la búsqueda.
+        """
+        puntuaciones = self.reordenador.puntuar(mensaje, [fragmento.contenido for fragmento in fragmentos])
+        if puntuaciones is None:
+            return fragmentos
+        
+        ordenados = sorted(zip(puntuaciones, range(len(fragmentos))), reverse=True)
+        return [fragmentos[posicion] for _, posicion in ordenados[:Config.CHAT_REORDENADOR_PASAJES]]
+    
+    def _contexto_repartido(self, documentos_ids: List[int]) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Contexto con fragmentos a intervalos regulares de cada documento, dentro del límite de tokens
+        
+        Los fragmentos que caben se reparten a partes iguales entre los documentos.
+        """
+        cantidad = max(1, self.constructor_contexto.fragmentos_que_caben() // len(documentos_ids))
+        fragmentos = []
+        for documento_id in documentos_ids:
+            fragmentos.extend(self.documento_repository.listar_fragmentos_repartidos(documento_id, cantidad))
+        contexto = self.constructor_contexto.construir(fragmentos)
+        if not contexto:
+            return None, "No poseo información sobre ese tema en el documento cargado."
+        return contexto, None
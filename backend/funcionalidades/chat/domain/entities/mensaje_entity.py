@@ -16,6 +16,7 @@ class MensajeEntity:
     es_usuario: bool
     fecha_creacion: datetime
     documento_id: Optional[int] = None
+    sesion: Optional[str] = None  # Sesión del cliente; la memoria de la conversación es de cada sesión
     
     def __post_init__(self):
         """Validaciones post-inicialización"""
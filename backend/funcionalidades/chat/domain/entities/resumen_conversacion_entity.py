@@ -0,0 +1,24 @@
+"""
+Entidad ResumenConversacion del dominio
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+
+@dataclass
+class ResumenConversacionEntity:
+    """Resumen acumulado de los turnos antiguos de la conversación de una sesión sobre un documento"""
+    
+    id: Optional[int]
+    documento_id: Optional[int]  # None: conversación sin documento seleccionado
+    resumen: str
+    ultimo_mensaje_id: int  # Último mensaje incorporado al resumen
+    fecha_actualizacion: Optional[datetime] = None
+    sesion: Optional[str] = None  # Sesión del cliente a la que pertenece la conversación
+    
+    @staticmethod
+    def clave_conversacion(documento_id: Optional[int], sesion: Optional[str] = None) -> str:
+        """Clave única de la conversación de una sesión sobre un documento"""
+        clave = f"documento:{documento_id}" if documento_id is not None else "general"
+        return f"{sesion}:{clave}" if sesion else clave
@@ -2,7 +2,7 @@
 Interfaz del repositorio de mensajes
 """
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Optional, Tuple
 from funcionalidades.chat.domain.entities.mensaje_entity import MensajeEntity
 
 
@@ -15,13 +15,26 @@ class MensajeRepository(ABC):
         pass
     
     @abstractmethod
-    def listar_ultimos(self, limite: int = 50) -> List[MensajeEntity]:
-        """Listar los últimos mensajes"""
+    def agregar_turno(self, mensaje_usuario: MensajeEntity, mensaje_bot: MensajeEntity) -> Tuple[MensajeEntity, MensajeEntity]:
+        """Agregar la pregunta y la respuesta de un turno en una sola transacción"""
         pass
     
     @abstractmethod
-    def listar_por_documento(self, documento_id: int, limite: int = 50) -> List[MensajeEntity]:
-        """Listar mensajes de un documento específico"""
+    def listar_ultimos(self, limite: int = 50, antes_de: Optional[int] = None,
+                       despues_de: Optional[int] = None) -> List[MensajeEntity]:
+        """Listar los últimos mensajes (o los anteriores/posteriores a un mensaje) en orden cronológico"""
+        pass
+    
+    @abstractmethod
+    def listar_por_documento(self, documento_id: int, limite: int = 50, antes_de: Optional[int] = None,
+                             despues_de: Optional[int] = None) -> List[MensajeEntity]:
+        """Listar los últimos mensajes de un documento (o los anteriores/posteriores a un mensaje) en orden cronológico"""
+        pass
+    
+    @abstractmethod
+    def listar_por_sesion(self, sesion: str, documento_id: Optional[int], limite: int = 50,
+                          antes_de: Optional[int] = None) -> List[MensajeEntity]:
+        """Listar los últimos mensajes de una sesión sobre un documento (o sin documento) en orden cronológico"""
         pass
     
     @abstractmethod
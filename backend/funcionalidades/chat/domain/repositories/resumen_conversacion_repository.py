@@ -0,0 +1,25 @@
+"""
+Interfaz del repositorio de resúmenes de conversación
+"""
+from abc import ABC, abstractmethod
+from typing import Optional
+from funcionalidades.chat.domain.entities.resumen_conversacion_entity import ResumenConversacionEntity
+
+
+class ResumenConversacionRepository(ABC):
+    """Interfaz abstracta para el repositorio de resúmenes de conversación"""
+    
+    @abstractmethod
+    def obtener(self, documento_id: Optional[int], sesion: Optional[str] = None) -> Optional[ResumenConversacionEntity]:
+        """Obtener el resumen de la conversación de una sesión sobre un documento"""
+        pass
+    
+    @abstractmethod
+    def guardar(self, resumen: ResumenConversacionEntity) -> ResumenConversacionEntity:
+        """Crear o reemplazar el resumen de la conversación de una sesión sobre un documento"""
+        pass
+    
+    @abstractmethod
+    def limpiar(self) -> bool:
+        """Eliminar todos los resúmenes"""
+        pass
@@ -16,6 +16,14 @@ class MensajeModel(db.Model):
     es_usuario = db.Column(db.Boolean, nullable=False)
     fecha_creacion = db.Column(db.DateTime, default=get_local_now_naive, nullable=False)
     documento_id = db.Column(db.Integer, db.ForeignKey('documentos.id'), nullable=True)
+    sesion = db.Column(db.String(32), nullable=True)  # Sesión del cliente que envió la pregunta
+    
+    # Historial ordenado por fecha, general, por documento y por sesión (memoria de la conversación)
+    __table_args__ = (
+        db.Index('ix_mensajes_documento_id_fecha_creacion', 'documento_id', 'fecha_creacion'),
+        db.Index('ix_mensajes_fecha_creacion', 'fecha_creacion'),
+        db.Index('ix_mensajes_sesion_documento_id_fecha_creacion', 'sesion', 'documento_id', 'fecha_creacion'),
+    )
     
     def __repr__(self):
         return f'<Mensaje {self.id}: {"Usuario" if self.es_usuario else "Bot"}>'
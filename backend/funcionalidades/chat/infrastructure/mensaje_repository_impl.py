@@ -1,12 +1,13 @@
 """
 Implementación del repositorio de mensajes
 """
-from typing import List
+from typing import List, Optional, Tuple
 from funcionalidades.chat.domain.entities.mensaje_entity import MensajeEntity
 from funcionalidades.chat.domain.repositories.mensaje_repository import MensajeRepository
 from funcionalidades.chat.infrastructure.mensaje_model import MensajeModel
 from funcionalidades.core.infraestructura.database import db
-from funcionalidades.core.exceptions.domain_exceptions import ProcessingError
+from funcionalidades.core.infraestructura.datetime_utils import get_local_now_naive
+from funcionalidades.core.exceptions.domain_exceptions import ValidationError, ProcessingError
 
 
 class MensajeRepositoryImpl(MensajeRepository):
@@ -19,7 +20,8 @@ class MensajeRepositoryImpl(MensajeRepository):
             contenido=modelo.contenido,
             es_usuario=modelo.es_usuario,
             fecha_creacion=modelo.fecha_creacion,
-            documento_id=modelo.documento_id
+            documento_id=modelo.documento_id,
+            sesion=modelo.sesion
         )
     
     def _crear_modelo_desde_entidad(self, entidad: MensajeEntity) -> MensajeModel:
@@ -29,7 +31,8 @@ class MensajeRepositoryImpl(MensajeRepository):
             contenido=entidad.contenido,
             es_usuario=entidad.es_usuario,
             fecha_creacion=entidad.fecha_creacion,
-            documento_id=entidad.documento_id
+            documento_id=entidad.documento_id,
+            sesion=entidad.sesion
         )
     
     def agregar(self, mensaje: MensajeEntity) -> MensajeEntity:
@@ -37,34 +40,110 @@ class MensajeRepositoryImpl(MensajeRepository):
         try:
             modelo = self._crear_modelo_desde_entidad(mensaje)
             db.session.add(modelo)
-            db.session.commit()
+            db.session.flush()
             
-            return self._crear_entidad_desde_modelo(modelo)
+            # Leer los valores antes del commit para no recargar la fila después
+            guardado = self._crear_entidad_desde_modelo(modelo)
+            db.session.commit()
+            return guardado
             
         except Exception as e:
             db.session.rollback()
             raise ProcessingError(f"Error al agregar mensaje: {str(e)}")
     
-    def listar_ultimos(self, limite: int = 50) -> List[MensajeEntity]:
-        """Listar los últimos mensajes"""
+    def agregar_turno(self, mensaje_usuario: MensajeEntity, mensaje_bot: MensajeEntity) -> Tuple[MensajeEntity, MensajeEntity]:
+        """
+        Agregar la pregunta y la respuesta de un turno en una sola transacción
+        
+        Los dos mensajes se fechan aquí, al asignarles su ID: si la pregunta
+        conservara la hora en que llegó, con varias preguntas a la vez el orden
+        por fecha del historial y el de los IDs (el cursor del resumen de la
+        conversación) no coincidirían.
+        """
+        try:
+            modelos = [self._crear_modelo_desde_entidad(mensaje_usuario), self._crear_modelo_desde_entidad(mensaje_bot)]
+            ahora = get_local_now_naive()
+            for modelo in modelos:
+                modelo.fecha_creacion = ahora
+            db.session.add_all(modelos)
+            db.session.flush()
+            
+            guardados = [self._crear_entidad_desde_modelo(modelo) for modelo in modelos]
+            db.session.commit()
+            return guardados[0], guardados[1]
+            
+        except Exception as e:
+            db.session.rollback()
+            raise ProcessingError(f"Error al agregar mensajes: {str(e)}")
+    
+    def listar_ultimos(self, limite: int = 50, antes_de: Optional[int] = None,
+                       despues_de: Optional[int] = None) -> List[MensajeEntity]:
+        """Listar los últimos mensajes (o los anteriores/posteriores a un mensaje) en orden cronológico"""
         try:
-            modelos = MensajeModel.query.order_by(MensajeModel.fecha_creacion.desc()).limit(limite).all()
-            return [self._crear_entidad_desde_modelo(modelo) for modelo in reversed(modelos)]
+            return self._listar_pagina(MensajeModel.query, limite, antes_de, despues_de)
             
+        except ValidationError:
+            raise
         except Exception as e:
             raise ProcessingError(f"Error al listar mensajes: {str(e)}")
     
-    def listar_por_documento(self, documento_id: int, limite: int = 50) -> List[MensajeEntity]:
-        """Listar mensajes de un documento específico"""
+    def listar_por_documento(self, documento_id: int, limite: int = 50, antes_de: Optional[int] = None,
+                             despues_de: Optional[int] = None) -> List[MensajeEntity]:
+        """Listar los últimos mensajes de un documento (o los anteriores/posteriores a un mensaje) en orden cronológico"""
         try:
-            modelos = MensajeModel.query.filter(
+            consulta = MensajeModel.query.filter(MensajeModel.documento_id == documento_id)
+            return self._listar_pagina(consulta, limite, antes_de, despues_de)
+            
+        except ValidationError:
+            raise
+        except Exception as e:
+            raise ProcessingError(f"Error al listar mensajes del documento: {str(e)}")
+    
+    def listar_por_sesion(self, sesion: str, documento_id: Optional[int], limite: int = 50,
+                          antes_de: Optional[int] = None) -> List[MensajeEntity]:
+        """Listar los últimos mensajes de una sesión sobre un documento (o sin documento) en orden cronológico"""
+        try:
+            consulta = MensajeModel.query.filter(
+                MensajeModel.sesion == sesion,
                 MensajeModel.documento_id == documento_id
-            ).order_by(MensajeModel.fecha_creacion.asc()).limit(limite).all()
+            )
+            return self._listar_pagina(consulta, limite, antes_de, None)
             
+        except ValidationError:
+            raise
+        except Exception as e:
+            raise ProcessingError(f"Error al listar mensajes de la sesión: {str(e)}")
+    
+    def _listar_pagina(self, consulta, limite: int, antes_de: Optional[int], despues_de: Optional[int]) -> List[MensajeEntity]:
+        """
+        Leer una página del historial con paginación por cursor
+        
+        El orden es (fecha_creacion, id): los índices por fecha resuelven el
+        orden y el límite sin recorrer los mensajes anteriores, así que el costo
+        no depende de lo largo que sea el historial.
+        """
+        cursor = despues_de if despues_de is not None else antes_de
+        if cursor is not None:
+            fecha_cursor = db.session.query(MensajeModel.fecha_creacion).filter(MensajeModel.id == cursor).scalar()
+            if fecha_cursor is None:
+                raise ValidationError(f"El mensaje {cursor} usado como cursor no existe")
+        
+        if despues_de is not None:
+            modelos = consulta.filter(db.or_(
+                MensajeModel.fecha_creacion > fecha_cursor,
+                db.and_(MensajeModel.fecha_creacion == fecha_cursor, MensajeModel.id > despues_de)
+            )).order_by(MensajeModel.fecha_creacion.asc(), MensajeModel.id.asc()).limit(limite).all()
             return [self._crear_entidad_desde_modelo(modelo) for modelo in modelos]
             
-        except Exception as e:
-            raise ProcessingError(f"Error al listar mensajes del documento: {str(e)}")
+        if antes_de is not None:
+            consulta = consulta.filter(db.or_(
+                MensajeModel.fecha_creacion < fecha_cursor,
+                db.and_(MensajeModel.fecha_creacion == fecha_cursor, MensajeModel.id < antes_de)
+            ))
+        
+        # Los más recientes primero para aplicar el límite, devueltos en orden cronológico
+        modelos = consulta.order_by(MensajeModel.fecha_creacion.desc(), MensajeModel.id.desc()).limit(limite).all()
+        return [self._crear_entidad_desde_modelo(modelo) for modelo in reversed(modelos)]
     
     def limpiar_historial(self) -> bool:
         """Limpiar el historial de mensajes"""
@@ -0,0 +1,22 @@
+"""
+Modelo SQLAlchemy para resúmenes de conversación
+"""
+from funcionalidades.core.infraestructura.database import db
+from funcionalidades.core.infraestructura.datetime_utils import get_local_now_naive
+
+
+class ResumenConversacionModel(db.Model):
+    """Modelo de base de datos para el resumen acumulado de una conversación"""
+    
+    __tablename__ = 'resumenes_conversacion'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    conversacion = db.Column(db.String(64), nullable=False, unique=True)  # '<sesión>:documento:<id>' o '<sesión>:general'
+    documento_id = db.Column(db.Integer, nullable=True, index=True)
+    sesion = db.Column(db.String(32), nullable=True)
+    resumen = db.Column(db.Text, nullable=False)
+    ultimo_mensaje_id = db.Column(db.Integer, nullable=False)
+    fecha_actualizacion = db.Column(db.DateTime, default=get_local_now_naive, onupdate=get_local_now_naive, nullable=False)
+    
+    def __repr__(self):
+        return f'<ResumenConversacion {self.conversacion} hasta {self.ultimo_mensaje_id}>'
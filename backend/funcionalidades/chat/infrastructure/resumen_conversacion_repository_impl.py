@@ -0,0 +1,89 @@
+"""
+Implementación del repositorio de resúmenes de conversación
+"""
+from typing import Optional
+from sqlalchemy.exc import IntegrityError
+from funcionalidades.chat.domain.entities.resumen_conversacion_entity import ResumenConversacionEntity
+from funcionalidades.chat.domain.repositories.resumen_conversacion_repository import ResumenConversacionRepository
+from funcionalidades.chat.infrastructure.resumen_conversacion_model import ResumenConversacionModel
+from funcionalidades.core.infraestructura.database import db
+from funcionalidades.core.infraestructura import unidad_trabajo
+from funcionalidades.core.exceptions.domain_exceptions import ProcessingError
+
+
+class ResumenConversacionRepositoryImpl(ResumenConversacionRepository):
+    """Implementación del repositorio de resúmenes de conversación"""
+    
+    def _crear_entidad_desde_modelo(self, modelo: ResumenConversacionModel) -> ResumenConversacionEntity:
+        """Convertir modelo de base de datos a entidad del dominio"""
+        return ResumenConversacionEntity(
+            id=modelo.id,
+            documento_id=modelo.documento_id,
+            resumen=modelo.resumen,
+            ultimo_mensaje_id=modelo.ultimo_mensaje_id,
+            fecha_actualizacion=modelo.fecha_actualizacion,
+            sesion=modelo.sesion
+        )
+    
+    def obtener(self, documento_id: Optional[int], sesion: Optional[str] = None) -> Optional[ResumenConversacionEntity]:
+        """Obtener el resumen de la conversación de una sesión sobre un documento"""
+        clave = ResumenConversacionEntity.clave_conversacion(documento_id, sesion)
+        
+        def cargar() -> Optional[ResumenConversacionEntity]:
+            modelo = ResumenConversacionModel.query.filter_by(conversacion=clave).first()
+            return self._crear_entidad_desde_modelo(modelo) if modelo else None
+        
+        try:
+            # En un turno del chat se lee al preparar el prompt y otra vez al actualizar la memoria
+            return unidad_trabajo.obtener_o_cargar('resumen_conversacion', clave, cargar)
+            
+        except Exception as e:
+            raise ProcessingError(f"Error al obtener resumen de conversación: {str(e)}")
+    
+    def guardar(self, resumen: ResumenConversacionEntity) -> ResumenConversacionEntity:
+        """
+        Crear o reemplazar el resumen de la conversación de una sesión sobre un documento
+        
+        Si otro hilo ya guardó un resumen más avanzado, se conserva ese.
+        """
+        clave = ResumenConversacionEntity.clave_conversacion(resumen.documento_id, resumen.sesion)
+        try:
+            try:
+                modelo = self._guardar_modelo(clave, resumen)
+            except IntegrityError:
+                # Otro hilo creó la fila a la vez: actualizarla
+                db.session.rollback()
+                modelo = self._guardar_modelo(clave, resumen)
+            
+            guardado = self._crear_entidad_desde_modelo(modelo)
+            unidad_trabajo.registrar('resumen_conversacion', clave, guardado)
+            return guardado
+            
+        except Exception as e:
+            db.session.rollback()
+            raise ProcessingError(f"Error al guardar resumen de conversación: {str(e)}")
+    
+    def _guardar_modelo(self, clave: str, resumen: ResumenConversacionEntity) -> ResumenConversacionModel:
+        modelo = ResumenConversacionModel.query.filter_by(conversacion=clave).first()
+        if modelo is None:
+            modelo = ResumenConversacionModel(conversacion=clave, documento_id=resumen.documento_id, sesion=resumen.sesion)
+            db.session.add(modelo)
+        elif modelo.ultimo_mensaje_id >= resumen.ultimo_mensaje_id:
+            return modelo
+        
+        modelo.resumen = resumen.resumen
+        modelo.ultimo_mensaje_id = resumen.ultimo_mensaje_id
+        db.session.commit()
+        return modelo
+    
+    def limpiar(self) -> bool:
+        """Eliminar todos los resúmenes"""
+        try:
+            ResumenConversacionModel.query.delete()
+            db.session.commit()
+            unidad_trabajo.descartar('resumen_conversacion')
+            return True
+            
+        except Exception as e:
+            db.session.rollback()
+            raise ProcessingError(f"Error al limpiar resúmenes de conversación: {str(e)}")
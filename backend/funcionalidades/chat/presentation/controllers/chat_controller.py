@@ -1,15 +1,25 @@
 """
 Controlador para chat con WebSockets
 """
-from flask import Blueprint, request, jsonify
+import re
+import time
+from flask import Blueprint, request, jsonify, current_app
 from flask_socketio import emit, join_room, leave_room
 from funcionalidades.chat.application.use_cases.procesar_mensaje_use_case import ProcesarMensajeUseCase
 from funcionalidades.chat.application.use_cases.obtener_historial_use_case import ObtenerHistorialUseCase
 from funcionalidades.chat.application.use_cases.limpiar_historial_use_case import LimpiarHistorialUseCase
+from funcionalidades.chat.application.use_cases.memoria_conversacion_use_case import MemoriaConversacionUseCase
 from funcionalidades.chat.infrastructure.mensaje_repository_impl import MensajeRepositoryImpl
-from funcionalidades.documentos.infrastructure.documento_repository_impl import DocumentoRepositoryImpl
+from funcionalidades.chat.infrastructure.resumen_conversacion_repository_impl import ResumenConversacionRepositoryImpl
+from funcionalidades.documentos.infrastructure.documento_repository_factory import crear_documento_repository
+from funcionalidades.documentos.infrastructure.documento_repository_impl import indice_fragmentos
 from funcionalidades.core.infraestructura.openai_service import OpenAIService
 from funcionalidades.core.infraestructura.embeddings_service import EmbeddingsService
+from funcionalidades.core.infraestructura.reordenador_service import ReordenadorService
+from funcionalidades.core.infraestructura.config import Config
+from funcionalidades.core.infraestructura.cola_tareas import ColaTareas
+from funcionalidades.core.infraestructura.cache_respuestas import cache_respuestas
+from funcionalidades.core.infraestructura.unidad_trabajo import UnidadTrabajo, consultas_por_turno
 from funcionalidades.core.exceptions.domain_exceptions import ValidationError, ProcessingError, OpenAIError
 
 # Crear Blueprint
@@ -17,54 +27,102 @@ chat_bp = Blueprint('chat', __name__, url_prefix='/api/chat')
 
 # Inicializar repositorios y casos de uso
 mensaje_repository = MensajeRepositoryImpl()
-documento_repository = DocumentoRepositoryImpl()
-openai_service = OpenAIService()
+resumen_repository = ResumenConversacionRepositoryImpl()
 embeddings_service = EmbeddingsService()
-procesar_mensaje_use_case = ProcesarMensajeUseCase(mensaje_repository, documento_repository, openai_service, embeddings_service)
+documento_repository = crear_documento_repository(embeddings_service)
+openai_service = OpenAIService()
+memoria_conversacion_use_case = MemoriaConversacionUseCase(mensaje_repository, resumen_repository, openai_service)
+reordenador_service = ReordenadorService() if Config.CHAT_REORDENAR else None
+if reordenador_service and not Config.EMBEDDINGS_CARGA_DIFERIDA:
+    reordenador_service.precargar()
+procesar_mensaje_use_case = ProcesarMensajeUseCase(
+    mensaje_repository, documento_repository, openai_service, embeddings_service,
+    memoria=memoria_conversacion_use_case, reordenador=reordenador_service
+)
 obtener_historial_use_case = ObtenerHistorialUseCase(mensaje_repository)
-limpiar_historial_use_case = LimpiarHistorialUseCase(mensaje_repository)
+limpiar_historial_use_case = LimpiarHistorialUseCase(mensaje_repository, resumen_repository)
+
+# Identificador de sesión que envía el cliente (una por pestaña)
+PATRON_SESION = re.compile(r'[A-Za-z0-9_-]{1,32}')
+
+# Grupo de hilos que procesa los mensajes fuera de los handlers de Socket.IO
+cola_chat = ColaTareas(
+    max_trabajadores=Config.CHAT_TRABAJADORES,
+    max_pendientes=Config.CHAT_COLA_MAXIMA,
+    max_por_cliente=Config.CHAT_MAX_POR_CLIENTE,
+    nombre='chat'
+)
 
 
 @chat_bp.route('/historial', methods=['GET'])
 def obtener_historial():
-    """Obtener historial de mensajes"""
+    """
+    Obtener historial de mensajes
+    
+    Parámetros: limite y un cursor opcional, antes_de (mensajes anteriores)
+    o despues_de (mensajes posteriores), con el ID de un mensaje.
+    """
+    return _responder_historial()
+
+
+@chat_bp.route('/historial/<int:documento_id>', methods=['GET'])
+def obtener_historial_documento(documento_id):
+    """Obtener historial de mensajes de un documento específico (mismos parámetros que /historial)"""
+    return _responder_historial(documento_id)
+
+
+def _responder_historial(documento_id=None):
+    """Leer una página del historial con los parámetros de la URL"""
     try:
-        limite = request.args.get('limite', 50, type=int)
-        mensajes = obtener_historial_use_case.ejecutar(limite)
+        mensajes, hay_mas = obtener_historial_use_case.ejecutar(
+            limite=request.args.get('limite', type=int),
+            documento_id=documento_id,
+            antes_de=request.args.get('antes_de', type=int),
+            despues_de=request.args.get('despues_de', type=int)
+        )
         
-        return jsonify([{
-            'id': msg.id,
-            'contenido': msg.contenido,
-            'es_usuario': msg.es_usuario,
-            'fecha_creacion': msg.fecha_creacion.isoformat(),
-            'documento_id': msg.documento_id
-        } for msg in mensajes]), 200
+        return jsonify(_serializar_historial(mensajes, hay_mas)), 200
         
+    except ValidationError as e:
+        return jsonify({'error': str(e)}), 400
     except ProcessingError as e:
         return jsonify({'error': str(e)}), 500
     except Exception as e:
         return jsonify({'error': f'Error interno: {str(e)}'}), 500
 
 
-@chat_bp.route('/historial/<int:documento_id>', methods=['GET'])
-def obtener_historial_documento(documento_id):
-    """Obtener historial de mensajes de un documento específico"""
-    try:
-        limite = request.args.get('limite', 50, type=int)
-        mensajes = mensaje_repository.listar_por_documento(documento_id, limite)
+def _serializar_historial(mensajes, hay_mas):
+    """
+    Convertir una página del historial al formato de respuesta
         
-        return jsonify([{
+    antes_de y despues_de son los cursores para pedir la página anterior y la
+    siguiente; hay_mas indica si quedan mensajes en la dirección pedida.
+    """
+    return {
+        'mensajes': [{
             'id': msg.id,
             'contenido': msg.contenido,
             'es_usuario': msg.es_usuario,
             'fecha_creacion': msg.fecha_creacion.isoformat(),
             'documento_id': msg.documento_id
-        } for msg in mensajes]), 200
-        
-    except ProcessingError as e:
-        return jsonify({'error': str(e)}), 500
-    except Exception as e:
-        return jsonify({'error': f'Error interno: {str(e)}'}), 500
+        } for msg in mensajes],
+        'antes_de': mensajes[0].id if mensajes else None,
+        'despues_de': mensajes[-1].id if mensajes else None,
+        'hay_mas': hay_mas
+    }
+
+
+@chat_bp.route('/metricas', methods=['GET'])
+def obtener_metricas():
+    """Obtener el estado de la cola de procesamiento de mensajes y de las cachés"""
+    metricas = cola_chat.metricas()
+    metricas['cache_respuestas'] = cache_respuestas.metricas()
+    metricas['cache_embeddings'] = embeddings_service.cache.metricas()
+    if reordenador_service:
+        metricas['reordenador'] = reordenador_service.metricas()
+    metricas['consultas_db'] = consultas_por_turno.metricas()
+    metricas['indice_vectorial'] = indice_fragmentos.metricas()
+    return jsonify(metricas), 200
 
 
 @chat_bp.route('/limpiar', methods=['POST'])
@@ -106,49 +164,143 @@ def on_salir_sala(sala):
 
 
 def on_enviar_mensaje(data):
-    """Manejar envío de mensaje"""
-    try:
-        contenido = data.get('mensaje', '').strip()
-        documento_id = data.get('documento_id')
+    """
+    Manejar envío de mensaje
+    
+    El mensaje se encola y el handler responde de inmediato con
+    'mensaje_en_cola'; la respuesta se emite a la sala del cliente cuando el
+    grupo de hilos la termina de procesar. Con documentos_ids la pregunta se
+    responde con varios documentos a la vez. La memoria de la conversación es
+    la de la sesión que envía el cliente, o la de la conexión si no envía una.
+    """
+    contenido = data.get('mensaje', '').strip()
+    documento_id = data.get('documento_id')
+    documentos_ids = data.get('documentos_ids')
+    stream = data.get('stream', Config.CHAT_STREAMING)
         
-        if not contenido:
-            emit('error', {'mensaje': 'El mensaje no puede estar vacío'})
-            return
+    if not contenido:
+        emit('error', {'mensaje': 'El mensaje no puede estar vacío'})
+        return
         
-        # Procesar mensaje
-        respuesta = procesar_mensaje_use_case.ejecutar(contenido, documento_id)
+    if documentos_ids is not None and not isinstance(documentos_ids, list):
+        emit('error', {'mensaje': 'documentos_ids debe ser una lista de IDs de documento'})
+        return
+    
+    sid = request.sid
+    sesion = data.get('sesion')
+    if not isinstance(sesion, str) or not PATRON_SESION.fullmatch(sesion):
+        sesion = sid
+    app = current_app._get_current_object()
+    
+    if not cola_chat.enviar(sid, _procesar_mensaje, app, sid, sesion, contenido, documento_id, documentos_ids, stream):
+        if cola_chat.pendientes_cliente(sid) >= Config.CHAT_MAX_POR_CLIENTE:
+            emit('error', {'mensaje': 'Espera a que termine la respuesta anterior antes de enviar otro mensaje'})
+        else:
+            emit('error', {'mensaje': 'El servidor está ocupado, intenta de nuevo en unos segundos'})
+        return
+    
+    emit('mensaje_en_cola', {
+        'documento_id': documento_id,
+        'documentos_ids': documentos_ids,
+        'en_cola': cola_chat.metricas()['en_cola']
+    })
+
+
+def _procesar_mensaje(app, sid, sesion, contenido, documento_id, documentos_ids, stream):
+    """
+    Procesar un mensaje en el grupo de hilos y emitir el resultado a la sala del cliente
+    
+    Todo el turno corre en una unidad de trabajo: las entidades leídas se
+    reutilizan entre los pasos y se cuentan las consultas a la base de datos.
+    """
+    with app.app_context(), UnidadTrabajo() as unidad:
+        socketio = app.extensions['socketio']
         
-        # Emitir respuesta
-        emit('mensaje_recibido', {
-            'id': respuesta.id,
-            'contenido': respuesta.contenido,
-            'es_usuario': respuesta.es_usuario,
-            'fecha_creacion': respuesta.fecha_creacion.isoformat(),
-            'documento_id': respuesta.documento_id
-        })
+        def emitir(evento, datos):
+            socketio.emit(evento, datos, to=sid)
         
-    except ValidationError as e:
-        emit('error', {'mensaje': str(e)})
-    except ProcessingError as e:
-        emit('error', {'mensaje': str(e)})
-    except Exception as e:
-        emit('error', {'mensaje': f'Error interno: {str(e)}'})
+        try:
+            if stream:
+                emisor = _EmisorParcial(documento_id, emitir)
+                respuesta = procesar_mensaje_use_case.ejecutar_stream(
+                    contenido, documento_id, emisor.agregar, documentos_ids, sesion
+                )
+                emisor.vaciar()
+            else:
+                respuesta = procesar_mensaje_use_case.ejecutar(contenido, documento_id, documentos_ids, sesion)
+        
+            # Emitir respuesta completa (en streaming reemplaza el texto parcial)
+            emitir('mensaje_recibido', {
+                'id': respuesta.id,
+                'contenido': respuesta.contenido,
+                'es_usuario': respuesta.es_usuario,
+                'fecha_creacion': respuesta.fecha_creacion.isoformat(),
+                'documento_id': respuesta.documento_id
+            })
+        
+            # Con la respuesta ya entregada, resumir los turnos antiguos si corresponde
+            # (la conversación es la de la sesión sobre el documento de la respuesta, o la general)
+            procesar_mensaje_use_case.actualizar_memoria(respuesta.documento_id, sesion)
+            
+        except ValidationError as e:
+            emitir('error', {'mensaje': str(e)})
+        except ProcessingError as e:
+            emitir('error', {'mensaje': str(e)})
+        except Exception as e:
+            emitir('error', {'mensaje': f'Error interno: {str(e)}'})
+        finally:
+            consultas_por_turno.registrar(unidad.consultas)
+            print(f"Turno del chat: {unidad.consultas} consultas a la base de datos")
+
+
+class _EmisorParcial:
+    """Agrupar los tokens de la respuesta y emitirlos como eventos mensaje_parcial"""
+    
+    def __init__(self, documento_id, emitir):
+        self.documento_id = documento_id
+        self.emitir = emitir
+        self.pendiente = []
+        self.caracteres_pendientes = 0
+        self.ultimo_envio = time.monotonic()
+    
+    def agregar(self, texto: str):
+        """Acumular un fragmento y emitir el lote si es suficientemente grande o antiguo"""
+        self.pendiente.append(texto)
+        self.caracteres_pendientes += len(texto)
+        
+        if (self.caracteres_pendientes >= Config.CHAT_STREAMING_LOTE
+                or time.monotonic() - self.ultimo_envio >= Config.CHAT_STREAMING_INTERVALO):
+            self.vaciar()
+    
+    def vaciar(self):
+        """Emitir lo acumulado"""
+        if not self.pendiente:
+            return
+        
+        self.emitir('mensaje_parcial', {
+            'contenido': ''.join(self.pendiente),
+            'documento_id': self.documento_id
+        })
+        self.pendiente = []
+        self.caracteres_pendientes = 0
+        self.ultimo_envio = time.monotonic()
 
 
 def on_solicitar_historial(data):
-    """Manejar solicitud de historial"""
+    """Manejar solicitud de historial (limite, documento_id y cursor antes_de o despues_de)"""
     try:
-        limite = data.get('limite', 50)
-        mensajes = obtener_historial_use_case.ejecutar(limite)
+        data = data or {}
+        mensajes, hay_mas = obtener_historial_use_case.ejecutar(
+            limite=data.get('limite'),
+            documento_id=data.get('documento_id'),
+            antes_de=data.get('antes_de'),
+            despues_de=data.get('despues_de')
+        )
         
-        emit('historial_enviado', [{
-            'id': msg.id,
-            'contenido': msg.contenido,
-            'es_usuario': msg.es_usuario,
-            'fecha_creacion': msg.fecha_creacion.isoformat(),
-            'documento_id': msg.documento_id
-        } for msg in mensajes])
+        emit('historial_enviado', _serializar_historial(mensajes, hay_mas))
         
+    except ValidationError as e:
+        emit('error', {'mensaje': str(e)})
     except ProcessingError as e:
         emit('error', {'mensaje': str(e)})
     except Exception as e:
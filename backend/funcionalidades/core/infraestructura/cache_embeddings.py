@@ -0,0 +1,158 @@
+"""
+Caché de embeddings por hash del texto, en memoria y opcionalmente en disco
+"""
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from funcionalidades.core.infraestructura.config import Config
+
+
+class CacheEmbeddings:
+    """
+    Caché LRU de texto a vector con un segundo nivel persistente opcional
+    
+    La clave es el SHA-256 del nombre del modelo y el texto, así que cambiar de
+    modelo no reutiliza vectores incompatibles. El nivel en disco es una base
+    SQLite independiente de la base de datos de la aplicación; sus aciertos se
+    suben a memoria.
+    """
+    
+    def __init__(self, max_entradas: int, ruta_disco: Optional[str] = None):
+        self.max_entradas = max_entradas
+        self.ruta_disco = ruta_disco
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._conexion = None
+        self.aciertos_memoria = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+        
+        if ruta_disco:
+            self._abrir_disco(ruta_disco)
+    
+    def _abrir_disco(self, ruta: str):
+        """Abrir (o crear) la base SQLite del nivel persistente"""
+        try:
+            self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+            self._conexion.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (clave TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._conexion.commit()
+        except sqlite3.Error as e:
+            self._conexion = None
+            print(f"Warning: No se pudo abrir la caché de embeddings en disco ({ruta}): {e}")
+    
+    @staticmethod
+    def calcular_clave(modelo: str, texto: str) -> str:
+        """Hash del modelo y el texto que identifica un embedding"""
+        return hashlib.sha256(f"{modelo}\0{texto}".encode('utf-8')).hexdigest()
+    
+    def obtener(self, clave: str) -> Optional[np.ndarray]:
+        """
+        Buscar un vector en memoria y, si no está, en disco
+        
+        Si el disco no se puede leer (p. ej. la base está bloqueada) se cuenta
+        como fallo y el vector se vuelve a calcular.
+        """
+        with self._lock:
+            vector = self._entradas.get(clave)
+            if vector is not None:
+                self._entradas.move_to_end(clave)
+                self.aciertos_memoria += 1
+                return vector
+            
+            if self._conexion is not None:
+                try:
+                    fila = self._conexion.execute(
+                        "SELECT vector FROM embeddings WHERE clave = ?", (clave,)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    print(f"Warning: No se pudo leer el embedding de la caché en disco: {e}")
+                    fila = None
+                if fila is not None:
+                    vector = np.frombuffer(fila[0], dtype=np.float32)
+                    self._guardar_en_memoria(clave, vector)
+                    self.aciertos_disco += 1
+                    return vector
+            
+            self.fallos += 1
+            return None
+    
+    def guardar(self, clave: str, vector) -> np.ndarray:
+        """Guardar un vector en memoria y en disco"""
+        return self.guardar_lote([clave], [vector])[0]
+    
+    def guardar_lote(self, claves: Sequence[str], vectores: Sequence) -> List[np.ndarray]:
+        """
+        Guardar varios vectores en memoria y en disco
+        
+        En disco se escriben con un solo executemany y un solo commit, en lugar
+        de un commit (y una escritura a disco) por vector.
+        
+        Returns:
+            List[np.ndarray]: Los vectores guardados, de solo lectura y en el mismo orden
+        """
+        guardados = []
+        for vector in vectores:
+            vector = np.asarray(vector, dtype=np.float32).ravel()
+            vector.setflags(write=False)
+            guardados.append(vector)
+        
+        with self._lock:
+            for clave, vector in zip(claves, guardados):
+                self._guardar_en_memoria(clave, vector)
+            
+            if self._conexion is not None and guardados:
+                try:
+                    self._conexion.executemany(
+                        "INSERT OR REPLACE INTO embeddings (clave, vector) VALUES (?, ?)",
+                        [(clave, vector.tobytes()) for clave, vector in zip(claves, guardados)]
+                    )
+                    self._conexion.commit()
+                except sqlite3.Error as e:
+                    print(f"Warning: No se pudieron guardar los embeddings en disco: {e}")
+        
+        return guardados
+    
+    def _guardar_en_memoria(self, clave: str, vector: np.ndarray):
+        """Insertar en el nivel de memoria (llamar con el lock tomado)"""
+        if self.max_entradas <= 0:
+            return
+        
+        self._entradas[clave] = vector
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > self.max_entradas:
+            self._entradas.popitem(last=False)
+    
+    def limpiar(self):
+        """Vaciar el nivel de memoria"""
+        with self._lock:
+            self._entradas.clear()
+    
+    def metricas(self) -> Dict[str, int]:
+        """Obtener el tamaño y los contadores de aciertos y fallos"""
+        with self._lock:
+            return {
+                'entradas': len(self._entradas),
+                'aciertos_memoria': self.aciertos_memoria,
+                'aciertos_disco': self.aciertos_disco,
+                'fallos': self.fallos,
+                'disco': self._conexion is not None
+            }
+
+
+_cache: Optional[CacheEmbeddings] = None
+_cache_lock = threading.Lock()
+
+
+def obtener_cache_embeddings() -> CacheEmbeddings:
+    """Obtener la caché de embeddings compartida por todo el proceso"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = CacheEmbeddings(Config.EMBEDDINGS_CACHE_MAXIMO, Config.EMBEDDINGS_CACHE_DISCO or None)
+    return _cache
@@ -0,0 +1,179 @@
+"""
+Caché en memoria de respuestas del chat
+"""
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from funcionalidades.core.infraestructura.config import Config
+
+
+class CacheRespuestas:
+    """
+    Caché LRU con expiración de las respuestas generadas por OpenAI
+    
+    Las entradas se identifican por (documento_id, pregunta normalizada). Si no
+    hay coincidencia exacta se busca, entre las entradas del mismo documento,
+    una pregunta cuyo embedding tenga una similitud coseno mayor o igual al
+    umbral. Las respuestas sobre todos los documentos usan documento_id None y
+    las respuestas sobre varios documentos, la tupla ordenada de sus IDs.
+    """
+    
+    def __init__(self, max_entradas: int = None, ttl: float = None, umbral: float = None):
+        self.max_entradas = max_entradas if max_entradas is not None else Config.CACHE_RESPUESTAS_MAXIMO
+        self.ttl = ttl if ttl is not None else Config.CACHE_RESPUESTAS_TTL
+        self.umbral = umbral if umbral is not None else Config.CACHE_RESPUESTAS_UMBRAL
+        self._lock = threading.Lock()
+        # clave -> (respuesta, embedding normalizado o None, instante de creación)
+        self._entradas: "OrderedDict[Tuple[Optional[int], str], Tuple[str, Optional[np.ndarray], float]]" = OrderedDict()
+        self.aciertos = 0
+        self.aciertos_semanticos = 0
+        self.fallos = 0
+    
+    def __len__(self) -> int:
+        return len(self._entradas)
+    
+    @staticmethod
+    def normalizar(pregunta: str) -> str:
+        """Pasar a minúsculas, quitar tildes y signos de puntuación y compactar espacios"""
+        texto = unicodedata.normalize('NFKD', pregunta.lower())
+        texto = ''.join(c for c in texto if not unicodedata.combining(c))
+        texto = re.sub(r'[^\w\s]', ' ', texto)
+        return ' '.join(texto.split())
+    
+    def obtener(self, documento_id: Optional[int], pregunta: str) -> Optional[str]:
+        """
+        Buscar la respuesta guardada para la misma pregunta normalizada
+        
+        Args:
+            documento_id: ID del documento consultado (None para todos, tupla de IDs para varios)
+            pregunta: Pregunta del usuario
+            
+        Returns:
+            Optional[str]: Respuesta guardada o None si no hay coincidencia exacta
+        """
+        if self.max_entradas <= 0:
+            return None
+        
+        clave = (documento_id, self.normalizar(pregunta))
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None
+            
+            if time.monotonic() - entrada[2] > self.ttl:
+                del self._entradas[clave]
+                return None
+            
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[0]
+    
+    def obtener_similar(self, documento_id: Optional[int], query_embedding: List[float]) -> Optional[str]:
+        """
+        Buscar la respuesta de una pregunta casi idéntica (usar tras fallar obtener)
+        
+        Args:
+            documento_id: ID del documento consultado (None para todos, tupla de IDs para varios)
+            query_embedding: Embedding de la pregunta
+            
+        Returns:
+            Optional[str]: Respuesta guardada o None si ninguna supera el umbral
+        """
+        if self.max_entradas <= 0:
+            return None
+        
+        with self._lock:
+            similar = self._buscar_similar(documento_id, query_embedding, time.monotonic())
+            if similar is None:
+                self.fallos += 1
+                return None
+            
+            self._entradas.move_to_end(similar)
+            self.aciertos_semanticos += 1
+            return self._entradas[similar][0]
+    
+    def _buscar_similar(self, documento_id: Optional[int], query_embedding: List[float],
+                        ahora: float) -> Optional[Tuple[Optional[int], str]]:
+        """Clave de la entrada vigente más parecida del documento, si supera el umbral"""
+        claves = []
+        vectores = []
+        for clave, (_, embedding, creada) in self._entradas.items():
+            if clave[0] == documento_id and embedding is not None and ahora - creada <= self.ttl:
+                claves.append(clave)
+                vectores.append(embedding)
+        
+        if not claves:
+            return None
+        
+        consulta = self._normalizar_vector(query_embedding)
+        if consulta is None:
+            return None
+        
+        similitudes = np.vstack(vectores) @ consulta
+        mejor = int(np.argmax(similitudes))
+        if similitudes[mejor] >= self.umbral:
+            return claves[mejor]
+        return None
+    
+    def guardar(self, documento_id: Optional[int], pregunta: str, respuesta: str,
+                query_embedding: Optional[List[float]] = None):
+        """Guardar una respuesta, descartando la menos usada si se supera el máximo"""
+        if self.max_entradas <= 0:
+            return
+        
+        clave = (documento_id, self.normalizar(pregunta))
+        embedding = self._normalizar_vector(query_embedding) if query_embedding is not None else None
+        
+        with self._lock:
+            self._entradas[clave] = (respuesta, embedding, time.monotonic())
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+    
+    def invalidar_documento(self, documento_id: int):
+        """
+        Descartar las respuestas de un documento
+        
+        También se descartan las respuestas sobre todos los documentos y sobre
+        cualquier conjunto que lo incluya, porque su contexto pudo incluir el
+        documento modificado.
+        """
+        def afectada(alcance) -> bool:
+            if isinstance(alcance, tuple):
+                return documento_id in alcance
+            return alcance in (documento_id, None)
+        
+        with self._lock:
+            for clave in [clave for clave in self._entradas if afectada(clave[0])]:
+                del self._entradas[clave]
+    
+    def limpiar(self):
+        """Descartar todas las respuestas"""
+        with self._lock:
+            self._entradas.clear()
+    
+    def metricas(self) -> Dict[str, int]:
+        """Obtener el tamaño y los contadores de aciertos y fallos"""
+        with self._lock:
+            return {
+                'entradas': len(self._entradas),
+                'aciertos': self.aciertos,
+                'aciertos_semanticos': self.aciertos_semanticos,
+                'fallos': self.fallos
+            }
+    
+    @staticmethod
+    def _normalizar_vector(embedding) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norma = np.linalg.norm(vector)
+        if norma == 0:
+            return None
+        return vector / norma
+
+
+# Caché compartida por todo el proceso
+cache_respuestas = CacheRespuestas()
@@ -0,0 +1,79 @@
+"""
+Carga completa de los índices en memoria con las escrituras concurrentes anotadas
+"""
+import threading
+from typing import Callable, List, Optional, TypeVar
+
+T = TypeVar('T')
+
+
+class CargaIndice:
+    """
+    Estado de carga de un índice en memoria (IndiceVectorial, IndiceLexico)
+    
+    La carga completa se construye fuera del lock de escritura del índice, así
+    que no bloquea las búsquedas, y se instala de una vez al terminar. Las
+    escrituras que llegan mientras tanto se aplican al índice actual (si está
+    cargado) y se anotan para repetirlas sobre el nuevo, porque la lectura de la
+    base de datos puede no incluirlas.
+    """
+    
+    def __init__(self, lock: threading.RLock):
+        # Lock de escritura del índice
+        self._lock = lock
+        # Serializa la carga inicial: el segundo hilo que la pide espera a la del primero
+        self._serie = threading.Lock()
+        self._pendientes: Optional[List[tuple]] = None
+        self.cargado = False
+    
+    def asegurar(self, cargar: Callable[[], None]):
+        """
+        Cargar el índice una sola vez aunque varios hilos lo pidan a la vez
+        
+        cargar solo se llama si hace falta; los demás hilos esperan a que
+        termine la carga en curso en lugar de repetirla.
+        """
+        if self.cargado:
+            return
+        
+        with self._serie:
+            if not self.cargado:
+                cargar()
+    
+    def reemplazar(self, construir: Callable[[], T], instalar: Callable[[T], None]):
+        """
+        Construir el contenido nuevo fuera del lock e instalarlo bajo el lock
+        
+        Si construir falla, el índice queda como estaba. Si falla una de las
+        escrituras anotadas, el índice queda sin cargar y la próxima búsqueda
+        lo vuelve a cargar.
+        """
+        with self._lock:
+            self._pendientes = []
+        
+        try:
+            nuevo = construir()
+        except BaseException:
+            with self._lock:
+                self._pendientes = None
+            raise
+        
+        with self._lock:
+            instalar(nuevo)
+            try:
+                for operacion, argumentos in self._pendientes:
+                    operacion(*argumentos)
+                self.cargado = True
+            except BaseException:
+                self.cargado = False
+                raise
+            finally:
+                self._pendientes = None
+    
+    def escribir(self, operacion: Callable, *argumentos):
+        """Aplicar una escritura si el índice está cargado y anotarla si hay una carga en curso"""
+        with self._lock:
+            if self._pendientes is not None:
+                self._pendientes.append((operacion, argumentos))
+            if self.cargado:
+                operacion(*argumentos)
@@ -0,0 +1,114 @@
+"""
+Cola de tareas acotada ejecutada por un grupo fijo de hilos
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+
+class ColaTareas:
+    """
+    Grupo de hilos con límite de tareas pendientes y de tareas por cliente
+    
+    ThreadPoolExecutor acepta tareas sin límite; aquí se lleva la cuenta de las
+    tareas en cola y en ejecución para rechazar las nuevas cuando la cola está
+    llena (contrapresión) o cuando un cliente ya tiene demasiadas en curso.
+    """
+    
+    def __init__(self, max_trabajadores: int, max_pendientes: int, max_por_cliente: int, nombre: str = 'tareas'):
+        self.max_trabajadores = max_trabajadores
+        self.max_pendientes = max_pendientes
+        self.max_por_cliente = max_por_cliente
+        self._executor = ThreadPoolExecutor(max_workers=max_trabajadores, thread_name_prefix=nombre)
+        self._lock = threading.Lock()
+        self._por_cliente: Dict[str, int] = {}
+        self._en_cola = 0
+        self._en_ejecucion = 0
+        self._completadas = 0
+        self._fallidas = 0
+        self._rechazadas = 0
+    
+    def enviar(self, cliente_id: str, funcion: Callable, *args, **kwargs) -> bool:
+        """
+        Encolar una tarea para un cliente
+        
+        Args:
+            cliente_id: Identificador del cliente que origina la tarea
+            funcion: Función a ejecutar en segundo plano
+            
+        Returns:
+            bool: False si la tarea se rechazó por cola llena o límite del cliente
+        """
+        with self._lock:
+            pendientes = self._en_cola + self._en_ejecucion
+            if pendientes >= self.max_pendientes or self._por_cliente.get(cliente_id, 0) >= self.max_por_cliente:
+                self._rechazadas += 1
+                return False
+            
+            self._en_cola += 1
+            self._por_cliente[cliente_id] = self._por_cliente.get(cliente_id, 0) + 1
+        
+        try:
+            self._executor.submit(self._ejecutar, cliente_id, funcion, args, kwargs)
+        except RuntimeError:
+            # El executor se está cerrando
+            with self._lock:
+                self._en_cola -= 1
+                self._liberar_cliente(cliente_id)
+                self._rechazadas += 1
+            return False
+        
+        return True
+    
+    def _ejecutar(self, cliente_id: str, funcion: Callable, args: tuple, kwargs: dict):
+        """Ejecutar la tarea actualizando los contadores"""
+        with self._lock:
+            self._en_cola -= 1
+            self._en_ejecucion += 1
+        
+        exito = False
+        try:
+            funcion(*args, **kwargs)
+            exito = True
+        except Exception as e:
+            print(f"Error en tarea en segundo plano: {e}")
+        finally:
+            with self._lock:
+                self._en_ejecucion -= 1
+                self._liberar_cliente(cliente_id)
+                if exito:
+                    self._completadas += 1
+                else:
+                    self._fallidas += 1
+    
+    def _liberar_cliente(self, cliente_id: str):
+        """Descontar una tarea del cliente (llamar con el lock tomado)"""
+        restantes = self._por_cliente.get(cliente_id, 0) - 1
+        if restantes > 0:
+            self._por_cliente[cliente_id] = restantes
+        else:
+            self._por_cliente.pop(cliente_id, None)
+    
+    def pendientes_cliente(self, cliente_id: str) -> int:
+        """Número de tareas en cola o en ejecución de un cliente"""
+        with self._lock:
+            return self._por_cliente.get(cliente_id, 0)
+    
+    def metricas(self) -> Dict[str, Any]:
+        """Obtener la profundidad de la cola y los contadores acumulados"""
+        with self._lock:
+            return {
+                'en_cola': self._en_cola,
+                'en_ejecucion': self._en_ejecucion,
+                'clientes_activos': len(self._por_cliente),
+                'completadas': self._completadas,
+                'fallidas': self._fallidas,
+                'rechazadas': self._rechazadas,
+                'max_trabajadores': self.max_trabajadores,
+                'max_pendientes': self.max_pendientes,
+                'max_por_cliente': self.max_por_cliente
+            }
+    
+    def cerrar(self, esperar: bool = True):
+        """Detener el grupo de hilos"""
+        self._executor.shutdown(wait=esperar)
@@ -0,0 +1,147 @@
+"""
+Configuración de la aplicación
+"""
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class Config:
+    """Configuración base"""
+    
+    # Base de datos
+    DB_NAME = os.getenv('DB_NAME')
+    DB_USER = os.getenv('DB_USER')
+    DB_PASSWORD = os.getenv('DB_PASSWORD')
+    DB_HOST = os.getenv('DB_HOST')
+    DB_PORT = os.getenv('DB_PORT')
+    
+    # OpenAI
+    OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+    OPENAI_MODELO = os.getenv('OPENAI_MODELO', 'gpt-3.5-turbo')
+    
+    # Flask
+    SECRET_KEY = os.getenv('FLASK_SECRET_KEY', 'clave_secreta_flask')
+    ENVIRONMENT = os.getenv('ENVIRONMENT', 'development')
+    
+    # Embeddings
+    EMBEDDINGS_MODELO = os.getenv('EMBEDDINGS_MODELO', 'all-MiniLM-L6-v2')
+    EMBEDDINGS_CARGA_DIFERIDA = os.getenv('EMBEDDINGS_CARGA_DIFERIDA', 'false').lower() == 'true'
+    EMBEDDINGS_DIMENSION = int(os.getenv('EMBEDDINGS_DIMENSION', 384))
+    EMBEDDINGS_LOTE = int(os.getenv('EMBEDDINGS_LOTE', 64))  # textos por llamada a encode
+    # Procesos para generar embeddings al procesar documentos (0 = en el propio proceso, -1 = uno por núcleo)
+    EMBEDDINGS_PROCESOS = int(os.getenv('EMBEDDINGS_PROCESOS', 0))
+    EMBEDDINGS_HILOS_POR_PROCESO = int(os.getenv('EMBEDDINGS_HILOS_POR_PROCESO', 1))
+    # Caché de embeddings: entradas en memoria y archivo SQLite opcional para persistirla
+    EMBEDDINGS_CACHE_MAXIMO = int(os.getenv('EMBEDDINGS_CACHE_MAXIMO', 4096))
+    EMBEDDINGS_CACHE_DISCO = os.getenv('EMBEDDINGS_CACHE_DISCO', '')
+    
+    # pgvector (solo aplica cuando la base de datos es PostgreSQL)
+    PGVECTOR_HABILITADO = os.getenv('PGVECTOR_HABILITADO', 'true').lower() == 'true'
+    PGVECTOR_INDICE = os.getenv('PGVECTOR_INDICE', 'hnsw')  # hnsw o ivfflat
+    
+    # Chat: respuestas en streaming (lote mínimo en caracteres e intervalo máximo en segundos)
+    CHAT_STREAMING = os.getenv('CHAT_STREAMING', 'true').lower() == 'true'
+    CHAT_STREAMING_LOTE = int(os.getenv('CHAT_STREAMING_LOTE', 24))
+    CHAT_STREAMING_INTERVALO = float(os.getenv('CHAT_STREAMING_INTERVALO', 0.1))
+    
+    # Chat: procesamiento en segundo plano (hilos, tareas pendientes totales y por cliente)
+    CHAT_TRABAJADORES = int(os.getenv('CHAT_TRABAJADORES', 4))
+    CHAT_COLA_MAXIMA = int(os.getenv('CHAT_COLA_MAXIMA', 32))
+    CHAT_MAX_POR_CLIENTE = int(os.getenv('CHAT_MAX_POR_CLIENTE', 2))
+    
+    # Chat: memoria de la conversación. Presupuesto en tokens del prompt (resumen + turnos + contexto),
+    # parte reservada para los turnos recientes, turnos considerados, tokens del resumen y turnos
+    # nuevos acumulados antes de incorporarlos al resumen
+    CHAT_MEMORIA = os.getenv('CHAT_MEMORIA', 'true').lower() == 'true'
+    CHAT_PRESUPUESTO_TOKENS = int(os.getenv('CHAT_PRESUPUESTO_TOKENS', 12000))
+    CHAT_HISTORIAL_TOKENS = int(os.getenv('CHAT_HISTORIAL_TOKENS', 1500))
+    CHAT_HISTORIAL_MENSAJES = int(os.getenv('CHAT_HISTORIAL_MENSAJES', 10))
+    CHAT_RESUMEN_TOKENS = int(os.getenv('CHAT_RESUMEN_TOKENS', 300))
+    CHAT_RESUMEN_CADA = int(os.getenv('CHAT_RESUMEN_CADA', 6))
+    
+    # Chat: tokens máximos del contexto de documentos y fragmentos candidatos de la búsqueda por similitud
+    CHAT_CONTEXTO_TOKENS = int(os.getenv('CHAT_CONTEXTO_TOKENS', 3000))
+    CHAT_PASAJES_CANDIDATOS = int(os.getenv('CHAT_PASAJES_CANDIDATOS', 12))
+    
+    # Chat: documentos que se pueden consultar a la vez en un mensaje
+    CHAT_MAX_DOCUMENTOS = int(os.getenv('CHAT_MAX_DOCUMENTOS', 20))
+    
+    # Búsqueda híbrida: combinar la búsqueda por similitud con la léxica (BM25) por fusión de rangos (RRF).
+    # Mínimo léxico: fracción de la puntuación de un fragmento que contuviera una vez cada término de la pregunta
+    BUSQUEDA_HIBRIDA = os.getenv('BUSQUEDA_HIBRIDA', 'true').lower() == 'true'
+    BUSQUEDA_RRF_K = int(os.getenv('BUSQUEDA_RRF_K', 60))
+    BUSQUEDA_LEXICA_MINIMO = float(os.getenv('BUSQUEDA_LEXICA_MINIMO', 0.25))
+    
+    # Índice vectorial en memoria: cuantización de los vectores (ninguna, int8 o binaria) y candidatos
+    # por resultado que se vuelven a puntuar con los embeddings float guardados
+    INDICE_CUANTIZACION = os.getenv('INDICE_CUANTIZACION', 'ninguna')
+    INDICE_FACTOR_REVISION = int(os.getenv('INDICE_FACTOR_REVISION', 4))
+    
+    # Reordenación opcional con un cross-encoder local: modelo, tokens máximos por par, segundos
+    # disponibles (si se agotan se conserva el orden de la búsqueda) y pasajes que se conservan
+    CHAT_REORDENAR = os.getenv('CHAT_REORDENAR', 'false').lower() == 'true'
+    CHAT_REORDENADOR_MODELO = os.getenv('CHAT_REORDENADOR_MODELO', 'cross-encoder/mmarco-mMiniLMv2-L12-H384-v1')
+    CHAT_REORDENADOR_LONGITUD = int(os.getenv('CHAT_REORDENADOR_LONGITUD', 256))
+    CHAT_REORDENADOR_PRESUPUESTO = float(os.getenv('CHAT_REORDENADOR_PRESUPUESTO', 0.3))
+    CHAT_REORDENADOR_PASAJES = int(os.getenv('CHAT_REORDENADOR_PASAJES', 3))
+    
+    # Chat: caché de respuestas (entradas, segundos de vigencia y similitud mínima entre preguntas)
+    CACHE_RESPUESTAS_MAXIMO = int(os.getenv('CACHE_RESPUESTAS_MAXIMO', 256))
+    CACHE_RESPUESTAS_TTL = float(os.getenv('CACHE_RESPUESTAS_TTL', 3600))
+    CACHE_RESPUESTAS_UMBRAL = float(os.getenv('CACHE_RESPUESTAS_UMBRAL', 0.95))
+    
+    # Fragmentación de documentos (en caracteres)
+    FRAGMENTO_TAMANO = int(os.getenv('FRAGMENTO_TAMANO', 800))
+    FRAGMENTO_SOLAPAMIENTO = int(os.getenv('FRAGMENTO_SOLAPAMIENTO', 150))
+    
+    # Extracción de PDF: procesos (1 = secuencial, -1 = uno por núcleo), páginas por tarea y mínimo de páginas para paralelizar.
+    # Secuencial por defecto: cada proceso arranca importando de nuevo la aplicación y sus modelos
+    PDF_PROCESOS = int(os.getenv('PDF_PROCESOS', 1))
+    PDF_PAGINAS_POR_TAREA = int(os.getenv('PDF_PAGINAS_POR_TAREA', 8))
+    PDF_PAGINAS_PARALELO = int(os.getenv('PDF_PAGINAS_PARALELO', 32))
+    
+    # Procesamiento masivo: documentos por página (una transacción por página)
+    PROCESAMIENTO_LOTE_DOCUMENTOS = int(os.getenv('PROCESAMIENTO_LOTE_DOCUMENTOS', 16))
+    
+    # Trabajos de procesamiento en segundo plano (hilos, cola, reintentos y segundos de espera entre rondas)
+    TRABAJOS_TRABAJADORES = int(os.getenv('TRABAJOS_TRABAJADORES', 1))
+    TRABAJOS_COLA_MAXIMA = int(os.getenv('TRABAJOS_COLA_MAXIMA', 16))
+    TRABAJOS_REINTENTOS = int(os.getenv('TRABAJOS_REINTENTOS', 2))
+    TRABAJOS_ESPERA_REINTENTO = float(os.getenv('TRABAJOS_ESPERA_REINTENTO', 2.0))
+    
+    # Resumen de cada documento al procesarlo: activado, tokens de texto por sección, longitud del
+    # resumen de cada sección y del resumen final, y llamadas simultáneas a OpenAI
+    DOCUMENTOS_RESUMEN = os.getenv('DOCUMENTOS_RESUMEN', 'true').lower() == 'true'
+    DOCUMENTOS_RESUMEN_SECCION_TOKENS = int(os.getenv('DOCUMENTOS_RESUMEN_SECCION_TOKENS', 3000))
+    DOCUMENTOS_RESUMEN_SECCION_MAXIMO = int(os.getenv('DOCUMENTOS_RESUMEN_SECCION_MAXIMO', 250))
+    DOCUMENTOS_RESUMEN_MAXIMO = int(os.getenv('DOCUMENTOS_RESUMEN_MAXIMO', 500))
+    DOCUMENTOS_RESUMEN_HILOS = int(os.getenv('DOCUMENTOS_RESUMEN_HILOS', 4))
+    
+    # Listado de documentos: tamaño de página por defecto y máximo
+    DOCUMENTOS_POR_PAGINA = int(os.getenv('DOCUMENTOS_POR_PAGINA', 50))
+    DOCUMENTOS_POR_PAGINA_MAXIMO = int(os.getenv('DOCUMENTOS_POR_PAGINA_MAXIMO', 200))
+    
+    # Historial de chat: mensajes por página por defecto y máximo
+    HISTORIAL_POR_PAGINA = int(os.getenv('HISTORIAL_POR_PAGINA', 50))
+    HISTORIAL_POR_PAGINA_MAXIMO = int(os.getenv('HISTORIAL_POR_PAGINA_MAXIMO', 200))
+    
+    # Detectar driver de PostgreSQL
+    try:
+        import psycopg
+        DB_DRIVER = 'psycopg'
+    except ImportError:
+        try:
+            import psycopg2
+            DB_DRIVER = 'psycopg2'
+        except ImportError:
+            DB_DRIVER = 'sqlite'
+    
+    @classmethod
+    def get_database_url(cls):
+        """Obtener URL de conexión a la base de datos"""
+        if cls.DB_DRIVER == 'sqlite':
+            return 'sqlite:///chatbot_rag.db'
+        
+        return f"postgresql+{cls.DB_DRIVER}://{cls.DB_USER}:{cls.DB_PASSWORD}@{cls.DB_HOST}:{cls.DB_PORT}/{cls.DB_NAME}"
@@ -0,0 +1,78 @@
+"""
+Conteo de tokens para ajustar los prompts a un presupuesto
+"""
+import threading
+from funcionalidades.core.infraestructura.config import Config
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+class ContadorTokens:
+    """
+    Contar y recortar texto en tokens del modelo de chat
+    
+    Usa tiktoken si está instalado; si no (o si no puede cargar la
+    codificación) estima un token cada CARACTERES_POR_TOKEN caracteres, lo que
+    basta para respetar un presupuesto con margen.
+    """
+    
+    CARACTERES_POR_TOKEN = 4
+    
+    # Tokens que añade el formato de chat por cada mensaje (rol y separadores)
+    TOKENS_POR_MENSAJE = 4
+    
+    def __init__(self, modelo: str = None):
+        self.modelo = modelo or Config.OPENAI_MODELO
+        self._codificador = None
+        self._cargado = False
+        self._lock = threading.Lock()
+    
+    def _obtener_codificador(self):
+        """Cargar la codificación de tiktoken la primera vez (puede requerir descargarla)"""
+        if not self._cargado:
+            with self._lock:
+                if not self._cargado:
+                    if tiktoken is not None:
+                        try:
+                            self._codificador = tiktoken.encoding_for_model(self.modelo)
+                        except Exception as e:
+                            print(f"No se pudo cargar tiktoken para {self.modelo}, se estimarán los tokens: {str(e)}")
+                    self._cargado = True
+        return self._codificador
+    
+    def contar(self, texto: str) -> int:
+        """Número de tokens de un texto"""
+        if not texto:
+            return 0
+        
+        codificador = self._obtener_codificador()
+        if codificador is not None:
+            return len(codificador.encode(texto))
+        return -(-len(texto) // self.CARACTERES_POR_TOKEN)
+    
+    def contar_mensaje(self, texto: str) -> int:
+        """Tokens de un mensaje de chat, incluido el formato"""
+        return self.contar(texto) + self.TOKENS_POR_MENSAJE
+    
+    def recortar(self, texto: str, max_tokens: int) -> str:
+        """
+        Recortar un texto para que no supere max_tokens
+        
+        Returns:
+            str: El texto completo si cabe, o su comienzo
+        """
+        if not texto or max_tokens <= 0:
+            return ''
+        
+        codificador = self._obtener_codificador()
+        if codificador is not None:
+            tokens = codificador.encode(texto)
+            return texto if len(tokens) <= max_tokens else codificador.decode(tokens[:max_tokens])
+        return texto[:max_tokens * self.CARACTERES_POR_TOKEN]
+
+
+# Contador compartido (la codificación de tiktoken se carga una sola vez)
+contador_tokens = ContadorTokens()
@@ -1,6 +1,7 @@
 """
 Configuración de la base de datos
 """
+import numpy as np
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from .config import Config
@@ -9,6 +10,33 @@ db = SQLAlchemy()
 migrate = Migrate()
 
 
+class VectorBinario(db.TypeDecorator):
+    """
+    Vector de embeddings almacenado como bytes float32 (4 bytes por dimensión)
+    
+    Al leer se decodifica sin copia con np.frombuffer, por lo que el valor
+    devuelto es un np.ndarray de solo lectura.
+    """
+    
+    impl = db.LargeBinary
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return np.asarray(value, dtype=np.float32).tobytes()
+    
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return np.frombuffer(value, dtype=np.float32)
+    
+    def compare_values(self, x, y):
+        if x is None or y is None:
+            return x is y
+        return np.array_equal(np.asarray(x, dtype=np.float32), np.asarray(y, dtype=np.float32))
+
+
 def init_database(app):
     """Inicializar la base de datos"""
     app.config['SQLALCHEMY_DATABASE_URI'] = Config.get_database_url()
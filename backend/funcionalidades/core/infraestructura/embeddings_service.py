@@ -2,24 +2,52 @@
 Servicio de embeddings alternativo usando sentence-transformers
 """
 import numpy as np
-from typing import List, Optional
-from sentence_transformers import SentenceTransformer
+from typing import List, Optional, Tuple
 from sklearn.metrics.pairwise import cosine_similarity
+from funcionalidades.core.infraestructura.config import Config
+from funcionalidades.core.infraestructura.modelos_compartidos import obtener_sentence_transformer
+from funcionalidades.core.infraestructura.cache_embeddings import CacheEmbeddings, obtener_cache_embeddings
+from funcionalidades.core.infraestructura.pool_embeddings import PoolEmbeddings
 from funcionalidades.core.exceptions.domain_exceptions import ProcessingError
 
 
 class EmbeddingsService:
     """Servicio para generar y comparar embeddings usando sentence-transformers"""
     
-    def __init__(self):
-        try:
-            # Usar un modelo más ligero y compatible
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
-            self.model_loaded = True
-        except Exception as e:
-            self.model = None
-            self.model_loaded = False
-            print(f"Warning: No se pudo cargar el modelo de embeddings: {e}")
+    def __init__(self, carga_diferida: bool = None, cache: CacheEmbeddings = None):
+        # Usar un modelo más ligero y compatible, compartido por todas las instancias.
+        # Con carga diferida el modelo se carga en el primer uso y no al construir el servicio
+        self.nombre_modelo = Config.EMBEDDINGS_MODELO
+        self._model = None
+        self._carga_fallida = False
+        self.cache = cache if cache is not None else obtener_cache_embeddings()
+        
+        if carga_diferida is None:
+            carga_diferida = Config.EMBEDDINGS_CARGA_DIFERIDA
+        
+        if not carga_diferida:
+            self._cargar_modelo()
+    
+    def _cargar_modelo(self):
+        """Obtener el modelo compartido del proceso (solo se intenta una vez por instancia)"""
+        if self._model is None and not self._carga_fallida:
+            try:
+                self._model = obtener_sentence_transformer(self.nombre_modelo)
+            except Exception as e:
+                self._carga_fallida = True
+                print(f"Warning: No se pudo cargar el modelo de embeddings: {e}")
+        
+        return self._model
+    
+    @property
+    def model(self):
+        """Modelo de sentence-transformers (se carga al primer acceso si es diferido)"""
+        return self._cargar_modelo()
+    
+    @property
+    def model_loaded(self) -> bool:
+        """Verificar si el modelo está disponible"""
+        return self._cargar_modelo() is not None
     
     def generar_embedding(self, texto: str) -> List[float]:
         """
@@ -35,23 +63,96 @@ class EmbeddingsService:
             ProcessingError: Si hay error en el procesamiento
         """
         try:
-            if not self.model_loaded:
-                raise ProcessingError("Modelo de embeddings no está cargado")
-            
             if not texto or not texto.strip():
                 raise ProcessingError("El texto no puede estar vacío")
             
             # Limpiar y truncar texto si es muy largo
             texto_limpio = texto.strip()[:1000]  # Limitar a 1000 caracteres
             
+            # Reutilizar el embedding si el mismo texto ya se procesó
+            clave = CacheEmbeddings.calcular_clave(self.nombre_modelo, texto_limpio)
+            embedding = self.cache.obtener(clave)
+            if embedding is not None:
+                return embedding.tolist()
+            
+            if not self.model_loaded:
+                raise ProcessingError("Modelo de embeddings no está cargado")
+            
             # Generar embedding
             embedding = self.model.encode(texto_limpio)
             
-            return embedding.tolist()
+            return self.cache.guardar(clave, embedding).tolist()
             
         except Exception as e:
             raise ProcessingError(f"Error al generar embedding: {str(e)}")
     
+    def generar_embeddings_lote(self, textos: List[str], tamano_lote: int = None,
+                                pool: Optional[PoolEmbeddings] = None) -> List[List[float]]:
+        """
+        Generar embeddings para varios textos con una sola llamada al modelo
+        
+        Los textos que ya están en la caché no se vuelven a codificar; el resto
+        se envía a encode en lotes de tamano_lote, o se reparte entre los procesos
+        de pool si se indica uno.
+        
+        Args:
+            textos: Textos para generar embeddings
+            tamano_lote: Textos por lote del modelo (por defecto Config.EMBEDDINGS_LOTE)
+            pool: Grupo de procesos con su propio modelo cada uno
+            
+        Returns:
+            List[List[float]]: Un embedding por texto, en el mismo orden
+            
+        Raises:
+            ProcessingError: Si hay error en el procesamiento
+        """
+        try:
+            if any(not texto or not texto.strip() for texto in textos):
+                raise ProcessingError("El texto no puede estar vacío")
+            
+            textos_limpios = [texto.strip()[:1000] for texto in textos]
+            claves = [CacheEmbeddings.calcular_clave(self.nombre_modelo, texto) for texto in textos_limpios]
+            embeddings = [self.cache.obtener(clave) for clave in claves]
+            
+            pendientes = [i for i, embedding in enumerate(embeddings) if embedding is None]
+            if pendientes:
+                # Codificar solo los textos nuevos (sin repetir los duplicados)
+                textos_unicos = list(dict.fromkeys(textos_limpios[i] for i in pendientes))
+                codificados = self._codificar(textos_unicos, tamano_lote or Config.EMBEDDINGS_LOTE, pool)
+                guardados = self.cache.guardar_lote(
+                    [CacheEmbeddings.calcular_clave(self.nombre_modelo, texto) for texto in textos_unicos],
+                    list(codificados)
+                )
+                por_texto = dict(zip(textos_unicos, guardados))
+                for i in pendientes:
+                    embeddings[i] = por_texto[textos_limpios[i]]
+            
+            return [embedding.tolist() for embedding in embeddings]
+            
+        except Exception as e:
+            raise ProcessingError(f"Error al generar embeddings: {str(e)}")
+    
+    def obtener_en_cache(self, textos: List[str]) -> List[Optional[List[float]]]:
+        """Embeddings de los textos que ya están en la caché, o None para los que no"""
+        vectores = [
+            self.cache.obtener(CacheEmbeddings.calcular_clave(self.nombre_modelo, texto.strip()[:1000]))
+            for texto in textos
+        ]
+        return [vector.tolist() if vector is not None else None for vector in vectores]
+    
+    def _codificar(self, textos: List[str], tamano_lote: int, pool: Optional[PoolEmbeddings] = None):
+        """Codificar en el grupo de procesos si hay uno; si falla, en este proceso"""
+        if pool is not None:
+            try:
+                return pool.codificar(textos)
+            except Exception as e:
+                print(f"Warning: Falló el grupo de procesos de embeddings, se usa el modelo local: {e}")
+        
+        if not self.model_loaded:
+            raise ProcessingError("Modelo de embeddings no está cargado")
+        
+        return self.model.encode(textos, batch_size=tamano_lote)
+    
     def calcular_similitud(self, embedding1: List[float], embedding2: List[float]) -> float:
         """
         Calcular similitud coseno entre dos embeddings
@@ -65,7 +166,7 @@ class EmbeddingsService:
         """
         try:
             # Validar que los embeddings no estén vacíos
-            if not embedding1 or not embedding2:
+            if embedding1 is None or embedding2 is None:
                 raise ProcessingError("Los embeddings no pueden estar vacíos")
             
             if len(embedding1) == 0 or len(embedding2) == 0:
@@ -102,37 +203,116 @@ class EmbeddingsService:
             List[int]: Índices de documentos similares
         """
         try:
-            if not documentos_embeddings:
+            if documentos_embeddings is None or len(documentos_embeddings) == 0:
                 return []
             
-            if not query_embedding or len(query_embedding) == 0:
+            if query_embedding is None or len(query_embedding) == 0:
                 return []
             
-            similitudes = []
-            
-            for i, doc_embedding in enumerate(documentos_embeddings):
-                # Verificar que el embedding del documento sea válido
-                if not doc_embedding or len(doc_embedding) == 0:
-                    continue
-                
-                try:
-                    similitud = self.calcular_similitud(query_embedding, doc_embedding)
-                    if similitud >= umbral:
-                        similitudes.append((i, similitud))
-                except Exception as e:
-                    # Si hay error con un embedding específico, continuar con los demás
-                    print(f"Error calculando similitud para documento {i}: {str(e)}")
-                    continue
+            # Descartar embeddings vacíos o de otra dimensión conservando su índice original
+            dimension = len(query_embedding)
+            indices_validos = [
+                i for i, doc_embedding in enumerate(documentos_embeddings)
+                if doc_embedding is not None and len(doc_embedding) == dimension
+            ]
+            if not indices_validos:
+                return []
             
-            # Ordenar por similitud descendente
-            similitudes.sort(key=lambda x: x[1], reverse=True)
+            matriz = self.preparar_matriz([documentos_embeddings[i] for i in indices_validos])
+            resultados = self.buscar_en_matriz(query_embedding, matriz, limite=limite, umbral=umbral)
             
-            # Retornar índices de los más similares
-            return [idx for idx, _ in similitudes[:limite]]
+            return [indices_validos[idx] for idx, _ in resultados]
             
         except Exception as e:
             raise ProcessingError(f"Error en búsqueda de similares: {str(e)}")
     
+    @staticmethod
+    def preparar_matriz(embeddings: List[List[float]]) -> np.ndarray:
+        """
+        Construir una matriz float32 con las filas normalizadas (norma L2 = 1)
+        
+        Con las filas normalizadas la similitud coseno se reduce a un producto
+        punto, por lo que toda la búsqueda es un único producto matriz-vector.
+        
+        Args:
+            embeddings: Lista de embeddings de igual dimensión
+            
+        Returns:
+            np.ndarray: Matriz de forma (n, dimension)
+        """
+        matriz = np.array(embeddings, dtype=np.float32)
+        if matriz.ndim != 2:
+            raise ProcessingError("Los embeddings deben tener la misma dimensión")
+        
+        normas = np.linalg.norm(matriz, axis=1, keepdims=True)
+        normas[normas == 0] = 1.0
+        matriz /= normas
+        
+        return matriz
+    
+    @staticmethod
+    def buscar_en_matriz(query_embedding: List[float], matriz: np.ndarray,
+                         limite: int = 5, umbral: float = 0.3) -> List[Tuple[int, float]]:
+        """
+        Buscar las filas más similares a la consulta en una matriz normalizada
+        
+        Args:
+            query_embedding: Embedding de la consulta
+            matriz: Matriz devuelta por preparar_matriz
+            limite: Número máximo de resultados
+            umbral: Umbral mínimo de similitud
+            
+        Returns:
+            List[Tuple[int, float]]: Pares (fila, similitud) ordenados de mayor a menor
+        """
+        if matriz is None or matriz.shape[0] == 0 or limite <= 0:
+            return []
+        
+        query = np.asarray(query_embedding, dtype=np.float32).ravel()
+        if query.shape[0] != matriz.shape[1]:
+            raise ProcessingError(f"Dimensiones incompatibles: {query.shape[0]} vs {matriz.shape[1]}")
+        
+        norma = np.linalg.norm(query)
+        if norma == 0:
+            return []
+        
+        similitudes = matriz @ (query / norma)
+        
+        # Seleccionar el top-k en O(n) y ordenar solo esos k candidatos
+        if limite < similitudes.shape[0]:
+            candidatos = np.argpartition(-similitudes, limite - 1)[:limite]
+        else:
+            candidatos = np.arange(similitudes.shape[0])
+        
+        candidatos = candidatos[similitudes[candidatos] >= umbral]
+        candidatos = candidatos[np.argsort(-similitudes[candidatos], kind='stable')]
+        
+        return [(int(idx), float(similitudes[idx])) for idx in candidatos]
+    
+    def promediar_embeddings(self, embeddings: List[List[float]]) -> List[float]:
+        """
+        Calcular el embedding promedio (normalizado) de varios fragmentos
+        
+        Args:
+            embeddings: Lista de embeddings
+            
+        Returns:
+            List[float]: Embedding representativo del conjunto
+        """
+        try:
+            if not embeddings:
+                raise ProcessingError("Se requiere al menos un embedding")
+            
+            promedio = np.mean(np.array(embeddings, dtype=np.float32), axis=0)
+            norma = np.linalg.norm(promedio)
+            if norma > 0:
+                promedio = promedio / norma
+            
+            return promedio.tolist()
+            
+        except Exception as e:
+            raise ProcessingError(f"Error al promediar embeddings: {str(e)}")
+    
     def esta_disponible(self) -> bool:
         """Verificar si el servicio está disponible"""
         return self.model_loaded
@@ -0,0 +1,143 @@
+"""
+Servicio de extracción de texto de PDF por páginas
+"""
+import atexit
+import hashlib
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import IO, Iterable, Iterator, List, Tuple
+import PyPDF2
+from funcionalidades.core.infraestructura.config import Config
+from funcionalidades.core.infraestructura.modelos_compartidos import obtener_modelo
+from funcionalidades.core.exceptions.domain_exceptions import ProcessingError
+
+# Separador de páginas en el contenido de un documento
+SEPARADOR_PAGINAS = '\f'
+
+
+def _extraer_rango(ruta: str, inicio: int, fin: int) -> List[str]:
+    """Extraer el texto de las páginas [inicio, fin) en un proceso trabajador"""
+    lector = PyPDF2.PdfReader(ruta)
+    return [_texto_pagina(lector.pages[i]) for i in range(inicio, fin)]
+
+
+def _texto_pagina(pagina) -> str:
+    return (pagina.extract_text() or '').replace(SEPARADOR_PAGINAS, '\n').strip()
+
+
+class ExtraccionPdfService:
+    """
+    Extraer el texto de un PDF página a página
+    
+    El archivo subido se copia a un temporal en disco en bloques, sin cargarlo
+    entero en memoria, calculando a la vez su sha256. Los PDF con muchas páginas se reparten por rangos entre
+    procesos; las páginas se entregan en orden a medida que llegan, así que el
+    consumidor puede empezar a trabajar antes de que termine la extracción.
+    """
+    
+    TAMANO_BLOQUE = 1024 * 1024
+    
+    def __init__(self, procesos: int = None, paginas_por_tarea: int = None, paginas_paralelo: int = None):
+        procesos = procesos if procesos is not None else Config.PDF_PROCESOS
+        self.procesos = procesos if procesos > 0 else (os.cpu_count() or 1) if procesos < 0 else 1
+        self.paginas_por_tarea = paginas_por_tarea or Config.PDF_PAGINAS_POR_TAREA
+        self.paginas_paralelo = paginas_paralelo or Config.PDF_PAGINAS_PARALELO
+    
+    def guardar_temporal(self, archivo: IO[bytes]) -> Tuple[str, str]:
+        """
+        Copiar un archivo subido a un temporal en disco
+        
+        Returns:
+            Tuple[str, str]: (ruta del temporal, sha256 del archivo); el temporal
+                se elimina con eliminar_temporal
+        """
+        descriptor, ruta = tempfile.mkstemp(suffix='.pdf')
+        try:
+            huella = hashlib.sha256()
+            with os.fdopen(descriptor, 'wb') as destino:
+                while True:
+                    bloque = archivo.read(self.TAMANO_BLOQUE)
+                    if not bloque:
+                        break
+                    huella.update(bloque)
+                    destino.write(bloque)
+            return ruta, huella.hexdigest()
+        except Exception as e:
+            self.eliminar_temporal(ruta)
+            raise ProcessingError(f"Error al guardar el PDF temporal: {str(e)}")
+    
+    @staticmethod
+    def eliminar_temporal(ruta: str):
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
+    
+    def iterar_paginas(self, ruta: str) -> Iterator[Tuple[int, str]]:
+        """
+        Extraer las páginas de un PDF en orden
+        
+        Args:
+            ruta: Ruta del PDF en disco
+            
+        Yields:
+            Tuple[int, str]: (número de página empezando en 1, texto de la página)
+        """
+        try:
+            lector = PyPDF2.PdfReader(ruta)
+            total = len(lector.pages)
+            
+            if self.procesos <= 1 or total < self.paginas_paralelo:
+                for indice, pagina in enumerate(lector.pages):
+                    yield indice + 1, _texto_pagina(pagina)
+                return
+            
+            rangos = [(inicio, min(inicio + self.paginas_por_tarea, total))
+                      for inicio in range(0, total, self.paginas_por_tarea)]
+            resultados = self._obtener_executor().map(
+                _extraer_rango, [ruta] * len(rangos), [r[0] for r in rangos], [r[1] for r in rangos]
+            )
+            for (inicio, _), textos in zip(rangos, resultados):
+                for desplazamiento, texto in enumerate(textos):
+                    yield inicio + desplazamiento + 1, texto
+            
+        except ProcessingError:
+            raise
+        except Exception as e:
+            raise ProcessingError(f"Error al extraer texto del PDF: {str(e)}")
+    
+    def extraer(self, archivo: IO[bytes]) -> str:
+        """
+        Extraer el texto completo de un PDF subido
+        
+        Las páginas se unen una sola vez con SEPARADOR_PAGINAS para conservar su
+        número en el contenido del documento.
+        """
+        ruta, _ = self.guardar_temporal(archivo)
+        try:
+            return self.extraer_ruta(ruta)
+        finally:
+            self.eliminar_temporal(ruta)
+    
+    def extraer_ruta(self, ruta: str) -> str:
+        """Extraer el texto completo de un PDF ya guardado en disco"""
+        return self.unir_paginas(self.iterar_paginas(ruta))
+    
+    @staticmethod
+    def unir_paginas(paginas: Iterable[Tuple[int, str]]) -> str:
+        """Unir las páginas en un único texto separado por SEPARADOR_PAGINAS"""
+        return SEPARADOR_PAGINAS.join(texto for _, texto in paginas)
+    
+    def _obtener_executor(self) -> ProcessPoolExecutor:
+        """Grupo de procesos compartido, creado en el primer PDF que lo necesita"""
+        def fabrica():
+            executor = ProcessPoolExecutor(
+                max_workers=self.procesos,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            atexit.register(executor.shutdown, wait=False, cancel_futures=True)
+            return executor
+        
+        return obtener_modelo(f"pool-pdf:{self.procesos}", fabrica)
@@ -0,0 +1,96 @@
+"""
+Servicio para dividir documentos en fragmentos solapados
+"""
+from typing import Iterable, Iterator, List, Optional, Tuple
+from funcionalidades.core.infraestructura.config import Config
+from funcionalidades.core.infraestructura.extraccion_pdf_service import SEPARADOR_PAGINAS
+from funcionalidades.core.exceptions.domain_exceptions import ProcessingError
+
+
+class FragmentacionService:
+    """Servicio para dividir texto en pasajes solapados aptos para embeddings"""
+    
+    # Separadores preferidos para cortar un fragmento, en orden de prioridad
+    SEPARADORES = ['\n\n', '. ', '\n', ' ']
+    
+    def __init__(self, tamano: int = None, solapamiento: int = None):
+        self.tamano = tamano or Config.FRAGMENTO_TAMANO
+        self.solapamiento = solapamiento if solapamiento is not None else Config.FRAGMENTO_SOLAPAMIENTO
+        
+        if self.solapamiento >= self.tamano:
+            raise ProcessingError("El solapamiento debe ser menor que el tamaño del fragmento")
+    
+    def fragmentar(self, texto: str) -> List[str]:
+        """
+        Dividir un texto en fragmentos solapados
+        
+        Args:
+            texto: Texto a fragmentar
+            
+        Returns:
+            List[str]: Fragmentos en el orden en que aparecen en el texto
+        """
+        texto = (texto or '').strip()
+        if not texto:
+            return []
+        
+        fragmentos = []
+        longitud = len(texto)
+        inicio = 0
+        
+        while inicio < longitud:
+            fin = min(inicio + self.tamano, longitud)
+            if fin < longitud:
+                fin = self._buscar_corte(texto, inicio, fin)
+            
+            fragmento = texto[inicio:fin].strip()
+            if fragmento:
+                fragmentos.append(fragmento)
+            
+            if fin >= longitud:
+                break
+            
+            # Retroceder para solapar y empezar en el inicio de una palabra
+            siguiente = max(fin - self.solapamiento, inicio + 1)
+            espacio = texto.find(' ', siguiente, fin)
+            inicio = espacio + 1 if espacio != -1 else siguiente
+        
+        return fragmentos
+    
+    def fragmentar_paginas(self, paginas: Iterable[Tuple[int, str]]) -> Iterator[Tuple[int, str]]:
+        """
+        Fragmentar página a página a medida que llegan las páginas
+        
+        Los fragmentos no cruzan el límite de página, así cada uno conserva el
+        número de página del que proviene.
+        
+        Args:
+            paginas: Pares (número de página, texto), p. ej. de ExtraccionPdfService.iterar_paginas
+            
+        Yields:
+            Tuple[int, str]: (número de página, fragmento)
+        """
+        for numero, texto in paginas:
+            for fragmento in self.fragmentar(texto):
+                yield numero, fragmento
+    
+    def fragmentar_documento(self, contenido: str) -> List[Tuple[Optional[int], str]]:
+        """
+        Fragmentar el contenido de un documento conservando el número de página
+        
+        Los documentos extraídos antes de separar páginas no tienen
+        SEPARADOR_PAGINAS; sus fragmentos se devuelven sin página (None).
+        """
+        if SEPARADOR_PAGINAS not in (contenido or ''):
+            return [(None, fragmento) for fragmento in self.fragmentar(contenido)]
+        
+        return list(self.fragmentar_paginas(enumerate(contenido.split(SEPARADOR_PAGINAS), start=1)))
+    
+    def _buscar_corte(self, texto: str, inicio: int, fin: int) -> int:
+        """Buscar la mejor posición de corte en la segunda mitad de la ventana"""
+        minimo = inicio + self.tamano // 2
+        for separador in self.SEPARADORES:
+            posicion = texto.rfind(separador, minimo, fin)
+            if posicion != -1:
+                return posicion + len(separador)
+        return fin
@@ -0,0 +1,17 @@
+"""
+Utilidades para calcular la huella (hash) de un contenido
+"""
+import hashlib
+
+
+def calcular_hash_texto(texto: str) -> str:
+    """
+    Calcular el sha256 de un texto
+    
+    Args:
+        texto: Texto a resumir (se codifica en UTF-8)
+        
+    Returns:
+        str: Huella en hexadecimal (64 caracteres)
+    """
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
@@ -0,0 +1,222 @@
+"""
+Índice invertido en memoria con puntuación BM25, compartido por todo el proceso
+"""
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from funcionalidades.core.infraestructura.carga_indice import CargaIndice
+
+# Palabras demasiado frecuentes para distinguir un fragmento de otro
+PALABRAS_VACIAS = frozenset("""
+    a al algo algun alguna algunas alguno algunos ante antes como con contra cual cuales cuando de del
+    desde donde dos el ella ellas ello ellos en entre era eran es esa esas ese eso esos esta estaba
+    estan estas este esto estos fue fueron ha habia han hasta hay la las le les lo los mas me mi mis
+    muy nada ni no nos o os otra otras otro otros para pero por porque que quien quienes se segun ser
+    si sin sobre son su sus tambien te tiene tienen todo todos tu tus un una unas uno unos y ya yo
+""".split())
+
+_PATRON_PALABRA = re.compile(r'\w+')
+
+# Quitar tildes con una tabla es mucho más rápido que normalizar con unicodedata carácter a carácter
+_SIN_TILDES = str.maketrans('áàâäéèêëíìîïóòôöúùûüñç', 'aaaaeeeeiiiioooouuuunc')
+
+
+def tokenizar(texto: str) -> List[str]:
+    """
+    Dividir un texto en términos normalizados
+    
+    Minúsculas y sin tildes, para que "Facturación" coincida con
+    "facturacion". Los números y códigos (p. ej. "12345", "A23") se
+    conservan como términos; se descartan las palabras vacías.
+    """
+    normalizado = (texto or '').lower().translate(_SIN_TILDES)
+    return [palabra for palabra in _PATRON_PALABRA.findall(normalizado) if palabra not in PALABRAS_VACIAS]
+
+
+class IndiceLexico:
+    """
+    Índice invertido término -> {id: frecuencia} con puntuación BM25
+    
+    Como IndiceVectorial, cada elemento tiene un id y un grupo (fragmento y
+    documento) y se actualiza de forma incremental al agregar o eliminar
+    grupos. Una consulta solo recorre las listas de sus términos, por lo que
+    responde en milisegundos aunque el índice tenga cientos de miles de
+    fragmentos.
+    
+    La carga completa se construye fuera del lock, así que no bloquea las
+    búsquedas; los cambios que llegan mientras tanto se anotan y se aplican al
+    terminar (ver CargaIndice).
+    """
+    
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._carga = CargaIndice(self._lock)
+        self._limpiar()
+    
+    @property
+    def cargado(self) -> bool:
+        """Si el índice ya se cargó desde la base de datos"""
+        return self._carga.cargado
+    
+    def __len__(self) -> int:
+        return len(self._longitudes)
+    
+    def _limpiar(self):
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._longitudes: Dict[int, int] = {}
+        self._terminos: Dict[int, Tuple[str, ...]] = {}
+        self._grupo_de: Dict[int, int] = {}
+        self._miembros: Dict[int, set] = {}
+        self._longitud_total = 0
+    
+    def cargar(self, ids: List[int], grupos: List[int], textos: Iterable[str]):
+        """Reemplazar todo el contenido del índice"""
+        self.cargar_filas(zip(ids, grupos, textos))
+    
+    def cargar_filas(self, filas: Iterable[Tuple[int, int, str]]):
+        """
+        Reemplazar todo el contenido del índice con filas (id, grupo, texto)
+        
+        Las filas se indexan a medida que llegan, sin guardar los textos. Si la
+        lectura falla, el índice queda como estaba.
+        """
+        def construir() -> 'IndiceLexico':
+            nuevo = IndiceLexico(self.k1, self.b)
+            for elemento_id, grupo, texto in filas:
+                nuevo._agregar_elemento(elemento_id, grupo, texto)
+            return nuevo
+        
+        self._carga.reemplazar(construir, self._instalar)
+    
+    def _instalar(self, nuevo: 'IndiceLexico'):
+        self._postings = nuevo._postings
+        self._longitudes = nuevo._longitudes
+        self._terminos = nuevo._terminos
+        self._grupo_de = nuevo._grupo_de
+        self._miembros = nuevo._miembros
+        self._longitud_total = nuevo._longitud_total
+    
+    def asegurar_cargado(self, obtener_filas: Callable[[], Iterable[Tuple[int, int, str]]]):
+        """
+        Cargar el índice una sola vez aunque varios hilos lo pidan a la vez
+        
+        obtener_filas solo se llama si hace falta cargar; los demás hilos
+        esperan a que termine la carga en curso en lugar de repetirla.
+        """
+        self._carga.asegurar(lambda: self.cargar_filas(obtener_filas()))
+    
+    def agregar(self, ids: List[int], grupos: List[int], textos: List[str]):
+        """Agregar elementos al índice (reemplaza los ids que ya existan)"""
+        if not ids:
+            return
+        
+        self._carga.escribir(self._agregar_elementos, list(ids), list(grupos), list(textos))
+    
+    def eliminar_grupo(self, grupo: int):
+        """Eliminar del índice todos los elementos de un grupo"""
+        self.eliminar_grupos([grupo])
+    
+    def eliminar_grupos(self, grupos: Iterable[int]):
+        """Eliminar del índice todos los elementos de varios grupos"""
+        self._carga.escribir(self._eliminar_grupos, list(grupos))
+    
+    def invalidar(self):
+        """Descartar el contenido para forzar una recarga completa"""
+        with self._lock:
+            self._limpiar()
+            self._carga.cargado = False
+    
+    def _agregar_elementos(self, ids: List[int], grupos: List[int], textos: List[str]):
+        for elemento_id, grupo, texto in zip(ids, grupos, textos):
+            self._quitar_elemento(elemento_id)
+            self._agregar_elemento(elemento_id, grupo, texto)
+    
+    def _eliminar_grupos(self, grupos: List[int]):
+        for grupo in grupos:
+            for elemento_id in list(self._miembros.get(grupo, ())):
+                self._quitar_elemento(elemento_id)
+    
+    def buscar(self, consulta: str, limite: int = 5, grupo: Optional[int] = None,
+               grupos: Optional[Sequence[int]] = None, minimo: float = 0.0) -> List[Tuple[int, float]]:
+        """
+        Buscar los elementos con mejor puntuación BM25 para la consulta
+        
+        Args:
+            consulta: Texto de la consulta
+            limite: Número máximo de resultados
+            grupo: Restringir la búsqueda a un grupo
+            grupos: Restringir la búsqueda a varios grupos
+            minimo: Puntuación mínima, como fracción de la que obtendría un elemento
+                de longitud media con cada término de la consulta una vez. Los
+                términos que no están en el índice también cuentan, así que
+                coincidir solo en las palabras comunes de la pregunta no basta
+            
+        Returns:
+            List[Tuple[int, float]]: Pares (id, puntuación) ordenados de mayor a menor
+        """
+        terminos = set(tokenizar(consulta))
+        if not terminos or limite <= 0:
+            return []
+        
+        permitidos = {grupo} if grupo is not None else set(grupos) if grupos is not None else None
+        
+        with self._lock:
+            total = len(self._longitudes)
+            if total == 0:
+                return []
+            longitud_media = self._longitud_total / total
+            
+            puntuaciones: Dict[int, float] = {}
+            referencia = 0.0
+            for termino in terminos:
+                postings = self._postings.get(termino) or {}
+                idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+                referencia += idf
+                
+                for elemento_id, frecuencia in postings.items():
+                    if permitidos is not None and self._grupo_de[elemento_id] not in permitidos:
+                        continue
+                    normalizacion = self.k1 * (1 - self.b + self.b * self._longitudes[elemento_id] / longitud_media)
+                    puntuaciones[elemento_id] = puntuaciones.get(elemento_id, 0.0) + \
+                        idf * frecuencia * (self.k1 + 1) / (frecuencia + normalizacion)
+        
+        umbral = minimo * referencia
+        mejores = heapq.nlargest(
+            limite, ((elemento_id, puntuacion) for elemento_id, puntuacion in puntuaciones.items() if puntuacion >= umbral),
+            key=lambda par: par[1]
+        )
+        return [(elemento_id, float(puntuacion)) for elemento_id, puntuacion in mejores]
+    
+    def _agregar_elemento(self, elemento_id: int, grupo: int, texto: str):
+        frecuencias = Counter(tokenizar(texto))
+        for termino, frecuencia in frecuencias.items():
+            self._postings.setdefault(termino, {})[elemento_id] = frecuencia
+        
+        longitud = sum(frecuencias.values())
+        self._longitudes[elemento_id] = longitud
+        self._terminos[elemento_id] = tuple(frecuencias)
+        self._grupo_de[elemento_id] = grupo
+        self._miembros.setdefault(grupo, set()).add(elemento_id)
+        self._longitud_total += longitud
+    
+    def _quitar_elemento(self, elemento_id: int):
+        if elemento_id not in self._longitudes:
+            return
+        
+        for termino in self._terminos.pop(elemento_id):
+            postings = self._postings[termino]
+            del postings[elemento_id]
+            if not postings:
+                del self._postings[termino]
+        
+        self._longitud_total -= self._longitudes.pop(elemento_id)
+        grupo = self._grupo_de.pop(elemento_id)
+        miembros = self._miembros[grupo]
+        miembros.discard(elemento_id)
+        if not miembros:
+            del self._miembros[grupo]
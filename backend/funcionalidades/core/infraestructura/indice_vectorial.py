@@ -0,0 +1,396 @@
+"""
+Índice vectorial en memoria compartido por todo el proceso
+"""
+import threading
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+from funcionalidades.core.infraestructura.embeddings_service import EmbeddingsService
+from funcionalidades.core.infraestructura.carga_indice import CargaIndice
+from funcionalidades.core.exceptions.domain_exceptions import ProcessingError
+
+CUANTIZACIONES = ('ninguna', 'int8', 'binaria')
+
+# Bits en 1 de cada valor de un byte, para contar la distancia de Hamming entre códigos binarios
+_BITS_POR_BYTE = np.array([bin(valor).count('1') for valor in range(256)], dtype=np.uint8)
+
+
+@dataclass(frozen=True)
+class _Version:
+    """Contenido del índice en un momento dado; cada escritura crea una versión nueva"""
+    
+    matriz: Optional[np.ndarray] = None  # Vectores normalizados o sus códigos
+    ids: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    grupos: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    dimension: Optional[int] = None
+    calibracion: Optional[np.ndarray] = None  # Escala (int8) o media (binaria) por dimensión
+    vectores: Optional[np.ndarray] = None  # Vectores float mientras la calibración es provisional
+
+
+class IndiceVectorial:
+    """
+    Matriz de vectores normalizados con su mapa de ids
+    
+    Cada fila guarda el id del elemento indexado y el id del grupo al que
+    pertenece (por ejemplo, fragmento y documento). Las escrituras construyen
+    arreglos nuevos y los reemplazan bajo un lock, de modo que una búsqueda
+    concurrente siempre trabaja sobre una versión consistente del índice. La
+    carga completa se construye fuera del lock y se reemplaza de una vez; los
+    cambios que llegan mientras tanto se anotan y se aplican al terminar (ver
+    CargaIndice).
+    
+    Con cuantización los vectores se guardan como códigos más pequeños:
+    
+    - int8: un byte por dimensión (4 veces menos memoria que float32), con
+      una escala por dimensión.
+    - binaria: un bit por dimensión (32 veces menos memoria), el signo
+      respecto de la media de esa dimensión; la similitud se estima a partir
+      de la distancia de Hamming.
+      
+    La calibración (escala o media) se calcula con las primeras
+    FILAS_CALIBRACION filas. Mientras el índice tiene menos, se conservan
+    también sus vectores float y se recalibra y recodifica todo con cada
+    escritura, para no fijarla con el primer documento. Después, con int8, si
+    más de SATURACION_MAXIMA de los valores de un bloque nuevo se saturan, la
+    escala de esas dimensiones se amplía y se recodifican los códigos
+    existentes.
+      
+    La búsqueda cuantizada puntúa todos los códigos, se queda con
+    limite * factor_revision candidatos y, si se indicó leer_vectores, los
+    vuelve a puntuar con sus embeddings float (leídos solo para esos
+    candidatos) antes de aplicar el umbral.
+    """
+    
+    # Filas que se codifican o puntúan a la vez, para acotar la memoria temporal en float32
+    FILAS_POR_BLOQUE = 8192
+    # Filas con las que la calibración de la cuantización pasa a ser definitiva
+    FILAS_CALIBRACION = 1024
+    # Fracción de valores saturados en un bloque int8 a partir de la cual se amplía la escala
+    SATURACION_MAXIMA = 0.001
+    
+    def __init__(self, cuantizacion: str = 'ninguna', factor_revision: int = 4,
+                 leer_vectores: Optional[Callable[[List[int]], List[Optional[Sequence[float]]]]] = None):
+        if cuantizacion not in CUANTIZACIONES:
+            raise ProcessingError(f"Cuantización desconocida: {cuantizacion} (se admite {', '.join(CUANTIZACIONES)})")
+        
+        self.cuantizacion = cuantizacion
+        self.factor_revision = max(1, factor_revision)
+        self.leer_vectores = leer_vectores
+        self._lock = threading.RLock()
+        self._carga = CargaIndice(self._lock)
+        self._version = _Version()
+    
+    @property
+    def cargado(self) -> bool:
+        """Si el índice ya se cargó desde la base de datos"""
+        return self._carga.cargado
+    
+    def __len__(self) -> int:
+        return int(self._version.ids.shape[0])
+    
+    def cargar(self, ids: List[int], grupos: List[int], embeddings: List[List[float]]):
+        """
+        Reemplazar todo el contenido del índice
+        
+        Args:
+            ids: Id de cada elemento
+            grupos: Id del grupo de cada elemento
+            embeddings: Embedding de cada elemento
+        """
+        self._validar_longitudes(ids, grupos, embeddings)
+        self.cargar_filas(zip(ids, grupos, embeddings))
+    
+    def asegurar_cargado(self, obtener_filas: Callable[[], Iterable[Tuple[int, int, Sequence[float]]]]):
+        """
+        Cargar el índice si todavía no está cargado, una sola vez por proceso
+        
+        Si varios hilos lo piden a la vez solo el primero lee la base de datos;
+        los demás esperan a que termine.
+        """
+        self._carga.asegurar(lambda: self.cargar_filas(obtener_filas()))
+    
+    def cargar_filas(self, filas: Iterable[Tuple[int, int, Sequence[float]]]):
+        """
+        Reemplazar todo el contenido del índice a partir de filas (id, grupo, embedding)
+        
+        Las filas se codifican por bloques a medida que llegan, así que no hace
+        falta tener todos los embeddings float en memoria a la vez. Si la
+        lectura falla, el índice queda como estaba.
+        """
+        self._carga.reemplazar(lambda: self._construir(_Version(), filas), self._instalar)
+        
+    def _instalar(self, version: _Version):
+        self._version = version
+    
+    def agregar(self, ids: List[int], grupos: List[int], embeddings: List[List[float]]):
+        """Agregar elementos al índice (reemplaza los ids que ya existan)"""
+        if not ids:
+            return
+        
+        self._validar_longitudes(ids, grupos, embeddings)
+        self._carga.escribir(self._agregar_elementos, list(ids), list(grupos), list(embeddings))
+            
+    def _agregar_elementos(self, ids: List[int], grupos: List[int], embeddings: List[List[float]]):
+        version = self._version
+        conservar = ~np.isin(version.ids, np.asarray(ids, dtype=np.int64))
+        if not conservar.all():
+            version = self._filtrar(version, conservar)
+        self._version = self._construir(version, zip(ids, grupos, embeddings))
+    
+    def eliminar_grupo(self, grupo: int):
+        """Eliminar del índice todos los elementos de un grupo"""
+        self.eliminar_grupos([grupo])
+    
+    def eliminar_grupos(self, grupos: Iterable[int]):
+        """Eliminar del índice todos los elementos de varios grupos"""
+        self._carga.escribir(self._eliminar_grupos, np.fromiter(grupos, dtype=np.int64))
+            
+    def _eliminar_grupos(self, grupos: np.ndarray):
+        conservar = ~np.isin(self._version.grupos, grupos)
+        if not conservar.all():
+            self._version = self._filtrar(self._version, conservar)
+    
+    def invalidar(self):
+        """Descartar el contenido para forzar una recarga completa"""
+        with self._lock:
+            self._version = _Version()
+            self._carga.cargado = False
+    
+    def memoria_bytes(self) -> int:
+        """Memoria ocupada por los vectores (o sus códigos), ids y grupos"""
+        version = self._version
+        arreglos = (version.matriz, version.ids, version.grupos, version.vectores)
+        return int(sum(arreglo.nbytes for arreglo in arreglos if arreglo is not None))
+    
+    def metricas(self) -> dict:
+        """Elementos, cuantización y memoria del índice"""
+        return {
+            'elementos': len(self),
+            'cuantizacion': self.cuantizacion,
+            'memoria_bytes': self.memoria_bytes()
+        }
+    
+    def buscar(self, query_embedding: List[float], limite: int = 5, umbral: float = 0.3,
+               grupo: Optional[int] = None, grupos: Optional[Sequence[int]] = None) -> List[Tuple[int, float]]:
+        """
+        Buscar los elementos más similares a la consulta
+        
+        Args:
+            query_embedding: Embedding de la consulta
+            limite: Número máximo de resultados
+            umbral: Umbral mínimo de similitud
+            grupo: Restringir la búsqueda a un grupo
+            grupos: Restringir la búsqueda a varios grupos
+            
+        Returns:
+            List[Tuple[int, float]]: Pares (id, similitud) ordenados de mayor a menor
+        """
+        # Tomar una versión consistente; las escrituras no modifican sus arreglos
+        version = self._version
+        matriz, ids, grupos_por_fila = version.matriz, version.ids, version.grupos
+        
+        if matriz is None or ids.shape[0] == 0:
+            return []
+        
+        if grupo is not None:
+            filas = np.flatnonzero(grupos_por_fila == grupo)
+        elif grupos is not None:
+            filas = np.flatnonzero(np.isin(grupos_por_fila, np.asarray(list(grupos), dtype=np.int64)))
+        else:
+            filas = None
+        
+        if filas is not None:
+            if filas.shape[0] == 0:
+                return []
+            matriz, ids = matriz[filas], ids[filas]
+        
+        if self.cuantizacion == 'ninguna':
+            resultados = EmbeddingsService.buscar_en_matriz(query_embedding, matriz, limite=limite, umbral=umbral)
+            return [(int(ids[fila]), similitud) for fila, similitud in resultados]
+    
+        return self._buscar_cuantizado(query_embedding, matriz, ids, version.calibracion, version.dimension, limite, umbral)
+        
+    def _buscar_cuantizado(self, query_embedding: List[float], codigos: np.ndarray, ids: np.ndarray,
+                           calibracion: np.ndarray, dimension: int, limite: int,
+                           umbral: float) -> List[Tuple[int, float]]:
+        """Preseleccionar con los códigos y volver a puntuar los candidatos con los vectores float"""
+        if limite <= 0:
+            return []
+        
+        query = np.asarray(query_embedding, dtype=np.float32).ravel()
+        if query.shape[0] != dimension:
+            raise ProcessingError(f"Dimensiones incompatibles: {query.shape[0]} vs {dimension}")
+        
+        norma = np.linalg.norm(query)
+        if norma == 0:
+            return []
+        query = query / norma
+        
+        aproximadas = self._puntuar(codigos, query, calibracion, dimension)
+        revisar = min(limite * self.factor_revision, aproximadas.shape[0])
+        if revisar < aproximadas.shape[0]:
+            candidatos = np.argpartition(-aproximadas, revisar - 1)[:revisar]
+        else:
+            candidatos = np.arange(aproximadas.shape[0])
+        
+        similitudes = self._revisar(ids[candidatos], query, aproximadas[candidatos])
+        orden = np.argsort(-similitudes, kind='stable')[:limite]
+        return [
+            (int(ids[candidatos[posicion]]), float(similitudes[posicion]))
+            for posicion in orden if similitudes[posicion] >= umbral
+        ]
+    
+    def _puntuar(self, codigos: np.ndarray, query: np.ndarray, calibracion: np.ndarray, dimension: int) -> np.ndarray:
+        """
+        Similitud aproximada de la consulta con cada código, por bloques
+        
+        calibracion es la escala por dimensión (int8) o la media por dimensión (binaria).
+        """
+        if self.cuantizacion == 'int8':
+            query_escalada = query * calibracion
+            partes = [
+                codigos[inicio:inicio + self.FILAS_POR_BLOQUE].astype(np.float32) @ query_escalada
+                for inicio in range(0, codigos.shape[0], self.FILAS_POR_BLOQUE)
+            ]
+            return np.concatenate(partes)
+        
+        # Binaria: la fracción de bits distintos estima el ángulo entre los vectores centrados
+        bits_query = np.packbits(query > calibracion)
+        distancias = np.concatenate([
+            _BITS_POR_BYTE[np.bitwise_xor(codigos[inicio:inicio + self.FILAS_POR_BLOQUE], bits_query)].sum(axis=1, dtype=np.int32)
+            for inicio in range(0, codigos.shape[0], self.FILAS_POR_BLOQUE)
+        ])
+        return np.cos(np.pi * distancias / dimension).astype(np.float32)
+    
+    def _revisar(self, ids: np.ndarray, query: np.ndarray, aproximadas: np.ndarray) -> np.ndarray:
+        """
+        Volver a puntuar los candidatos con sus embeddings float
+        
+        Sin leer_vectores, o si la lectura falla, se conservan las similitudes
+        aproximadas; también para los candidatos cuyo vector no se encuentra.
+        """
+        if self.leer_vectores is None:
+            return aproximadas
+        
+        try:
+            vectores = self.leer_vectores([int(elemento_id) for elemento_id in ids])
+        except Exception as e:
+            print(f"Error al leer los vectores para volver a puntuar, se usan las similitudes aproximadas: {str(e)}")
+            return aproximadas
+        
+        similitudes = aproximadas.copy()
+        for posicion, vector in enumerate(vectores):
+            if vector is None or len(vector) != query.shape[0]:
+                continue
+            vector = np.asarray(vector, dtype=np.float32)
+            norma = np.linalg.norm(vector)
+            if norma > 0:
+                similitudes[posicion] = float(vector @ query) / norma
+        return similitudes
+    
+    def _construir(self, base: _Version, filas: Iterable[Tuple[int, int, Sequence[float]]]) -> _Version:
+        """
+        Versión nueva con las filas (id, grupo, embedding) agregadas a base
+        
+        Los embeddings se codifican por bloques; base no se modifica.
+        """
+        ids, grupos = [base.ids], [base.grupos]
+        codigos = [base.matriz] if base.matriz is not None and base.matriz.shape[0] > 0 else []
+        dimension, calibracion, vectores = base.dimension, base.calibracion, base.vectores
+        
+        for ids_bloque, grupos_bloque, embeddings in self._bloques(filas):
+            matriz = EmbeddingsService.preparar_matriz(embeddings)
+            if dimension is None:
+                dimension = matriz.shape[1]
+            elif matriz.shape[1] != dimension:
+                raise ProcessingError(f"Dimensiones incompatibles: {matriz.shape[1]} vs {dimension}")
+            ids.append(np.asarray(ids_bloque, dtype=np.int64))
+            grupos.append(np.asarray(grupos_bloque, dtype=np.int64))
+            
+            if self.cuantizacion == 'ninguna':
+                codigos.append(matriz)
+            elif calibracion is None or vectores is not None:
+                # Calibración provisional: recalibrar con todas las filas y volver a codificarlas
+                vectores = matriz if vectores is None else np.vstack([vectores, matriz])
+                calibracion = self._calibrar(vectores)
+                codigos = [self._cuantizar(vectores, calibracion)]
+                if vectores.shape[0] >= self.FILAS_CALIBRACION:
+                    vectores = None
+            else:
+                escala = self._ampliar_escala(calibracion, matriz)
+                if escala is not None:
+                    codigos = [self._reescalar(bloque, calibracion, escala) for bloque in codigos]
+                    calibracion = escala
+                codigos.append(self._cuantizar(matriz, calibracion))
+        
+        return _Version(
+            matriz=(np.vstack(codigos) if len(codigos) > 1 else codigos[0]) if codigos else None,
+            ids=np.concatenate(ids),
+            grupos=np.concatenate(grupos),
+            dimension=dimension,
+            calibracion=calibracion,
+            vectores=vectores
+        )
+    
+    def _bloques(self, filas: Iterable[Tuple[int, int, Sequence[float]]]) -> Iterator[Tuple[list, list, list]]:
+        """Agrupar las filas en bloques (ids, grupos, embeddings) de FILAS_POR_BLOQUE"""
+        ids, grupos, embeddings = [], [], []
+        for elemento_id, grupo, embedding in filas:
+            ids.append(elemento_id)
+            grupos.append(grupo)
+            embeddings.append(embedding)
+            if len(ids) == self.FILAS_POR_BLOQUE:
+                yield ids, grupos, embeddings
+                ids, grupos, embeddings = [], [], []
+        if ids:
+            yield ids, grupos, embeddings
+        
+    @staticmethod
+    def _filtrar(version: _Version, conservar: np.ndarray) -> _Version:
+        """Versión nueva solo con las filas indicadas"""
+        return _Version(
+            matriz=version.matriz[conservar] if version.matriz is not None else None,
+            ids=version.ids[conservar],
+            grupos=version.grupos[conservar],
+            dimension=version.dimension,
+            calibracion=version.calibracion,
+            vectores=version.vectores[conservar] if version.vectores is not None else None
+        )
+        
+    def _calibrar(self, vectores: np.ndarray) -> np.ndarray:
+        """Escala (int8) o media (binaria) de cada dimensión"""
+        if self.cuantizacion == 'binaria':
+            # Los embeddings no están centrados en cero: el signo respecto de la media separa mejor
+            return vectores.mean(axis=0).astype(np.float32)
+        return (np.maximum(np.abs(vectores).max(axis=0), 1e-6) / 127).astype(np.float32)
+        
+    def _cuantizar(self, vectores: np.ndarray, calibracion: np.ndarray) -> np.ndarray:
+        """Convertir vectores normalizados al formato del índice"""
+        if self.cuantizacion == 'binaria':
+            return np.packbits(vectores > calibracion, axis=1)
+        return np.clip(np.rint(vectores / calibracion), -127, 127).astype(np.int8)
+    
+    def _ampliar_escala(self, escala: np.ndarray, vectores: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Escala int8 que cubre los vectores nuevos, o None si saturan pocos valores
+        
+        Solo se amplían las dimensiones que se salen de la escala actual.
+        """
+        if self.cuantizacion != 'int8':
+            return None
+        
+        absolutos = np.abs(vectores)
+        if np.mean(absolutos > escala * 127.5) <= self.SATURACION_MAXIMA:
+            return None
+        return np.maximum(escala, absolutos.max(axis=0) / 127).astype(np.float32)
+    
+    @staticmethod
+    def _reescalar(codigos: np.ndarray, escala: np.ndarray, nueva_escala: np.ndarray) -> np.ndarray:
+        """Pasar códigos int8 de una escala a otra más amplia"""
+        return np.rint(codigos.astype(np.float32) * (escala / nueva_escala)).astype(np.int8)
+    
+    @staticmethod
+    def _validar_longitudes(ids: Sequence[int], grupos: Sequence[int], embeddings: Sequence) -> None:
+        if not (len(ids) == len(grupos) == len(embeddings)):
+            raise ProcessingError("Los ids, grupos y embeddings deben tener la misma longitud")
+        
\ No newline at end of file
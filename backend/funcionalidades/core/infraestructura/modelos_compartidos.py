@@ -0,0 +1,53 @@
+"""
+Registro de modelos compartidos por todo el proceso
+"""
+import threading
+from typing import Any, Callable, Dict, List
+
+_modelos: Dict[str, Any] = {}
+_locks: Dict[str, threading.Lock] = {}
+_registro_lock = threading.Lock()
+
+
+def obtener_modelo(clave: str, fabrica: Callable[[], Any]) -> Any:
+    """
+    Obtener un modelo compartido, cargándolo una sola vez por proceso
+    
+    Si varios hilos piden el mismo modelo a la vez, solo uno lo carga y el
+    resto espera a que termine. Los errores de carga no se guardan, así que
+    una llamada posterior puede volver a intentarlo.
+    
+    Args:
+        clave: Identificador único del modelo
+        fabrica: Función que construye el modelo
+        
+    Returns:
+        Any: Instancia compartida del modelo
+    """
+    modelo = _modelos.get(clave)
+    if modelo is not None:
+        return modelo
+    
+    with _registro_lock:
+        lock = _locks.setdefault(clave, threading.Lock())
+    
+    with lock:
+        modelo = _modelos.get(clave)
+        if modelo is None:
+            modelo = fabrica()
+            _modelos[clave] = modelo
+        return modelo
+
+
+def obtener_sentence_transformer(nombre: str):
+    """Obtener el SentenceTransformer compartido con el nombre indicado"""
+    def fabrica():
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(nombre)
+    
+    return obtener_modelo(f"sentence-transformer:{nombre}", fabrica)
+
+
+def modelos_cargados() -> List[str]:
+    """Listar las claves de los modelos cargados en memoria"""
+    return list(_modelos.keys())
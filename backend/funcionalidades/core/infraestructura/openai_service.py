@@ -2,8 +2,9 @@
 Servicio para integración con OpenAI API
 """
 import openai
-from typing import List, Optional
+from typing import Iterator, List, Optional
 from funcionalidades.core.infraestructura.config import Config
+from funcionalidades.core.infraestructura.contador_tokens import contador_tokens
 from funcionalidades.core.exceptions.domain_exceptions import OpenAIError
 
 
@@ -41,13 +42,16 @@ class OpenAIService:
         except Exception as e:
             raise OpenAIError(f"Error al generar embedding: {str(e)}")
     
-    def generar_respuesta(self, mensaje: str, contexto: str) -> str:
+    def generar_respuesta(self, mensaje: str, contexto: str, historial: Optional[List[dict]] = None,
+                          resumen: Optional[str] = None) -> str:
         """
         Generar respuesta usando GPT con contexto RAG
         
         Args:
             mensaje: Mensaje del usuario
             contexto: Contexto extraído de documentos
+            historial: Turnos recientes de la conversación ({"role", "content"}), del más antiguo al más nuevo
+            resumen: Resumen de los turnos anteriores al historial
             
         Returns:
             str: Respuesta generada
@@ -56,38 +60,192 @@ class OpenAIService:
             OpenAIError: Si hay error en la API
         """
         try:
+            response = self.client.chat.completions.create(
+                model=Config.OPENAI_MODELO,
+                messages=self._construir_mensajes(mensaje, contexto, historial, resumen),
+                max_tokens=800,
+                temperature=0.7
+            )
+            
+            return response.choices[0].message.content.strip()
+            
+        except Exception as e:
+            raise OpenAIError(f"Error al generar respuesta: {str(e)}")
+    
+    def generar_respuesta_stream(self, mensaje: str, contexto: str, historial: Optional[List[dict]] = None,
+                                 resumen: Optional[str] = None) -> Iterator[str]:
+        """
+        Generar respuesta usando GPT con contexto RAG, token a token
+        
+        Args:
+            mensaje: Mensaje del usuario
+            contexto: Contexto extraído de documentos
+            historial: Turnos recientes de la conversación ({"role", "content"}), del más antiguo al más nuevo
+            resumen: Resumen de los turnos anteriores al historial
+            
+        Yields:
+            str: Fragmentos de texto en el orden en que llegan de la API
+            
+        Raises:
+            OpenAIError: Si hay error en la API
+        """
+        try:
+            stream = self.client.chat.completions.create(
+                model=Config.OPENAI_MODELO,
+                messages=self._construir_mensajes(mensaje, contexto, historial, resumen),
+                max_tokens=800,
+                temperature=0.7,
+                stream=True
+            )
+            
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                texto = chunk.choices[0].delta.content
+                if texto:
+                    yield texto
+            
+        except Exception as e:
+            raise OpenAIError(f"Error al generar respuesta: {str(e)}")
+    
+    def resumir_conversacion(self, resumen_anterior: Optional[str], turnos: List[dict], max_tokens: int) -> str:
+        """
+        Incorporar turnos de la conversación a un resumen acumulado
+        
+        Args:
+            resumen_anterior: Resumen vigente, o None si es el primero
+            turnos: Turnos a incorporar ({"role", "content"}), del más antiguo al más nuevo
+            max_tokens: Longitud máxima del nuevo resumen
+            
+        Returns:
+            str: Nuevo resumen
+            
+        Raises:
+            OpenAIError: Si hay error en la API
+        """
+        try:
+            transcripcion = "\n".join(
+                f"{'Usuario' if turno['role'] == 'user' else 'Asistente'}: {turno['content']}" for turno in turnos
+            )
             prompt = f"""
-            Basándote únicamente en el siguiente contexto extraído de documentos:
+            Resumen de la conversación hasta ahora:
+            {resumen_anterior or '(sin resumen)'}
             
-            CONTEXTO:
-            {contexto}
+            Nuevos turnos de la conversación:
+            {transcripcion}
             
-            Responde la siguiente pregunta del usuario de manera clara y concisa. 
+            Escribe un resumen actualizado y breve que conserve los temas consultados, los datos
+            concretos de las respuestas (nombres, cifras, fechas) y lo que el usuario quiere saber.
             
-            Si la pregunta es general (como "de qué trata", "resumen", "explica"), proporciona una respuesta comprehensiva basada en todo el contexto.
-            Si la pregunta es específica, busca la información exacta en el contexto.
+            RESUMEN:
+            """
             
-            Si la información no se encuentra en el contexto proporcionado, responde exactamente: "No poseo información sobre ese tema en el documento cargado."
+            response = self.client.chat.completions.create(
+                model=Config.OPENAI_MODELO,
+                messages=[
+                    {"role": "system", "content": "Eres un asistente que resume conversaciones de forma fiel y concisa."},
+                    {"role": "user", "content": prompt}
+                ],
+                max_tokens=max_tokens,
+                temperature=0.2
+            )
             
-            PREGUNTA: {mensaje}
+            return response.choices[0].message.content.strip()
             
-            RESPUESTA:
+        except Exception as e:
+            raise OpenAIError(f"Error al resumir la conversación: {str(e)}")
+    
+    def resumir_documento(self, texto: str, max_tokens: int, final: bool = False) -> str:
+        """
+        Resumir una sección de un documento o combinar resúmenes de secciones
+        
+        Args:
+            texto: Texto de la sección, o resúmenes de secciones consecutivas
+            max_tokens: Longitud máxima del resumen
+            final: True para el resumen del documento completo
+            
+        Returns:
+            str: Resumen
+            
+        Raises:
+            OpenAIError: Si hay error en la API
+        """
+        try:
+            if final:
+                instrucciones = """Escribe el resumen del documento completo a partir del siguiente texto:
+            de qué trata, sus temas principales y los datos más importantes (nombres, cifras, fechas),
+            en el orden en que aparecen. Conserva las referencias de página entre corchetes."""
+            else:
+                instrucciones = """Resume el siguiente texto, que es una parte de un documento más largo.
+            Conserva los temas tratados y los datos concretos (nombres, cifras, fechas) y las
+            referencias de página entre corchetes."""
+            
+            prompt = f"""
+            {instrucciones}
+            
+            TEXTO:
+            {texto}
+            
+            RESUMEN:
             """
             
             response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
+                model=Config.OPENAI_MODELO,
                 messages=[
-                    {"role": "system", "content": "Eres un asistente que responde preguntas basándose únicamente en el contexto proporcionado."},
+                    {"role": "system", "content": "Eres un asistente que resume documentos de forma fiel y concisa."},
                     {"role": "user", "content": prompt}
                 ],
-                max_tokens=800,
-                temperature=0.7
+                max_tokens=max_tokens,
+                temperature=0.2
             )
             
             return response.choices[0].message.content.strip()
             
         except Exception as e:
-            raise OpenAIError(f"Error al generar respuesta: {str(e)}")
+            raise OpenAIError(f"Error al resumir el documento: {str(e)}")
+    
+    def contar_tokens_prompt(self, mensaje: str, historial: Optional[List[dict]] = None,
+                             resumen: Optional[str] = None) -> int:
+        """Tokens del prompt sin el contexto, para saber cuánto contexto cabe en el presupuesto"""
+        return sum(contador_tokens.contar_mensaje(m['content'])
+                   for m in self._construir_mensajes(mensaje, '', historial, resumen))
+    
+    def _construir_mensajes(self, mensaje: str, contexto: str, historial: Optional[List[dict]] = None,
+                            resumen: Optional[str] = None) -> List[dict]:
+        """
+        Construir los mensajes del chat con el prompt RAG
+        
+        El resumen va en el mensaje de sistema y los turnos recientes como
+        mensajes previos, de modo que el modelo pueda resolver preguntas de
+        seguimiento ("¿y en 2023?") sin que el usuario repita el tema.
+        """
+        prompt = f"""
+            Basándote únicamente en el siguiente contexto extraído de documentos:
+            
+            CONTEXTO:
+            {contexto}
+            
+            Responde la siguiente pregunta del usuario de manera clara y concisa. 
+            
+            Si la pregunta es general (como "de qué trata", "resumen", "explica"), proporciona una respuesta comprehensiva basada en todo el contexto.
+            Si la pregunta es específica, busca la información exacta en el contexto.
+            
+            Si la información no se encuentra en el contexto proporcionado, responde exactamente: "No poseo información sobre ese tema en el documento cargado."
+            
+            PREGUNTA: {mensaje}
+            
+            RESPUESTA:
+            """
+        
+        sistema = "Eres un asistente que responde preguntas basándose únicamente en el contexto proporcionado."
+        if resumen:
+            sistema += f"\n\nResumen de la conversación anterior (úsalo solo para entender a qué se refiere el usuario):\n{resumen}"
+        
+        return [
+            {"role": "system", "content": sistema},
+            *(historial or []),
+            {"role": "user", "content": prompt}
+        ]
     
     def verificar_conexion(self) -> bool:
         """
@@ -0,0 +1,117 @@
+"""
+Grupo de procesos para generar embeddings usando todos los núcleos
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List
+import numpy as np
+from funcionalidades.core.infraestructura.config import Config
+from funcionalidades.core.infraestructura.modelos_compartidos import obtener_modelo, obtener_sentence_transformer
+from funcionalidades.core.exceptions.domain_exceptions import ProcessingError
+
+# Modelo cargado en cada proceso trabajador
+_modelo_trabajador = None
+
+
+def _inicializar_trabajador(nombre_modelo: str, hilos: int):
+    """Cargar el modelo una vez al arrancar cada proceso trabajador"""
+    global _modelo_trabajador
+    
+    # Con varios procesos, cada uno debe usar pocos hilos de torch para no competir por los núcleos
+    try:
+        import torch
+        torch.set_num_threads(hilos)
+    except ImportError:
+        pass
+    
+    # Registro compartido: si el proceso ya cargó el modelo al importar la aplicación, se reutiliza
+    _modelo_trabajador = obtener_sentence_transformer(nombre_modelo)
+
+
+def _codificar(textos: List[str]) -> np.ndarray:
+    """Codificar un lote de textos en el proceso trabajador"""
+    return np.asarray(_modelo_trabajador.encode(textos, batch_size=len(textos)), dtype=np.float32)
+
+
+class PoolEmbeddings:
+    """
+    N procesos, cada uno con su propio SentenceTransformer
+    
+    Los lotes se reparten por la cola compartida de ProcessPoolExecutor, de
+    modo que el proceso que termina primero toma el siguiente. Los procesos se
+    crean con 'spawn' (seguro con torch) al primer uso y el modelo se carga en
+    cada uno durante su inicialización.
+    """
+    
+    def __init__(self, procesos: int, nombre_modelo: str = None, tamano_lote: int = None, hilos_por_proceso: int = None):
+        self.procesos = procesos
+        self.nombre_modelo = nombre_modelo or Config.EMBEDDINGS_MODELO
+        self.tamano_lote = tamano_lote or Config.EMBEDDINGS_LOTE
+        self.hilos_por_proceso = hilos_por_proceso or Config.EMBEDDINGS_HILOS_POR_PROCESO
+        self._executor = None
+        self._lock = threading.Lock()
+    
+    def _obtener_executor(self) -> ProcessPoolExecutor:
+        """Crear el grupo de procesos la primera vez que se usa"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.procesos,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_inicializar_trabajador,
+                    initargs=(self.nombre_modelo, self.hilos_por_proceso)
+                )
+            return self._executor
+    
+    def codificar(self, textos: List[str]) -> np.ndarray:
+        """
+        Generar los embeddings de varios textos repartiéndolos entre los procesos
+        
+        Args:
+            textos: Textos a codificar
+            
+        Returns:
+            np.ndarray: Matriz (len(textos), dimensión) en el mismo orden
+            
+        Raises:
+            ProcessingError: Si un proceso trabajador falla
+        """
+        if not textos:
+            return np.empty((0, 0), dtype=np.float32)
+        
+        # Lotes suficientemente pequeños para que todos los procesos tengan trabajo
+        tamano = max(1, min(self.tamano_lote, -(-len(textos) // self.procesos)))
+        lotes = [textos[i:i + tamano] for i in range(0, len(textos), tamano)]
+        
+        try:
+            resultados = list(self._obtener_executor().map(_codificar, lotes))
+        except BrokenProcessPool as e:
+            # Descartar el grupo roto para que el próximo uso cree uno nuevo
+            self.cerrar(esperar=False)
+            raise ProcessingError(f"Un proceso de embeddings terminó inesperadamente: {str(e)}")
+        except Exception as e:
+            # Errores del modelo en el trabajador, o al enviar o recibir los datos
+            raise ProcessingError(f"Error en un proceso de embeddings: {str(e)}")
+        
+        return np.vstack(resultados)
+    
+    def cerrar(self, esperar: bool = True):
+        """Detener los procesos trabajadores"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=esperar, cancel_futures=True)
+
+
+def obtener_pool_embeddings() -> PoolEmbeddings:
+    """Obtener el grupo de procesos compartido (Config.EMBEDDINGS_PROCESOS, o uno por núcleo)"""
+    def fabrica():
+        pool = PoolEmbeddings(Config.EMBEDDINGS_PROCESOS if Config.EMBEDDINGS_PROCESOS > 0 else os.cpu_count() or 1)
+        atexit.register(pool.cerrar, False)
+        return pool
+    
+    return obtener_modelo(f"pool-embeddings:{Config.EMBEDDINGS_MODELO}", fabrica)
@@ -0,0 +1,112 @@
+"""
+Reordenación de pasajes con un cross-encoder local
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from typing import List, Optional, Sequence
+from funcionalidades.core.infraestructura.config import Config
+from funcionalidades.core.infraestructura.modelos_compartidos import obtener_modelo
+
+
+class ReordenadorService:
+    """
+    Volver a puntuar los pasajes candidatos con un cross-encoder
+    
+    El cross-encoder lee la pregunta y cada pasaje juntos, así que ordena mejor
+    que la similitud entre embeddings, a cambio de una pasada del modelo por
+    par. Todos los candidatos se puntúan en un único lote.
+    
+    La puntuación corre en un hilo propio y se espera como máximo
+    presupuesto_segundos; si no termina a tiempo se devuelve None y el llamador
+    conserva su orden original. El modelo se carga en ese mismo hilo la primera
+    vez que se usa.
+    
+    El hilo atiende un trabajo cada vez y no hay cola: un trabajo que agotó su
+    presupuesto sigue corriendo hasta terminar, y mientras tanto (o mientras se
+    carga el modelo) las consultas nuevas se descartan al momento en lugar de
+    esperar detrás de él.
+    """
+    
+    def __init__(self, nombre_modelo: str = None, presupuesto_segundos: float = None):
+        self.nombre_modelo = nombre_modelo or Config.CHAT_REORDENADOR_MODELO
+        self.presupuesto_segundos = presupuesto_segundos if presupuesto_segundos is not None else Config.CHAT_REORDENADOR_PRESUPUESTO
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='reordenador')
+        self._lock = threading.Lock()
+        self._ocupado = False
+        self._metricas = {'reordenadas': 0, 'fuera_de_presupuesto': 0, 'descartadas': 0, 'errores': 0}
+    
+    def _obtener_modelo(self):
+        def fabrica():
+            from sentence_transformers import CrossEncoder
+            return CrossEncoder(self.nombre_modelo, max_length=Config.CHAT_REORDENADOR_LONGITUD)
+        
+        return obtener_modelo(f"cross-encoder:{self.nombre_modelo}", fabrica)
+    
+    def precargar(self):
+        """Cargar el modelo en segundo plano para que las primeras consultas no agoten el presupuesto"""
+        if self._reservar():
+            self._executor.submit(self._ejecutar_y_liberar, self._obtener_modelo)
+    
+    def puntuar(self, consulta: str, textos: Sequence[str]) -> Optional[List[float]]:
+        """
+        Puntuar la relevancia de cada texto para la consulta
+        
+        Returns:
+            Optional[List[float]]: Una puntuación por texto (mayor es más relevante),
+            o None si no hubo tiempo o el modelo falló
+        """
+        if not textos:
+            return []
+        
+        if not self._reservar():
+            self._contar('descartadas')
+            print("Reordenador ocupado con una consulta anterior, se conserva el orden de la búsqueda")
+            return None
+        
+        inicio = time.perf_counter()
+        futuro = self._executor.submit(self._ejecutar_y_liberar, self._predecir, consulta, list(textos))
+        try:
+            puntuaciones = futuro.result(timeout=self.presupuesto_segundos)
+        except FuturesTimeoutError:
+            # Sigue en su hilo hasta terminar (la carga del modelo se aprovecha después)
+            self._contar('fuera_de_presupuesto')
+            print(f"Reordenación fuera de presupuesto ({self.presupuesto_segundos}s), se conserva el orden de la búsqueda")
+            return None
+        except Exception as e:
+            self._contar('errores')
+            print(f"Error al reordenar pasajes, se conserva el orden de la búsqueda: {str(e)}")
+            return None
+        
+        self._contar('reordenadas')
+        print(f"Pasajes reordenados en {time.perf_counter() - inicio:.3f}s")
+        return puntuaciones
+    
+    def _reservar(self) -> bool:
+        """Ocupar el hilo del reordenador si está libre"""
+        with self._lock:
+            if self._ocupado:
+                return False
+            self._ocupado = True
+            return True
+    
+    def _ejecutar_y_liberar(self, funcion, *argumentos):
+        try:
+            return funcion(*argumentos)
+        finally:
+            with self._lock:
+                self._ocupado = False
+    
+    def _predecir(self, consulta: str, textos: List[str]) -> List[float]:
+        modelo = self._obtener_modelo()
+        puntuaciones = modelo.predict([(consulta, texto) for texto in textos], batch_size=len(textos))
+        return [float(puntuacion) for puntuacion in puntuaciones]
+    
+    def _contar(self, clave: str):
+        with self._lock:
+            self._metricas[clave] += 1
+    
+    def metricas(self) -> dict:
+        """Consultas reordenadas, fuera de presupuesto, descartadas por estar ocupado y con error"""
+        with self._lock:
+            return dict(self._metricas)
@@ -0,0 +1,140 @@
+"""
+Unidad de trabajo por petición: mapa de identidad y conteo de consultas
+"""
+import threading
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_unidad_actual: ContextVar[Optional['UnidadTrabajo']] = ContextVar('unidad_trabajo', default=None)
+
+
+class UnidadTrabajo:
+    """
+    Estado que comparten los repositorios durante una petición
+    
+    Mientras la unidad está activa (``with UnidadTrabajo() as unidad:``) los
+    repositorios guardan en su mapa de identidad las entidades que leen: una
+    segunda lectura de la misma fila en la misma petición devuelve la misma
+    entidad sin volver a la base de datos. También se cuentan las consultas
+    SQL ejecutadas. Fuera de una unidad los repositorios leen siempre de la
+    base de datos.
+    
+    La unidad activa es local al contexto (contextvars), así que cada hilo
+    del grupo que procesa los mensajes del chat tiene la suya.
+    """
+    
+    def __init__(self):
+        self._entidades: Dict[Tuple[str, Hashable], Any] = {}
+        self._token = None
+        self.consultas = 0
+    
+    def __enter__(self) -> 'UnidadTrabajo':
+        self._token = _unidad_actual.set(self)
+        return self
+    
+    def __exit__(self, tipo_excepcion, excepcion, traza):
+        _unidad_actual.reset(self._token)
+        self._entidades.clear()
+        return False
+    
+    def contiene(self, tipo: str, clave: Hashable) -> bool:
+        return (tipo, clave) in self._entidades
+    
+    def obtener(self, tipo: str, clave: Hashable) -> Any:
+        return self._entidades.get((tipo, clave))
+    
+    def registrar(self, tipo: str, clave: Hashable, entidad: Any):
+        self._entidades[(tipo, clave)] = entidad
+    
+    def descartar(self, tipo: str = None):
+        """Olvidar las entidades de un tipo, o todas"""
+        if tipo is None:
+            self._entidades.clear()
+            return
+        for clave in [clave for clave in self._entidades if clave[0] == tipo]:
+            del self._entidades[clave]
+
+
+def unidad_actual() -> Optional[UnidadTrabajo]:
+    """Unidad de trabajo activa en este contexto, si la hay"""
+    return _unidad_actual.get()
+
+
+def obtener_o_cargar(tipo: str, clave: Hashable, cargar: Callable[[], Any]) -> Any:
+    """
+    Devolver la entidad registrada en la unidad activa o cargarla y registrarla
+    
+    También se recuerda que una fila no existe (None), para no volver a
+    buscarla en la misma petición.
+    """
+    unidad = unidad_actual()
+    if unidad is None:
+        return cargar()
+    
+    if unidad.contiene(tipo, clave):
+        return unidad.obtener(tipo, clave)
+    
+    entidad = cargar()
+    unidad.registrar(tipo, clave, entidad)
+    return entidad
+
+
+def obtener_registradas(tipo: str, claves: Iterable[Hashable]) -> Dict[Hashable, Any]:
+    """Entidades de un tipo ya registradas en la unidad activa, por clave"""
+    unidad = unidad_actual()
+    if unidad is None:
+        return {}
+    return {clave: unidad.obtener(tipo, clave) for clave in claves if unidad.contiene(tipo, clave)}
+
+
+def registrar(tipo: str, clave: Hashable, entidad: Any):
+    """Registrar una entidad en la unidad activa (sin unidad no hace nada)"""
+    unidad = unidad_actual()
+    if unidad is not None:
+        unidad.registrar(tipo, clave, entidad)
+
+
+def descartar(tipo: str = None):
+    """Olvidar entidades de la unidad activa tras una escritura que puede cambiarlas"""
+    unidad = unidad_actual()
+    if unidad is not None:
+        unidad.descartar(tipo)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _contar_consulta(conexion, cursor, sentencia, parametros, contexto, varias):
+    unidad = unidad_actual()
+    if unidad is not None:
+        unidad.consultas += 1
+
+
+class EstadisticasConsultas:
+    """Consultas a la base de datos por turno del chat, para las métricas"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.turnos = 0
+        self.consultas = 0
+        self.maximo = 0
+        self.ultimo = 0
+    
+    def registrar(self, consultas: int):
+        with self._lock:
+            self.turnos += 1
+            self.consultas += consultas
+            self.maximo = max(self.maximo, consultas)
+            self.ultimo = consultas
+    
+    def metricas(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                'turnos': self.turnos,
+                'consultas_por_turno': round(self.consultas / self.turnos, 1) if self.turnos else 0,
+                'maximo': self.maximo,
+                'ultimo': self.ultimo
+            }
+
+
+consultas_por_turno = EstadisticasConsultas()
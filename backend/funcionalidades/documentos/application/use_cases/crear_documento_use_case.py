@@ -2,8 +2,9 @@
 Caso de uso para crear un documento
 """
 from typing import Optional
-from funcionalidades.documentos.domain.entities.documento_entity import DocumentoEntity
+from funcionalidades.documentos.domain.entities.documento_entity import DocumentoEntity, ESPACIOS_SIN_SALTO_PAGINA
 from funcionalidades.documentos.domain.repositories.documento_repository import DocumentoRepository
+from funcionalidades.core.infraestructura.hash_utils import calcular_hash_texto
 from funcionalidades.core.exceptions.domain_exceptions import ValidationError, ProcessingError
 
 
@@ -13,13 +14,14 @@ class CrearDocumentoUseCase:
     def __init__(self, documento_repository: DocumentoRepository):
         self.documento_repository = documento_repository
     
-    def ejecutar(self, nombre: str, contenido: str) -> DocumentoEntity:
+    def ejecutar(self, nombre: str, contenido: str, hash_archivo: str = None) -> DocumentoEntity:
         """
         Ejecutar el caso de uso para crear un documento
         
         Args:
             nombre: Nombre del documento
             contenido: Contenido del documento
+            hash_archivo: sha256 del archivo subido, para reconocerlo si se vuelve a subir
             
         Returns:
             DocumentoEntity: Documento creado
@@ -36,7 +38,8 @@ class CrearDocumentoUseCase:
                 contenido=contenido,
                 embeddings=None,
                 fecha_creacion=None,
-                fecha_actualizacion=None
+                fecha_actualizacion=None,
+                hash_archivo=hash_archivo
             )
             
             # Guardar en el repositorio
@@ -48,3 +51,24 @@ class CrearDocumentoUseCase:
             raise
         except Exception as e:
             raise ProcessingError(f"Error al crear el documento: {str(e)}")
+
+    def buscar_duplicado(self, hash_archivo: str = None, contenido: str = None) -> Optional[DocumentoEntity]:
+        """
+        Buscar un documento ya subido con el mismo archivo o el mismo texto
+        
+        Se llama antes de extraer el texto (solo con hash_archivo) y después
+        (con el contenido extraído), para no repetir la extracción ni el
+        procesamiento de un PDF que ya existe.
+        
+        Args:
+            hash_archivo: sha256 del archivo subido
+            contenido: Texto extraído del archivo
+            
+        Returns:
+            Optional[DocumentoEntity]: Documento existente, o None si no hay coincidencia
+        """
+        hash_contenido = None
+        if contenido is not None:
+            hash_contenido = calcular_hash_texto(contenido.strip(ESPACIOS_SIN_SALTO_PAGINA))
+        
+        return self.documento_repository.buscar_por_hash(hash_archivo=hash_archivo, hash_contenido=hash_contenido)
@@ -0,0 +1,111 @@
+"""
+Caso de uso para medir la calidad del índice vectorial cuantizado
+"""
+import random
+import time
+from typing import Dict, List, Sequence
+from funcionalidades.documentos.domain.repositories.documento_repository import DocumentoRepository
+from funcionalidades.core.infraestructura.indice_vectorial import IndiceVectorial
+from funcionalidades.core.infraestructura.config import Config
+from funcionalidades.core.exceptions.domain_exceptions import ValidationError, ProcessingError
+
+
+class EvaluarIndiceUseCase:
+    """
+    Comparar las búsquedas con el índice cuantizado contra la búsqueda exacta
+    
+    Las consultas son los embeddings de una muestra de fragmentos. Para cada
+    una se toman los k más similares con el índice float32 (sin contar el
+    propio fragmento) y se mide qué fracción devuelve cada modo: recall@k.
+    Cada cuantización se mide sin revisión (solo los códigos) y con
+    revisión (los candidatos se vuelven a puntuar con los vectores float,
+    que aquí se leen de memoria en lugar de la base de datos).
+    """
+    
+    def __init__(self, documento_repository: DocumentoRepository):
+        self.documento_repository = documento_repository
+    
+    def ejecutar(self, k: int = 10, consultas: int = 200, factor_revision: int = None,
+                 semilla: int = 0) -> List[Dict]:
+        """
+        Medir recall@k, latencia y memoria de cada modo del índice
+        
+        Args:
+            k: Resultados por consulta
+            consultas: Fragmentos usados como consulta
+            factor_revision: Candidatos por resultado que se vuelven a puntuar
+                (por defecto Config.INDICE_FACTOR_REVISION)
+            semilla: Semilla de la muestra, para repetir la medición
+            
+        Returns:
+            List[Dict]: Un resultado por modo con recall, latencia_ms, memoria_bytes y reduccion
+            
+        Raises:
+            ValidationError: Si los parámetros son inválidos o no hay fragmentos suficientes
+            ProcessingError: Si hay error al leer los embeddings o al buscar
+        """
+        if k <= 0 or consultas <= 0:
+            raise ValidationError("k y el número de consultas deben ser positivos")
+        factor_revision = factor_revision or Config.INDICE_FACTOR_REVISION
+        
+        try:
+            filas = list(self.documento_repository.iterar_embeddings_fragmentos())
+        except Exception as e:
+            raise ProcessingError(f"Error al leer los embeddings de los fragmentos: {str(e)}")
+        
+        if len(filas) <= k:
+            raise ValidationError(f"Se necesitan más de {k} fragmentos con embeddings para evaluar el índice")
+        
+        ids = [fila[0] for fila in filas]
+        grupos = [fila[1] for fila in filas]
+        embeddings = [fila[2] for fila in filas]
+        vectores = dict(zip(ids, embeddings))
+        muestra = random.Random(semilla).sample(range(len(filas)), min(consultas, len(filas)))
+        
+        try:
+            exacto = IndiceVectorial()
+            exacto.cargar(ids, grupos, embeddings)
+            esperados = {posicion: self._vecinos(exacto, ids[posicion], embeddings[posicion], k) for posicion in muestra}
+            
+            resultados = [self._medir('float32', exacto, ids, embeddings, muestra, esperados, k)]
+            for cuantizacion in ('int8', 'binaria'):
+                for revision in (False, True):
+                    indice = IndiceVectorial(
+                        cuantizacion=cuantizacion,
+                        factor_revision=factor_revision if revision else 1,
+                        leer_vectores=(lambda candidatos: [vectores.get(candidato) for candidato in candidatos]) if revision else None
+                    )
+                    indice.cargar(ids, grupos, embeddings)
+                    nombre = f"{cuantizacion} + revisión x{factor_revision}" if revision else cuantizacion
+                    resultados.append(self._medir(nombre, indice, ids, embeddings, muestra, esperados, k))
+        except Exception as e:
+            raise ProcessingError(f"Error al evaluar el índice: {str(e)}")
+        
+        memoria_exacta = resultados[0]['memoria_bytes']
+        for resultado in resultados:
+            resultado['reduccion'] = round(memoria_exacta / resultado['memoria_bytes'], 1)
+        return resultados
+    
+    def _medir(self, nombre: str, indice: IndiceVectorial, ids: List[int], embeddings: List,
+               muestra: List[int], esperados: Dict[int, List[int]], k: int) -> Dict:
+        """recall@k medio y latencia media de un índice sobre la muestra"""
+        aciertos = 0.0
+        inicio = time.perf_counter()
+        for posicion in muestra:
+            encontrados = set(self._vecinos(indice, ids[posicion], embeddings[posicion], k))
+            esperado = esperados[posicion]
+            aciertos += len(encontrados.intersection(esperado)) / len(esperado)
+        segundos = time.perf_counter() - inicio
+        
+        return {
+            'modo': nombre,
+            'recall': round(aciertos / len(muestra), 4),
+            'latencia_ms': round(segundos * 1000 / len(muestra), 3),
+            'memoria_bytes': indice.memoria_bytes()
+        }
+    
+    @staticmethod
+    def _vecinos(indice: IndiceVectorial, consulta_id: int, embedding: Sequence[float], k: int) -> List[int]:
+        """Los k más similares a un fragmento, sin contarlo a él mismo"""
+        resultados = indice.buscar(embedding, limite=k + 1, umbral=-1.0)
+        return [elemento_id for elemento_id, _ in resultados if elemento_id != consulta_id][:k]
@@ -0,0 +1,95 @@
+"""
+Caso de uso para crear y procesar un documento a partir de las páginas de su PDF
+"""
+from typing import Iterable, Iterator, List, Tuple
+from funcionalidades.documentos.domain.entities.documento_entity import DocumentoEntity, CONTENIDO_MAXIMO
+from funcionalidades.documentos.application.use_cases.crear_documento_use_case import CrearDocumentoUseCase
+from funcionalidades.documentos.application.use_cases.procesar_documento_use_case import ProcesarDocumentoUseCase
+from funcionalidades.core.infraestructura.extraccion_pdf_service import SEPARADOR_PAGINAS
+from funcionalidades.core.exceptions.domain_exceptions import ValidationError, ProcessingError
+
+
+class IngestarDocumentoUseCase:
+    """
+    Caso de uso para crear un documento procesándolo mientras se extraen sus páginas
+    
+    Cada página se fragmenta y se codifica en cuanto llega, así que el modelo de
+    embeddings trabaja mientras el PDF todavía se está leyendo. El documento se
+    crea al final, cuando ya se conoce su texto completo para buscar duplicados;
+    los fragmentos de un duplicado no se vuelven a codificar porque sus
+    embeddings se reutilizan de la base de datos.
+    """
+    
+    def __init__(self, crear_documento_use_case: CrearDocumentoUseCase,
+                 procesar_documento_use_case: ProcesarDocumentoUseCase):
+        self.crear_documento_use_case = crear_documento_use_case
+        self.procesar_documento_use_case = procesar_documento_use_case
+    
+    def ejecutar(self, nombre: str, paginas: Iterable[Tuple[int, str]],
+                 hash_archivo: str = None) -> Tuple[DocumentoEntity, bool]:
+        """
+        Ejecutar el caso de uso para ingerir un documento
+        
+        Si la codificación falla, el documento se crea igualmente sin procesar
+        y se puede procesar después; si falla la extracción, no se crea. Si el
+        texto supera CONTENIDO_MAXIMO se rechaza en cuanto se pasa del límite,
+        sin extraer ni codificar las páginas restantes.
+        
+        Args:
+            nombre: Nombre del documento
+            paginas: Pares (número de página, texto), p. ej. de ExtraccionPdfService.iterar_paginas
+            hash_archivo: sha256 del archivo subido
+            
+        Returns:
+            Tuple[DocumentoEntity, bool]: Documento y si ya existía con el mismo texto
+            
+        Raises:
+            ValidationError: Si el PDF no tiene texto o tiene demasiado
+            ProcessingError: Si hay error en la extracción o al guardar
+        """
+        textos_paginas: List[str] = []
+        errores_extraccion: List[Exception] = []
+        
+        def registrar_paginas() -> Iterator[Tuple[int, str]]:
+            # Longitud del contenido final: las páginas unidas con SEPARADOR_PAGINAS
+            caracteres = -len(SEPARADOR_PAGINAS)
+            try:
+                for numero, texto in paginas:
+                    caracteres += len(SEPARADOR_PAGINAS) + len(texto)
+                    if caracteres > CONTENIDO_MAXIMO:
+                        raise ValidationError("El contenido del documento es demasiado grande")
+                    textos_paginas.append(texto)
+                    yield numero, texto
+            except Exception as e:
+                errores_extraccion.append(e)
+                raise
+        
+        paginas_registradas = registrar_paginas()
+        try:
+            paginas_y_textos, embeddings = self.procesar_documento_use_case.codificar_paginas(paginas_registradas)
+        except Exception as e:
+            if errores_extraccion:
+                raise
+            
+            # Terminar de leer el PDF: el documento se guarda sin procesar
+            print(f"Error al codificar el documento {nombre}, se guarda sin procesar: {str(e)}")
+            for _ in paginas_registradas:
+                pass
+            paginas_y_textos, embeddings = [], []
+        
+        contenido = SEPARADOR_PAGINAS.join(textos_paginas)
+        if not contenido.strip():
+            raise ValidationError("No se pudo extraer texto del archivo PDF")
+        
+        existente = self.crear_documento_use_case.buscar_duplicado(contenido=contenido)
+        if existente:
+            return existente, True
+        
+        documento = self.crear_documento_use_case.ejecutar(nombre, contenido, hash_archivo)
+        if not embeddings:
+            return documento, False
+        
+        try:
+            return self.procesar_documento_use_case.guardar_codificados(documento, paginas_y_textos, embeddings), False
+        except Exception as e:
+            raise ProcessingError(f"Error al guardar los fragmentos del documento: {str(e)}")
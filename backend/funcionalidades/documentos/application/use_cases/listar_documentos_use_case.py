@@ -1,10 +1,11 @@
 """
 Caso de uso para listar documentos
 """
-from typing import List
-from funcionalidades.documentos.domain.entities.documento_entity import DocumentoEntity
+from typing import List, Optional, Tuple
+from funcionalidades.documentos.domain.entities.documento_resumen_entity import DocumentoResumenEntity
 from funcionalidades.documentos.domain.repositories.documento_repository import DocumentoRepository
-from funcionalidades.core.exceptions.domain_exceptions import ProcessingError
+from funcionalidades.core.infraestructura.config import Config
+from funcionalidades.core.exceptions.domain_exceptions import ValidationError, ProcessingError
 
 
 class ListarDocumentosUseCase:
@@ -13,19 +14,46 @@ class ListarDocumentosUseCase:
     def __init__(self, documento_repository: DocumentoRepository):
         self.documento_repository = documento_repository
     
-    def ejecutar(self) -> List[DocumentoEntity]:
+    def ejecutar(self, limite: int = None, antes_de: int = None, procesado: Optional[bool] = None,
+                 nombre: Optional[str] = None) -> Tuple[List[DocumentoResumenEntity], Optional[int]]:
         """
         Ejecutar el caso de uso para listar documentos
         
+        Devuelve una página de documentos, del más reciente al más antiguo, sin
+        leer su contenido. Para la página siguiente se pasa como antes_de el
+        cursor devuelto.
+        
+        Args:
+            limite: Documentos por página (por defecto Config.DOCUMENTOS_POR_PAGINA)
+            antes_de: Cursor: listar los documentos con ID menor a este
+            procesado: Filtrar por documentos procesados (True) o pendientes (False)
+            nombre: Filtrar por nombre que contenga este texto
+            
         Returns:
-            List[DocumentoEntity]: Lista de documentos
+            Tuple[List[DocumentoResumenEntity], Optional[int]]: (documentos, cursor de la
+                página siguiente o None si no hay más)
             
         Raises:
+            ValidationError: Si los parámetros son inválidos
             ProcessingError: Si hay error en el procesamiento
         """
+        limite = limite if limite is not None else Config.DOCUMENTOS_POR_PAGINA
+        if limite < 1:
+            raise ValidationError("El límite debe ser mayor a 0")
+        if antes_de is not None and antes_de < 1:
+            raise ValidationError("El cursor debe ser un ID de documento válido")
+        limite = min(limite, Config.DOCUMENTOS_POR_PAGINA_MAXIMO)
+        
         try:
-            documentos = self.documento_repository.listar()
-            return documentos
+            # Pedir uno más para saber si hay otra página sin contar todos los documentos
+            documentos = self.documento_repository.listar_resumen(
+                limite + 1, antes_de_id=antes_de, procesado=procesado, nombre=nombre
+            )
+            
+            if len(documentos) > limite:
+                documentos = documentos[:limite]
+                return documentos, documentos[-1].id
+            return documentos, None
             
         except Exception as e:
             raise ProcessingError(f"Error al listar documentos: {str(e)}")
@@ -1,26 +1,47 @@
 """
 Caso de uso para procesar documento y generar embeddings
 """
-from typing import List
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 from funcionalidades.documentos.domain.entities.documento_entity import DocumentoEntity
+from funcionalidades.documentos.domain.entities.fragmento_entity import FragmentoEntity
 from funcionalidades.documentos.domain.repositories.documento_repository import DocumentoRepository
+from funcionalidades.documentos.application.use_cases.resumir_documento_use_case import ResumirDocumentoUseCase
 from funcionalidades.core.infraestructura.embeddings_service import EmbeddingsService
+from funcionalidades.core.infraestructura.fragmentacion_service import FragmentacionService
+from funcionalidades.core.infraestructura.config import Config
+from funcionalidades.core.infraestructura.hash_utils import calcular_hash_texto
+from funcionalidades.core.infraestructura.pool_embeddings import obtener_pool_embeddings
 from funcionalidades.core.exceptions.domain_exceptions import NotFoundError, ProcessingError
 
 
 class ProcesarDocumentoUseCase:
     """Caso de uso para procesar documento y generar embeddings"""
     
-    def __init__(self, documento_repository: DocumentoRepository, embeddings_service: EmbeddingsService):
+    def __init__(self, documento_repository: DocumentoRepository, embeddings_service: EmbeddingsService,
+                 fragmentacion_service: FragmentacionService = None, usar_procesos: bool = None,
+                 resumir_documento_use_case: ResumirDocumentoUseCase = None):
         self.documento_repository = documento_repository
         self.embeddings_service = embeddings_service
+        self.fragmentacion_service = fragmentacion_service or FragmentacionService()
+        self.resumir_documento_use_case = resumir_documento_use_case
+        
+        # Con varios procesos de embeddings, cada uno carga su propio modelo y usa un núcleo
+        if usar_procesos is None:
+            usar_procesos = Config.EMBEDDINGS_PROCESOS != 0
+        self.pool_embeddings = obtener_pool_embeddings() if usar_procesos else None
     
-    def ejecutar(self, documento_id: int) -> DocumentoEntity:
+    def ejecutar(self, documento_id: int, resumir: bool = True) -> DocumentoEntity:
         """
         Ejecutar el caso de uso para procesar un documento
         
+        Divide el contenido en fragmentos solapados, genera un embedding por
+        fragmento y guarda en el documento el embedding promedio. Por último
+        genera el resumen del documento, si hay un caso de uso para ello.
+        
         Args:
             documento_id: ID del documento a procesar
+            resumir: False para dejar el resumen a quien llama
             
         Returns:
             DocumentoEntity: Documento procesado con embeddings
@@ -36,52 +57,240 @@ class ProcesarDocumentoUseCase:
             if not documento:
                 raise NotFoundError(f"Documento con ID {documento_id} no encontrado")
             
-            # Verificar si ya tiene embeddings
-            if documento.tiene_embeddings():
-                return documento
-            
-            # Generar embedding del contenido
-            embedding = self.embeddings_service.generar_embedding(documento.contenido)
+            # Verificar si ya está procesado (los procesados antes de existir los resúmenes lo reciben ahora)
+            if self._esta_procesado(documento):
+                return self._resumir(documento) if resumir else documento
             
-            # Actualizar documento con embeddings
-            documento.actualizar_embeddings(embedding)
+            # Fragmentar el contenido conservando la página de cada fragmento
+            paginas_y_textos = self.fragmentacion_service.fragmentar_documento(documento.contenido)
+            if not paginas_y_textos:
+                raise ProcessingError("El documento no tiene contenido para fragmentar")
             
-            # Guardar en repositorio
-            documento_actualizado = self.documento_repository.modificar(documento)
+            # Generar los embeddings de todos los fragmentos en lotes
+            embeddings = self._generar_embeddings([texto for _, texto in paginas_y_textos])
+            documento_actualizado = self.guardar_codificados(documento, paginas_y_textos, embeddings)
             
-            return documento_actualizado
+            return self._resumir(documento_actualizado) if resumir else documento_actualizado
             
         except NotFoundError:
             raise
         except Exception as e:
             raise ProcessingError(f"Error al procesar documento: {str(e)}")
     
-    def procesar_todos_los_documentos(self) -> List[DocumentoEntity]:
+    def codificar_paginas(self, paginas: Iterable[Tuple[int, str]]) -> Tuple[List[Tuple[int, str]], List[List[float]]]:
+        """
+        Fragmentar y codificar las páginas de un documento a medida que llegan
+        
+        Cada vez que se juntan Config.EMBEDDINGS_LOTE fragmentos se codifican, sin
+        esperar a la última página: la generación de embeddings empieza mientras
+        el PDF todavía se está leyendo.
+        
+        Args:
+            paginas: Pares (número de página, texto) en orden
+            
+        Returns:
+            Tuple: Pares (página, fragmento) y el embedding de cada fragmento
+        """
+        paginas_y_textos = []
+        embeddings = []
+        pendientes = []
+        for pagina, texto in self.fragmentacion_service.fragmentar_paginas(paginas):
+            paginas_y_textos.append((pagina, texto))
+            pendientes.append(texto)
+            if len(pendientes) >= Config.EMBEDDINGS_LOTE:
+                embeddings.extend(self._generar_embeddings(pendientes))
+                pendientes = []
+        
+        if pendientes:
+            embeddings.extend(self._generar_embeddings(pendientes))
+        return paginas_y_textos, embeddings
+    
+    def guardar_codificados(self, documento: DocumentoEntity, paginas_y_textos: List[Tuple[Optional[int], str]],
+                            embeddings: List[List[float]]) -> DocumentoEntity:
+        """Guardar los fragmentos ya codificados de un documento y su embedding promedio"""
+        fragmentos = self._crear_fragmentos(documento.id, paginas_y_textos, embeddings)
+        self.documento_repository.guardar_fragmentos(documento.id, fragmentos)
+        
+        # Actualizar documento con el embedding promedio de sus fragmentos
+        documento.actualizar_embeddings(self.embeddings_service.promediar_embeddings(embeddings))
+        return self.documento_repository.modificar(documento)
+    
+    def contar_pendientes(self) -> int:
+        """Contar los documentos que procesar_todos_los_documentos procesaría"""
+        return self.documento_repository.contar_pendientes()
+    
+    def procesar_todos_los_documentos(self, documentos_por_lote: int = None,
+                                      al_procesar: Optional[Callable[[int, bool], None]] = None) -> Dict[str, Any]:
         """
         Procesar todos los documentos que no tienen embeddings
         
+        Los documentos pendientes se leen por páginas de documentos_por_lote. Los
+        fragmentos de cada página se codifican juntos (en lotes de
+        Config.EMBEDDINGS_LOTE) y se guardan en una sola transacción. Si una página
+        falla, sus documentos se reintentan uno a uno para no perder el resto. Los
+        resúmenes se generan al final, para que las llamadas a OpenAI no retrasen
+        los embeddings del resto de documentos; los segundos y los documentos por
+        segundo no los incluyen.
+        
+        Args:
+            documentos_por_lote: Documentos por página (por defecto Config.PROCESAMIENTO_LOTE_DOCUMENTOS)
+            al_procesar: Función que recibe (documento_id, exito) al terminar cada documento
+            
         Returns:
-            List[DocumentoEntity]: Lista de documentos procesados
+            Dict[str, Any]: Documentos y fragmentos procesados, IDs con error, segundos y documentos por segundo
             
         Raises:
             ProcessingError: Si hay error en el procesamiento
-            OpenAIError: Si hay error con OpenAI
         """
         try:
-            documentos = self.documento_repository.listar()
-            documentos_sin_embeddings = [doc for doc in documentos if not doc.tiene_embeddings()]
+            documentos_por_lote = documentos_por_lote or Config.PROCESAMIENTO_LOTE_DOCUMENTOS
+            inicio = time.perf_counter()
+            procesados = 0
+            fragmentos_totales = 0
+            documentos_con_error = []
+            por_resumir = []
+            ultimo_id = 0
             
-            documentos_procesados = []
-            for documento in documentos_sin_embeddings:
+            while True:
+                documentos = self.documento_repository.listar_pendientes(documentos_por_lote, despues_de_id=ultimo_id)
+                if not documentos:
+                    break
+                ultimo_id = documentos[-1].id
+                
                 try:
-                    documento_procesado = self.ejecutar(documento.id)
-                    documentos_procesados.append(documento_procesado)
+                    fragmentos_totales += self._procesar_lote(documentos)
+                    procesados += len(documentos)
+                    for documento in documentos:
+                        por_resumir.append(documento.id)
+                        if al_procesar:
+                            al_procesar(documento.id, True)
                 except Exception as e:
-                    # Continuar con otros documentos si uno falla
-                    print(f"Error procesando documento {documento.id}: {str(e)}")
-                    continue
+                    print(f"Error procesando lote de documentos, se reintentan uno a uno: {str(e)}")
+                    for documento in documentos:
+                        try:
+                            self.ejecutar(documento.id, resumir=False)
+                            procesados += 1
+                            por_resumir.append(documento.id)
+                            exito = True
+                        except Exception as e:
+                            # Continuar con otros documentos si uno falla
+                            print(f"Error procesando documento {documento.id}: {str(e)}")
+                            documentos_con_error.append(documento.id)
+                            exito = False
+                        if al_procesar:
+                            al_procesar(documento.id, exito)
+            
+            segundos = time.perf_counter() - inicio
+            self._resumir_documentos(por_resumir)
             
-            return documentos_procesados
+            return {
+                'documentos_procesados': procesados,
+                'fragmentos_generados': fragmentos_totales,
+                'errores': len(documentos_con_error),
+                'documentos_con_error': documentos_con_error,
+                'segundos': round(segundos, 3),
+                'documentos_por_segundo': round(procesados / segundos, 2) if segundos > 0 else 0.0
+            }
             
         except Exception as e:
             raise ProcessingError(f"Error al procesar documentos: {str(e)}")
+    
+    def _procesar_lote(self, documentos: List[DocumentoEntity]) -> int:
+        """Fragmentar y codificar una página de documentos y guardarla en una transacción"""
+        textos_por_documento = [self.fragmentacion_service.fragmentar_documento(documento.contenido) for documento in documentos]
+        vacios = [documento.id for documento, textos in zip(documentos, textos_por_documento) if not textos]
+        if vacios:
+            raise ProcessingError(f"Documentos sin contenido para fragmentar: {vacios}")
+        
+        # Una sola lista de textos para aprovechar los lotes del modelo
+        todos_los_textos = [texto for textos in textos_por_documento for _, texto in textos]
+        embeddings = self._generar_embeddings(todos_los_textos)
+        
+        fragmentos = []
+        posicion = 0
+        for documento, textos in zip(documentos, textos_por_documento):
+            embeddings_documento = embeddings[posicion:posicion + len(textos)]
+            posicion += len(textos)
+            
+            fragmentos.extend(self._crear_fragmentos(documento.id, textos, embeddings_documento))
+            documento.actualizar_embeddings(self.embeddings_service.promediar_embeddings(embeddings_documento))
+        
+        self.documento_repository.guardar_lote(documentos, fragmentos)
+        return len(fragmentos)
+    
+    def _generar_embeddings(self, textos: List[str]) -> List[List[float]]:
+        """
+        Generar los embeddings de los fragmentos, reutilizando los ya guardados
+        
+        Primero se buscan en la caché de embeddings; solo los que no están se
+        buscan en la base de datos: un fragmento con el mismo texto que otro ya
+        procesado con el mismo modelo (en este u otro documento) toma su
+        embedding, así que al volver a subir un documento editado solo se
+        codifican los fragmentos que cambiaron.
+        """
+        embeddings = self.embeddings_service.obtener_en_cache(textos)
+        hashes = [calcular_hash_texto(texto.strip()) for texto in textos]
+        
+        sin_cache = [hash_texto for hash_texto, embedding in zip(hashes, embeddings) if embedding is None]
+        existentes = self.documento_repository.obtener_embeddings_por_hash(
+            sin_cache, self.embeddings_service.nombre_modelo
+        ) if sin_cache else {}
+        
+        faltantes = [texto for texto, hash_texto, embedding in zip(textos, hashes, embeddings)
+                     if embedding is None and hash_texto not in existentes]
+        nuevos = iter(self.embeddings_service.generar_embeddings_lote(faltantes, pool=self.pool_embeddings)
+                      if faltantes else [])
+        
+        if len(faltantes) < len(textos):
+            print(f"Embeddings reutilizados: {len(textos) - len(faltantes)} de {len(textos)} fragmentos")
+        return [
+            embedding if embedding is not None else existentes[hash_texto] if hash_texto in existentes else next(nuevos)
+            for hash_texto, embedding in zip(hashes, embeddings)
+        ]
+    
+    def _crear_fragmentos(self, documento_id: int, paginas_y_textos: List[Tuple[Optional[int], str]],
+                          embeddings: List[List[float]]) -> List[FragmentoEntity]:
+        """Crear las entidades de fragmento de un documento a partir de pares (página, texto)"""
+        return [
+            FragmentoEntity(
+                id=None,
+                documento_id=documento_id,
+                indice=indice,
+                contenido=texto,
+                embeddings=embedding,
+                pagina=pagina,
+                modelo_embeddings=self.embeddings_service.nombre_modelo
+            )
+            for indice, ((pagina, texto), embedding) in enumerate(zip(paginas_y_textos, embeddings))
+        ]
+    
+    def _resumir(self, documento: DocumentoEntity) -> DocumentoEntity:
+        """
+        Generar el resumen del documento ya procesado
+        
+        Un error aquí no marca el documento como fallido: ya se puede buscar en
+        él, y las preguntas generales usan sus fragmentos hasta que tenga resumen.
+        """
+        if not self.resumir_documento_use_case:
+            return documento
+        
+        try:
+            return self.resumir_documento_use_case.resumir(documento)
+        except Exception as e:
+            print(f"Error generando el resumen del documento {documento.id}: {str(e)}")
+            return documento
+    
+    def _resumir_documentos(self, documentos_ids: List[int]):
+        """Generar el resumen de varios documentos ya procesados, leyéndolos de uno en uno"""
+        if not self.resumir_documento_use_case:
+            return
+        
+        for documento_id in documentos_ids:
+            try:
+                self.resumir_documento_use_case.ejecutar(documento_id)
+            except Exception as e:
+                print(f"Error generando el resumen del documento {documento_id}: {str(e)}")
+    
+    def _esta_procesado(self, documento: DocumentoEntity) -> bool:
+        """Un documento está procesado si tiene embeddings y fragmentos indexados"""
+        return documento.tiene_embeddings() and self.documento_repository.tiene_fragmentos(documento.id)
@@ -0,0 +1,141 @@
+"""
+Caso de uso para procesar documentos mediante trabajos en segundo plano
+"""
+import time
+from typing import Callable, Optional
+from funcionalidades.documentos.domain.entities.trabajo_entity import TrabajoEntity
+from funcionalidades.documentos.domain.repositories.documento_repository import DocumentoRepository
+from funcionalidades.documentos.domain.repositories.trabajo_repository import TrabajoRepository
+from funcionalidades.documentos.application.use_cases.procesar_documento_use_case import ProcesarDocumentoUseCase
+from funcionalidades.core.infraestructura.config import Config
+from funcionalidades.core.exceptions.domain_exceptions import NotFoundError, ProcessingError
+
+
+class ProcesarEnSegundoPlanUseCase:
+    """
+    Caso de uso para crear y ejecutar trabajos de procesamiento
+    
+    crear_trabajo registra el trabajo y devuelve su ID de inmediato; ejecutar
+    lo corre (normalmente desde un hilo en segundo plano), guarda el progreso
+    después de cada documento y reintenta los documentos que fallaron.
+    """
+    
+    def __init__(self, trabajo_repository: TrabajoRepository, documento_repository: DocumentoRepository,
+                 procesar_documento_use_case: ProcesarDocumentoUseCase):
+        self.trabajo_repository = trabajo_repository
+        self.documento_repository = documento_repository
+        self.procesar_documento_use_case = procesar_documento_use_case
+    
+    def crear_trabajo(self, documento_id: int = None) -> TrabajoEntity:
+        """
+        Registrar un trabajo para un documento o, sin documento_id, para todos los pendientes
+        
+        Raises:
+            NotFoundError: Si el documento no existe
+            ProcessingError: Si hay error al guardar el trabajo
+        """
+        if documento_id is not None and not self.documento_repository.get_by_id(documento_id):
+            raise NotFoundError(f"Documento con ID {documento_id} no encontrado")
+        
+        trabajo = TrabajoEntity(
+            id=None,
+            tipo=TrabajoEntity.TIPO_DOCUMENTO if documento_id is not None else TrabajoEntity.TIPO_TODOS,
+            documento_id=documento_id,
+            total=1 if documento_id is not None else 0
+        )
+        return self.trabajo_repository.agregar(trabajo)
+    
+    def obtener(self, trabajo_id: int) -> TrabajoEntity:
+        """
+        Obtener el estado de un trabajo
+        
+        Raises:
+            NotFoundError: Si el trabajo no existe
+        """
+        trabajo = self.trabajo_repository.get_by_id(trabajo_id)
+        if not trabajo:
+            raise NotFoundError(f"Trabajo con ID {trabajo_id} no encontrado")
+        return trabajo
+    
+    def marcar_fallido(self, trabajo: TrabajoEntity, error: str) -> TrabajoEntity:
+        """Marcar un trabajo como fallido sin ejecutarlo (p. ej. si no se pudo encolar)"""
+        trabajo.finalizar(error)
+        return self.trabajo_repository.modificar(trabajo)
+    
+    def ejecutar(self, trabajo_id: int,
+                 al_progresar: Optional[Callable[[TrabajoEntity, Optional[int]], None]] = None) -> TrabajoEntity:
+        """
+        Ejecutar un trabajo registrado
+        
+        Args:
+            trabajo_id: ID del trabajo
+            al_progresar: Función que recibe (trabajo, documento_id) después de cada
+                documento y al cambiar el estado del trabajo (documento_id None)
+                
+        Returns:
+            TrabajoEntity: Trabajo con su estado final
+        """
+        trabajo = self.obtener(trabajo_id)
+        if trabajo.esta_terminado():
+            return trabajo
+        
+        def notificar(documento_id: Optional[int] = None):
+            if al_progresar:
+                try:
+                    al_progresar(trabajo, documento_id)
+                except Exception as e:
+                    print(f"Error notificando progreso del trabajo {trabajo.id}: {str(e)}")
+        
+        def registrar(documento_id: int, exito: bool):
+            trabajo.registrar_documento(documento_id, exito)
+            self.trabajo_repository.modificar(trabajo)
+            notificar(documento_id)
+        
+        try:
+            if trabajo.tipo == TrabajoEntity.TIPO_DOCUMENTO:
+                trabajo.iniciar(total=1)
+                self.trabajo_repository.modificar(trabajo)
+                notificar()
+                
+                registrar(trabajo.documento_id, self._procesar_documento(trabajo.documento_id))
+            else:
+                trabajo.iniciar(total=self.procesar_documento_use_case.contar_pendientes())
+                self.trabajo_repository.modificar(trabajo)
+                notificar()
+                
+                self.procesar_documento_use_case.procesar_todos_los_documentos(al_procesar=registrar)
+            
+            self._reintentar_fallidos(trabajo, registrar)
+            trabajo.finalizar()
+            
+        except Exception as e:
+            print(f"Error ejecutando trabajo {trabajo.id}: {str(e)}")
+            trabajo.finalizar(str(e))
+        
+        try:
+            trabajo = self.trabajo_repository.modificar(trabajo)
+        except ProcessingError as e:
+            print(f"Error guardando el estado final del trabajo {trabajo.id}: {str(e)}")
+        notificar()
+        
+        return trabajo
+    
+    def _reintentar_fallidos(self, trabajo: TrabajoEntity, registrar: Callable[[int, bool], None]):
+        """Reintentar uno a uno los documentos fallidos, esperando entre rondas"""
+        for intento in range(Config.TRABAJOS_REINTENTOS):
+            if not trabajo.documentos_fallidos:
+                return
+            
+            time.sleep(Config.TRABAJOS_ESPERA_REINTENTO * (intento + 1))
+            for documento_id in list(trabajo.documentos_fallidos):
+                if self._procesar_documento(documento_id):
+                    registrar(documento_id, True)
+    
+    def _procesar_documento(self, documento_id: int) -> bool:
+        """Procesar un documento sin propagar el error"""
+        try:
+            self.procesar_documento_use_case.ejecutar(documento_id)
+            return True
+        except Exception as e:
+            print(f"Error procesando documento {documento_id}: {str(e)}")
+            return False
@@ -0,0 +1,141 @@
+"""
+Caso de uso para generar el resumen de un documento
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+from funcionalidades.documentos.domain.entities.documento_entity import DocumentoEntity
+from funcionalidades.documentos.domain.repositories.documento_repository import DocumentoRepository
+from funcionalidades.core.infraestructura.openai_service import OpenAIService
+from funcionalidades.core.infraestructura.contador_tokens import ContadorTokens, contador_tokens
+from funcionalidades.core.infraestructura.extraccion_pdf_service import SEPARADOR_PAGINAS
+from funcionalidades.core.infraestructura.fragmentacion_service import FragmentacionService
+from funcionalidades.core.infraestructura.config import Config
+from funcionalidades.core.exceptions.domain_exceptions import NotFoundError, ProcessingError
+
+
+class ResumirDocumentoUseCase:
+    """
+    Caso de uso para generar el resumen jerárquico de un documento
+    
+    El contenido se divide en secciones de páginas consecutivas que caben en
+    Config.DOCUMENTOS_RESUMEN_SECCION_TOKENS y cada sección se resume por
+    separado, varias a la vez. Los resúmenes de sección se combinan en el
+    resumen del documento, en varias rondas si no caben juntos en una sola
+    llamada. Un documento que cabe en una sección se resume con una llamada.
+    """
+    
+    # Rondas de combinación antes de recortar los resúmenes que aún no caben juntos
+    RONDAS_MAXIMAS = 5
+    
+    def __init__(self, documento_repository: DocumentoRepository, openai_service: OpenAIService,
+                 contador: ContadorTokens = None):
+        self.documento_repository = documento_repository
+        self.openai_service = openai_service
+        self.contador = contador or contador_tokens
+    
+    def ejecutar(self, documento_id: int) -> DocumentoEntity:
+        """
+        Generar y guardar el resumen de un documento
+        
+        Raises:
+            NotFoundError: Si el documento no existe
+            ProcessingError: Si hay error al generar o guardar el resumen
+        """
+        documento = self.documento_repository.get_by_id(documento_id)
+        if not documento:
+            raise NotFoundError(f"Documento con ID {documento_id} no encontrado")
+        return self.resumir(documento)
+    
+    def resumir(self, documento: DocumentoEntity) -> DocumentoEntity:
+        """
+        Generar y guardar el resumen de un documento ya leído
+        
+        Returns:
+            DocumentoEntity: El documento con su resumen (sin cambios si ya lo tenía)
+        """
+        if documento.resumen:
+            return documento
+        
+        try:
+            secciones = self._dividir_secciones(documento.contenido)
+            if len(secciones) == 1:
+                resumen = self.openai_service.resumir_documento(
+                    secciones[0], Config.DOCUMENTOS_RESUMEN_MAXIMO, final=True
+                )
+            else:
+                resumen = self._reducir(self._resumir_secciones(secciones))
+            
+            self.documento_repository.guardar_resumen(documento.id, resumen)
+            documento.resumen = resumen
+            
+            print(f"Resumen generado para el documento {documento.id} a partir de {len(secciones)} secciones")
+            return documento
+            
+        except Exception as e:
+            raise ProcessingError(f"Error al resumir documento: {str(e)}")
+    
+    def _dividir_secciones(self, contenido: str) -> List[str]:
+        """Agrupar las páginas consecutivas en secciones que caben en el límite de tokens"""
+        limite = Config.DOCUMENTOS_RESUMEN_SECCION_TOKENS
+        
+        # Las páginas más largas que una sección se parten por frases
+        divisor = FragmentacionService(tamano=limite * ContadorTokens.CARACTERES_POR_TOKEN, solapamiento=0)
+        paginas = contenido.split(SEPARADOR_PAGINAS)
+        partes = []
+        for numero, texto in enumerate(paginas, start=1):
+            for parte in divisor.fragmentar(texto):
+                partes.append(f"[Página {numero}] {parte}" if len(paginas) > 1 else parte)
+        
+        return self._agrupar(partes, limite) or [contenido]
+    
+    def _agrupar(self, textos: List[str], limite: int) -> List[str]:
+        """Unir textos consecutivos mientras quepan en el límite de tokens"""
+        grupos = []
+        actual, tokens_actual = [], 0
+        for texto in textos:
+            tokens = self.contador.contar(texto)
+            if actual and tokens_actual + tokens > limite:
+                grupos.append("\n\n".join(actual))
+                actual, tokens_actual = [], 0
+            actual.append(texto)
+            tokens_actual += tokens
+        if actual:
+            grupos.append("\n\n".join(actual))
+        return grupos
+    
+    def _resumir_secciones(self, secciones: List[str]) -> List[str]:
+        """Resumir varias secciones a la vez conservando su orden"""
+        def resumir(seccion: str) -> str:
+            return self.openai_service.resumir_documento(seccion, Config.DOCUMENTOS_RESUMEN_SECCION_MAXIMO)
+        
+        hilos = max(1, min(Config.DOCUMENTOS_RESUMEN_HILOS, len(secciones)))
+        if hilos == 1:
+            return [resumir(seccion) for seccion in secciones]
+        
+        with ThreadPoolExecutor(max_workers=hilos) as executor:
+            return list(executor.map(resumir, secciones))
+    
+    def _reducir(self, resumenes: List[str]) -> str:
+        """
+        Combinar los resúmenes de sección hasta obtener el del documento
+        
+        Cada ronda tiene que dejar menos grupos que la anterior (no lo hace si
+        el modelo devuelve resúmenes más largos que el límite). Si no avanza, o
+        tras RONDAS_MAXIMAS rondas, el resumen final se genera con el comienzo de
+        cada grupo restante, repartiendo entre todos el límite de una sección.
+        """
+        limite = Config.DOCUMENTOS_RESUMEN_SECCION_TOKENS
+        grupos = self._agrupar(resumenes, limite)
+        for _ in range(self.RONDAS_MAXIMAS):
+            if len(grupos) == 1:
+                break
+            siguientes = self._agrupar(self._resumir_secciones(grupos), limite)
+            avanza = len(siguientes) < len(grupos)
+            grupos = siguientes
+            if not avanza:
+                break
+
+        if len(grupos) > 1:
+            print(f"Los resúmenes de sección no se reducen a uno ({len(grupos)} grupos), se recortan")
+        texto = "\n\n".join(self.contador.recortar(grupo, limite // len(grupos)) for grupo in grupos)
+        return self.openai_service.resumir_documento(texto, Config.DOCUMENTOS_RESUMEN_MAXIMO, final=True)
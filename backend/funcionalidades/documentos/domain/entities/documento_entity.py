@@ -6,6 +6,10 @@ from datetime import datetime
 from typing import Optional, List
 from funcionalidades.core.exceptions.domain_exceptions import ValidationError
 from funcionalidades.core.infraestructura.datetime_utils import get_local_now_naive
+from funcionalidades.core.infraestructura.hash_utils import calcular_hash_texto
+
+ESPACIOS_SIN_SALTO_PAGINA = ' \t\n\r\v'
+CONTENIDO_MAXIMO = 1000000  # 1MB de texto
 
 
 @dataclass
@@ -18,6 +22,9 @@ class DocumentoEntity:
     embeddings: Optional[List[float]]
     fecha_creacion: datetime
     fecha_actualizacion: datetime
+    hash_archivo: Optional[str] = None  # sha256 del PDF subido
+    hash_contenido: Optional[str] = None  # sha256 del texto extraído
+    resumen: Optional[str] = None  # Resumen generado al procesar el documento
     
     def __post_init__(self):
         """Validaciones post-inicialización"""
@@ -30,27 +37,31 @@ class DocumentoEntity:
         if len(self.nombre) > 255:
             raise ValidationError("El nombre del documento no puede exceder 255 caracteres")
         
-        if len(self.contenido) > 1000000:  # 1MB de texto
+        if len(self.contenido) > CONTENIDO_MAXIMO:
             raise ValidationError("El contenido del documento es demasiado grande")
         
-        # Limpiar datos
+        # Limpiar datos (sin quitar los saltos de página '\f' que numeran las páginas)
         self.nombre = self.nombre.strip()
-        self.contenido = self.contenido.strip()
+        self.contenido = self.contenido.strip(ESPACIOS_SIN_SALTO_PAGINA)
+        if self.hash_contenido is None:
+            self.hash_contenido = calcular_hash_texto(self.contenido)
     
     def actualizar_contenido(self, nuevo_contenido: str):
         """Actualizar el contenido del documento"""
         if not nuevo_contenido or not nuevo_contenido.strip():
             raise ValidationError("El contenido del documento es obligatorio")
         
-        if len(nuevo_contenido) > 1000000:
+        if len(nuevo_contenido) > CONTENIDO_MAXIMO:
             raise ValidationError("El contenido del documento es demasiado grande")
         
-        self.contenido = nuevo_contenido.strip()
+        self.contenido = nuevo_contenido.strip(ESPACIOS_SIN_SALTO_PAGINA)
+        self.hash_contenido = calcular_hash_texto(self.contenido)
+        self.resumen = None
         self.fecha_actualizacion = get_local_now_naive()
     
     def actualizar_embeddings(self, embeddings: List[float]):
         """Actualizar los embeddings del documento"""
-        if not embeddings:
+        if embeddings is None or len(embeddings) == 0:
             raise ValidationError("Los embeddings no pueden estar vacíos")
         
         self.embeddings = embeddings
@@ -59,3 +70,7 @@ class DocumentoEntity:
     def tiene_embeddings(self) -> bool:
         """Verificar si el documento tiene embeddings"""
         return self.embeddings is not None and len(self.embeddings) > 0
+
+    def tamano_bytes(self) -> int:
+        """Tamaño del contenido codificado en UTF-8"""
+        return len(self.contenido.encode('utf-8')) if self.contenido else 0
@@ -0,0 +1,18 @@
+"""
+Entidad DocumentoResumen del dominio
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+
+@dataclass
+class DocumentoResumenEntity:
+    """Datos de un documento para listados, sin su contenido ni sus embeddings"""
+    
+    id: int
+    nombre: str
+    tamano_bytes: int  # Tamaño del contenido en UTF-8
+    procesado: bool  # Tiene embeddings
+    fecha_creacion: Optional[datetime]
+    fecha_actualizacion: Optional[datetime]
@@ -0,0 +1,40 @@
+"""
+Entidad Fragmento del dominio
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, List
+from funcionalidades.core.exceptions.domain_exceptions import ValidationError
+from funcionalidades.core.infraestructura.hash_utils import calcular_hash_texto
+
+
+@dataclass
+class FragmentoEntity:
+    """Entidad que representa un pasaje de un documento"""
+    
+    id: Optional[int]
+    documento_id: int
+    indice: int
+    contenido: str
+    embeddings: Optional[List[float]]
+    fecha_creacion: Optional[datetime] = None
+    pagina: Optional[int] = None  # Página del PDF de la que proviene el fragmento
+    hash_contenido: Optional[str] = None  # sha256 del texto, para reutilizar su embedding
+    modelo_embeddings: Optional[str] = None  # Modelo que generó el embedding
+    
+    def __post_init__(self):
+        """Validaciones post-inicialización"""
+        if not self.contenido or not self.contenido.strip():
+            raise ValidationError("El contenido del fragmento es obligatorio")
+        
+        if self.indice is None or self.indice < 0:
+            raise ValidationError("El índice del fragmento debe ser mayor o igual a 0")
+        
+        # Limpiar datos
+        self.contenido = self.contenido.strip()
+        if self.hash_contenido is None:
+            self.hash_contenido = calcular_hash_texto(self.contenido)
+    
+    def tiene_embeddings(self) -> bool:
+        """Verificar si el fragmento tiene embeddings"""
+        return self.embeddings is not None and len(self.embeddings) > 0
@@ -0,0 +1,75 @@
+"""
+Entidad Trabajo del dominio
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional, List
+from funcionalidades.core.exceptions.domain_exceptions import ValidationError
+from funcionalidades.core.infraestructura.datetime_utils import get_local_now_naive
+
+
+@dataclass
+class TrabajoEntity:
+    """Entidad que representa un procesamiento de documentos en segundo plano"""
+    
+    TIPO_DOCUMENTO = 'documento'
+    TIPO_TODOS = 'todos'
+    
+    PENDIENTE = 'pendiente'
+    EN_PROCESO = 'en_proceso'
+    COMPLETADO = 'completado'
+    FALLIDO = 'fallido'
+    
+    id: Optional[int]
+    tipo: str
+    estado: str = PENDIENTE
+    documento_id: Optional[int] = None
+    total: int = 0
+    procesados: int = 0
+    fallidos: int = 0
+    documentos_fallidos: List[int] = field(default_factory=list)
+    error: Optional[str] = None
+    fecha_creacion: Optional[datetime] = None
+    fecha_actualizacion: Optional[datetime] = None
+    
+    def __post_init__(self):
+        """Validaciones post-inicialización"""
+        if self.tipo not in (self.TIPO_DOCUMENTO, self.TIPO_TODOS):
+            raise ValidationError(f"Tipo de trabajo no válido: {self.tipo}")
+        
+        if self.tipo == self.TIPO_DOCUMENTO and self.documento_id is None:
+            raise ValidationError("El trabajo de un documento requiere documento_id")
+    
+    def iniciar(self, total: int):
+        """Marcar el trabajo como en proceso"""
+        self.estado = self.EN_PROCESO
+        self.total = total
+        self.fecha_actualizacion = get_local_now_naive()
+    
+    def registrar_documento(self, documento_id: int, exito: bool):
+        """Contar un documento procesado o fallido"""
+        if exito:
+            self.procesados += 1
+            if documento_id in self.documentos_fallidos:
+                self.documentos_fallidos.remove(documento_id)
+        elif documento_id not in self.documentos_fallidos:
+            self.documentos_fallidos.append(documento_id)
+        
+        self.fallidos = len(self.documentos_fallidos)
+        self.fecha_actualizacion = get_local_now_naive()
+    
+    def finalizar(self, error: Optional[str] = None):
+        """Marcar el trabajo como completado, o fallido si quedaron documentos sin procesar"""
+        self.error = error
+        self.estado = self.FALLIDO if error or self.documentos_fallidos else self.COMPLETADO
+        self.fecha_actualizacion = get_local_now_naive()
+    
+    def esta_terminado(self) -> bool:
+        """Verificar si el trabajo ya no se está ejecutando"""
+        return self.estado in (self.COMPLETADO, self.FALLIDO)
+    
+    def progreso(self) -> float:
+        """Porcentaje de documentos procesados (0-100)"""
+        if self.total <= 0:
+            return 100.0 if self.esta_terminado() else 0.0
+        return round(100.0 * min(self.procesados + self.fallidos, self.total) / self.total, 1)
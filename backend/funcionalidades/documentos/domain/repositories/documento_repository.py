@@ -2,8 +2,10 @@
 Interfaz del repositorio de documentos
 """
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 from funcionalidades.documentos.domain.entities.documento_entity import DocumentoEntity
+from funcionalidades.documentos.domain.entities.documento_resumen_entity import DocumentoResumenEntity
+from funcionalidades.documentos.domain.entities.fragmento_entity import FragmentoEntity
 
 
 class DocumentoRepository(ABC):
@@ -19,27 +21,110 @@ class DocumentoRepository(ABC):
         """Listar todos los documentos"""
         pass
     
+    @abstractmethod
+    def listar_resumen(self, limite: int, antes_de_id: int = None, procesado: Optional[bool] = None,
+                       nombre: Optional[str] = None) -> List[DocumentoResumenEntity]:
+        """Listar por páginas (orden de ID descendente) los datos de los documentos, sin su contenido"""
+        pass
+    
+    @abstractmethod
+    def obtener_metadatos(self, documentos_ids: List[int]) -> List[DocumentoResumenEntity]:
+        """Obtener los datos de varios documentos por ID, sin su contenido"""
+        pass
+    
+    @abstractmethod
+    def obtener_resumenes(self, documentos_ids: List[int]) -> Dict[int, str]:
+        """Resúmenes generados de varios documentos, por ID"""
+        pass
+    
     @abstractmethod
     def get_by_id(self, documento_id: int) -> Optional[DocumentoEntity]:
         """Obtener un documento por ID"""
         pass
     
+    @abstractmethod
+    def buscar_por_hash(self, hash_archivo: str = None, hash_contenido: str = None) -> Optional[DocumentoEntity]:
+        """Obtener un documento con la misma huella de archivo o de texto"""
+        pass
+    
     @abstractmethod
     def modificar(self, documento: DocumentoEntity) -> DocumentoEntity:
         """Modificar un documento existente"""
         pass
     
+    @abstractmethod
+    def guardar_resumen(self, documento_id: int, resumen: str) -> None:
+        """Guardar el resumen de un documento"""
+        pass
+    
     @abstractmethod
     def eliminar(self, documento_id: int) -> bool:
         """Eliminar un documento"""
         pass
     
     @abstractmethod
-    def buscar_por_similitud(self, query_embedding: List[float], limite: int = 5) -> List[DocumentoEntity]:
-        """Buscar documentos por similitud de embeddings"""
+    def guardar_fragmentos(self, documento_id: int, fragmentos: List[FragmentoEntity]) -> List[FragmentoEntity]:
+        """Reemplazar los fragmentos de un documento"""
+        pass
+    
+    @abstractmethod
+    def tiene_fragmentos(self, documento_id: int) -> bool:
+        """Verificar si un documento ya fue fragmentado"""
+        pass
+    
+    @abstractmethod
+    def obtener_embeddings_por_hash(self, hashes: List[str], modelo: str) -> Dict[str, List[float]]:
+        """Obtener los embeddings guardados de fragmentos con esos hashes de texto, generados con ese modelo"""
+        pass
+    
+    @abstractmethod
+    def listar_pendientes(self, limite: int, despues_de_id: int = 0) -> List[DocumentoEntity]:
+        """Listar por páginas (orden de ID) los documentos sin embeddings o sin fragmentos"""
         pass
     
     @abstractmethod
-    def buscar_por_similitud_en_documento(self, query_embedding: List[float], documento_id: int, limite: int = 5) -> List[DocumentoEntity]:
-        """Buscar por similitud solo en un documento específico"""
-        pass
\ No newline at end of file
+    def contar_pendientes(self) -> int:
+        """Contar los documentos sin embeddings o sin fragmentos"""
+        pass
+    
+    @abstractmethod
+    def guardar_lote(self, documentos: List[DocumentoEntity], fragmentos: List[FragmentoEntity]) -> None:
+        """Guardar los embeddings y fragmentos de varios documentos en una sola transacción"""
+        pass
+    
+    @abstractmethod
+    def buscar_por_similitud(self, query_embedding: List[float], limite: int = 5) -> List[FragmentoEntity]:
+        """Buscar los fragmentos más similares entre todos los documentos"""
+        pass
+    
+    @abstractmethod
+    def buscar_por_similitud_en_documento(self, query_embedding: List[float], documento_id: int, limite: int = 5) -> List[FragmentoEntity]:
+        """Buscar los fragmentos más similares de un documento específico"""
+        pass
+
+    @abstractmethod
+    def buscar_por_similitud_en_documentos(self, query_embedding: List[float], documentos_ids: List[int],
+                                           limite: int = 5) -> List[FragmentoEntity]:
+        """Buscar los fragmentos más similares dentro de un conjunto de documentos"""
+        pass
+    
+    @abstractmethod
+    def buscar_por_texto(self, consulta: str, limite: int = 5,
+                         documentos_ids: Optional[List[int]] = None) -> List[FragmentoEntity]:
+        """Buscar fragmentos por sus términos, en todos los documentos o en los indicados"""
+        pass
+    
+    @abstractmethod
+    def precargar_indices(self):
+        """Cargar los índices de búsqueda antes de la primera consulta"""
+        pass
+    
+    @abstractmethod
+    def listar_fragmentos_repartidos(self, documento_id: int, cantidad: int) -> List[FragmentoEntity]:
+        """Obtener hasta cantidad fragmentos repartidos a lo largo de un documento, en orden"""
+        pass
+
+    @abstractmethod
+    def iterar_embeddings_fragmentos(self) -> Iterator[Tuple[int, int, List[float]]]:
+        """Recorrer (id, documento_id, embedding) de todos los fragmentos con embedding"""
+        pass
@@ -0,0 +1,30 @@
+"""
+Interfaz del repositorio de trabajos de procesamiento
+"""
+from abc import ABC, abstractmethod
+from typing import Optional
+from funcionalidades.documentos.domain.entities.trabajo_entity import TrabajoEntity
+
+
+class TrabajoRepository(ABC):
+    """Interfaz abstracta para el repositorio de trabajos"""
+    
+    @abstractmethod
+    def agregar(self, trabajo: TrabajoEntity) -> TrabajoEntity:
+        """Agregar un nuevo trabajo"""
+        pass
+    
+    @abstractmethod
+    def get_by_id(self, trabajo_id: int) -> Optional[TrabajoEntity]:
+        """Obtener un trabajo por ID"""
+        pass
+    
+    @abstractmethod
+    def modificar(self, trabajo: TrabajoEntity) -> TrabajoEntity:
+        """Guardar el estado y el progreso de un trabajo"""
+        pass
+    
+    @abstractmethod
+    def marcar_interrumpidos(self) -> int:
+        """Marcar como fallidos los trabajos que quedaron sin terminar (p. ej. tras un reinicio)"""
+        pass
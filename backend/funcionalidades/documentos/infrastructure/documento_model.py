@@ -2,7 +2,7 @@
 Modelo SQLAlchemy para documentos
 """
 from datetime import datetime
-from funcionalidades.core.infraestructura.database import db
+from funcionalidades.core.infraestructura.database import db, VectorBinario
 from funcionalidades.core.infraestructura.datetime_utils import get_local_now_naive
 
 
@@ -14,9 +14,19 @@ class DocumentoModel(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     nombre = db.Column(db.String(255), nullable=False)
     contenido = db.Column(db.Text, nullable=False)
-    embeddings = db.Column(db.JSON, nullable=True)  # Almacenar como JSON
+    embeddings = db.Column(VectorBinario, nullable=True)  # Almacenar como bytes float32
+    hash_archivo = db.Column(db.String(64), nullable=True, index=True)  # sha256 del PDF subido
+    hash_contenido = db.Column(db.String(64), nullable=True, index=True)  # sha256 del texto extraído
+    resumen = db.Column(db.Text, nullable=True)  # Resumen jerárquico generado al procesar
+    # Calculados al escribir, para listar documentos sin leer el contenido ni los embeddings
+    tamano_bytes = db.Column(db.Integer, nullable=False, default=0)
+    procesado = db.Column(db.Boolean, nullable=False, default=False)
     fecha_creacion = db.Column(db.DateTime, default=get_local_now_naive, nullable=False)
     fecha_actualizacion = db.Column(db.DateTime, default=get_local_now_naive, onupdate=get_local_now_naive, nullable=False)
     
+    __table_args__ = (
+        db.Index('ix_documentos_procesado_id', 'procesado', 'id'),
+    )
+    
     def __repr__(self):
         return f'<Documento {self.nombre}>'
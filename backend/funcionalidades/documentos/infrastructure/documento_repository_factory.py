@@ -0,0 +1,23 @@
+"""
+Selección de la implementación del repositorio de documentos según la base de datos
+"""
+from funcionalidades.documentos.domain.repositories.documento_repository import DocumentoRepository
+from funcionalidades.documentos.infrastructure.documento_repository_impl import DocumentoRepositoryImpl
+from funcionalidades.core.infraestructura.config import Config
+from funcionalidades.core.infraestructura.embeddings_service import EmbeddingsService
+
+
+def crear_documento_repository(embeddings_service: EmbeddingsService = None) -> DocumentoRepository:
+    """
+    Crear el repositorio de documentos adecuado para la base de datos configurada
+    
+    En PostgreSQL (con PGVECTOR_HABILITADO) se usa la búsqueda en SQL con
+    pgvector; en SQLite, la búsqueda en memoria.
+    """
+    if Config.DB_DRIVER != 'sqlite' and Config.PGVECTOR_HABILITADO:
+        from funcionalidades.documentos.infrastructure.documento_repository_pgvector_impl import (
+            DocumentoRepositoryPgvectorImpl
+        )
+        return DocumentoRepositoryPgvectorImpl(embeddings_service)
+    
+    return DocumentoRepositoryImpl(embeddings_service)
@@ -1,22 +1,48 @@
 """
 Implementación del repositorio de documentos
 """
-from typing import List, Optional
-import numpy as np
+from typing import Dict, Iterator, List, Optional, Tuple
 from funcionalidades.documentos.domain.entities.documento_entity import DocumentoEntity
 from funcionalidades.documentos.domain.repositories.documento_repository import DocumentoRepository
+from funcionalidades.documentos.domain.entities.fragmento_entity import FragmentoEntity
+from funcionalidades.documentos.domain.entities.documento_resumen_entity import DocumentoResumenEntity
 from funcionalidades.documentos.infrastructure.documento_model import DocumentoModel
+from funcionalidades.documentos.infrastructure.fragmento_model import FragmentoModel
 from funcionalidades.core.infraestructura.database import db
 from funcionalidades.core.infraestructura.embeddings_service import EmbeddingsService
+from funcionalidades.core.infraestructura.indice_vectorial import IndiceVectorial
+from funcionalidades.core.infraestructura.indice_lexico import IndiceLexico
+from funcionalidades.core.infraestructura.cache_respuestas import cache_respuestas
+from funcionalidades.core.infraestructura import unidad_trabajo
+from funcionalidades.core.infraestructura.config import Config
 from funcionalidades.core.exceptions.domain_exceptions import ProcessingError
 
 
+def _leer_vectores_fragmentos(fragmentos_ids: List[int]) -> List[Optional[List[float]]]:
+    """Embeddings float de unos pocos fragmentos, para volver a puntuar los candidatos del índice cuantizado"""
+    vectores = dict(db.session.query(FragmentoModel.id, FragmentoModel.embeddings).filter(
+        FragmentoModel.id.in_(fragmentos_ids)
+    ).all())
+    return [vectores.get(fragmento_id) for fragmento_id in fragmentos_ids]
+
+
+# Índice de fragmentos compartido por todas las instancias del repositorio
+indice_fragmentos = IndiceVectorial(
+    cuantizacion=Config.INDICE_CUANTIZACION,
+    factor_revision=Config.INDICE_FACTOR_REVISION,
+    leer_vectores=_leer_vectores_fragmentos
+)
+indice_lexico = IndiceLexico()
+
+
 class DocumentoRepositoryImpl(DocumentoRepository):
     """Implementación del repositorio de documentos"""
     
-    def __init__(self):
-        self.embeddings_service = EmbeddingsService()
-        self.documentos_embeddings = []  # Lista de embeddings de documentos
+    HASHES_POR_CONSULTA = 500
+    FRAGMENTOS_POR_BLOQUE = 2000
+    
+    def __init__(self, embeddings_service: EmbeddingsService = None):
+        self.embeddings_service = embeddings_service or EmbeddingsService(carga_diferida=True)
     
     def _crear_entidad_desde_modelo(self, modelo: DocumentoModel) -> DocumentoEntity:
         """Convertir modelo de base de datos a entidad del dominio"""
@@ -26,7 +52,10 @@ class DocumentoRepositoryImpl(DocumentoRepository):
             contenido=modelo.contenido,
             embeddings=modelo.embeddings,
             fecha_creacion=modelo.fecha_creacion,
-            fecha_actualizacion=modelo.fecha_actualizacion
+            fecha_actualizacion=modelo.fecha_actualizacion,
+            hash_archivo=modelo.hash_archivo,
+            hash_contenido=modelo.hash_contenido,
+            resumen=modelo.resumen
         )
     
     def _crear_modelo_desde_entidad(self, entidad: DocumentoEntity) -> DocumentoModel:
@@ -37,7 +66,40 @@ class DocumentoRepositoryImpl(DocumentoRepository):
             contenido=entidad.contenido,
             embeddings=entidad.embeddings,
             fecha_creacion=entidad.fecha_creacion,
-            fecha_actualizacion=entidad.fecha_actualizacion
+            fecha_actualizacion=entidad.fecha_actualizacion,
+            hash_archivo=entidad.hash_archivo,
+            hash_contenido=entidad.hash_contenido,
+            resumen=entidad.resumen,
+            tamano_bytes=entidad.tamano_bytes(),
+            procesado=entidad.tiene_embeddings()
+        )
+    
+    def _crear_entidad_fragmento(self, modelo: FragmentoModel) -> FragmentoEntity:
+        """Convertir modelo de fragmento a entidad del dominio"""
+        return FragmentoEntity(
+            id=modelo.id,
+            documento_id=modelo.documento_id,
+            indice=modelo.indice,
+            contenido=modelo.contenido,
+            embeddings=modelo.embeddings,
+            fecha_creacion=modelo.fecha_creacion,
+            pagina=modelo.pagina,
+            hash_contenido=modelo.hash_contenido,
+            modelo_embeddings=modelo.modelo_embeddings
+        )
+    
+    def _crear_modelo_fragmento(self, entidad: FragmentoEntity) -> FragmentoModel:
+        """Convertir entidad de fragmento a modelo de base de datos"""
+        return FragmentoModel(
+            id=entidad.id,
+            documento_id=entidad.documento_id,
+            indice=entidad.indice,
+            contenido=entidad.contenido,
+            embeddings=entidad.embeddings,
+            fecha_creacion=entidad.fecha_creacion,
+            pagina=entidad.pagina,
+            hash_contenido=entidad.hash_contenido,
+            modelo_embeddings=entidad.modelo_embeddings
         )
     
     def agregar(self, documento: DocumentoEntity) -> DocumentoEntity:
@@ -62,17 +124,111 @@ class DocumentoRepositoryImpl(DocumentoRepository):
         except Exception as e:
             raise ProcessingError(f"Error al listar documentos: {str(e)}")
     
+    def listar_resumen(self, limite: int, antes_de_id: int = None, procesado: Optional[bool] = None,
+                       nombre: Optional[str] = None) -> List[DocumentoResumenEntity]:
+        """Listar por páginas (orden de ID descendente) los datos de los documentos, sin su contenido"""
+        try:
+            consulta = self._consulta_metadatos()
+            if antes_de_id is not None:
+                consulta = consulta.filter(DocumentoModel.id < antes_de_id)
+            if procesado is not None:
+                consulta = consulta.filter(DocumentoModel.procesado == procesado)
+            if nombre:
+                consulta = consulta.filter(DocumentoModel.nombre.ilike(f"%{nombre}%"))
+            
+            filas = consulta.order_by(DocumentoModel.id.desc()).limit(limite).all()
+            return [self._crear_resumen_desde_fila(fila) for fila in filas]
+            
+        except Exception as e:
+            raise ProcessingError(f"Error al listar documentos: {str(e)}")
+    
+    def obtener_metadatos(self, documentos_ids: List[int]) -> List[DocumentoResumenEntity]:
+        """Obtener los datos de varios documentos por ID, sin su contenido (los que no existen se omiten)"""
+        try:
+            if not documentos_ids:
+                return []
+            
+            # Dentro de una unidad de trabajo solo se consultan los que aún no se leyeron
+            conocidos = unidad_trabajo.obtener_registradas('documento_metadatos', documentos_ids)
+            faltantes = [documento_id for documento_id in documentos_ids if documento_id not in conocidos]
+            if faltantes:
+                filas = self._consulta_metadatos().filter(DocumentoModel.id.in_(faltantes)).all()
+                leidos = {fila.id: self._crear_resumen_desde_fila(fila) for fila in filas}
+                for documento_id in faltantes:
+                    conocidos[documento_id] = leidos.get(documento_id)
+                    unidad_trabajo.registrar('documento_metadatos', documento_id, conocidos[documento_id])
+            
+            return [conocidos[documento_id] for documento_id in documentos_ids if conocidos[documento_id] is not None]
+            
+        except Exception as e:
+            raise ProcessingError(f"Error al obtener documentos: {str(e)}")
+    
+    def obtener_resumenes(self, documentos_ids: List[int]) -> Dict[int, str]:
+        """Resúmenes generados de varios documentos, por ID (los documentos sin resumen se omiten)"""
+        try:
+            if not documentos_ids:
+                return {}
+            
+            filas = db.session.query(DocumentoModel.id, DocumentoModel.resumen).filter(
+                DocumentoModel.id.in_(documentos_ids), DocumentoModel.resumen.isnot(None)
+            ).all()
+            return {fila.id: fila.resumen for fila in filas}
+            
+        except Exception as e:
+            raise ProcessingError(f"Error al obtener resúmenes de documentos: {str(e)}")
+    
+    @staticmethod
+    def _consulta_metadatos():
+        """Consulta de las columnas de metadatos: ni el contenido ni los embeddings salen de la base de datos"""
+        return db.session.query(
+            DocumentoModel.id,
+            DocumentoModel.nombre,
+            DocumentoModel.tamano_bytes,
+            DocumentoModel.procesado,
+            DocumentoModel.fecha_creacion,
+            DocumentoModel.fecha_actualizacion
+        )
+    
+    @staticmethod
+    def _crear_resumen_desde_fila(fila) -> DocumentoResumenEntity:
+        return DocumentoResumenEntity(
+            id=fila.id,
+            nombre=fila.nombre,
+            tamano_bytes=fila.tamano_bytes,
+            procesado=fila.procesado,
+            fecha_creacion=fila.fecha_creacion,
+            fecha_actualizacion=fila.fecha_actualizacion
+        )
+    
     def get_by_id(self, documento_id: int) -> Optional[DocumentoEntity]:
         """Obtener un documento por ID"""
-        try:
+        def cargar() -> Optional[DocumentoEntity]:
             modelo = DocumentoModel.query.get(documento_id)
-            if modelo:
-                return self._crear_entidad_desde_modelo(modelo)
-            return None
+            return self._crear_entidad_desde_modelo(modelo) if modelo else None
+        
+        try:
+            return unidad_trabajo.obtener_o_cargar('documento', documento_id, cargar)
             
         except Exception as e:
             raise ProcessingError(f"Error al obtener documento: {str(e)}")
     
+    def buscar_por_hash(self, hash_archivo: str = None, hash_contenido: str = None) -> Optional[DocumentoEntity]:
+        """Obtener el documento más antiguo con la misma huella de archivo o de texto"""
+        try:
+            condiciones = []
+            if hash_archivo:
+                condiciones.append(DocumentoModel.hash_archivo == hash_archivo)
+            if hash_contenido:
+                condiciones.append(DocumentoModel.hash_contenido == hash_contenido)
+            if not condiciones:
+                return None
+            
+            modelo = DocumentoModel.query.filter(db.or_(*condiciones)).order_by(DocumentoModel.id).first()
+            return self._crear_entidad_desde_modelo(modelo) if modelo else None
+            
+        except Exception as e:
+            raise ProcessingError(f"Error al buscar documento por hash: {str(e)}")
+    
     def modificar(self, documento: DocumentoEntity) -> DocumentoEntity:
         """Modificar un documento existente"""
         try:
@@ -80,12 +236,27 @@ class DocumentoRepositoryImpl(DocumentoRepository):
             if not modelo:
                 raise ProcessingError(f"Documento con ID {documento.id} no encontrado")
             
+            # Los fragmentos dejan de ser válidos si cambia el contenido
+            contenido_modificado = modelo.contenido != documento.contenido
+            if contenido_modificado:
+                FragmentoModel.query.filter(FragmentoModel.documento_id == documento.id).delete()
+            
             modelo.nombre = documento.nombre
             modelo.contenido = documento.contenido
+            modelo.hash_contenido = documento.hash_contenido
+            modelo.resumen = documento.resumen
+            modelo.tamano_bytes = documento.tamano_bytes()
             modelo.embeddings = documento.embeddings
+            modelo.procesado = documento.tiene_embeddings()
             modelo.fecha_actualizacion = documento.fecha_actualizacion
             
             db.session.commit()
+            unidad_trabajo.descartar()
+            
+            if contenido_modificado:
+                indice_fragmentos.eliminar_grupo(documento.id)
+                indice_lexico.eliminar_grupo(documento.id)
+            cache_respuestas.invalidar_documento(documento.id)
             
             return self._crear_entidad_desde_modelo(modelo)
             
@@ -93,6 +264,22 @@ class DocumentoRepositoryImpl(DocumentoRepository):
             db.session.rollback()
             raise ProcessingError(f"Error al modificar documento: {str(e)}")
     
+    def guardar_resumen(self, documento_id: int, resumen: str) -> None:
+        """Guardar el resumen de un documento sin reescribir su contenido"""
+        try:
+            DocumentoModel.query.filter(DocumentoModel.id == documento_id).update(
+                {DocumentoModel.resumen: resumen}, synchronize_session=False
+            )
+            db.session.commit()
+            unidad_trabajo.descartar()
+            
+            # Las respuestas a preguntas generales se generaron sin el resumen
+            cache_respuestas.invalidar_documento(documento_id)
+            
+        except Exception as e:
+            db.session.rollback()
+            raise ProcessingError(f"Error al guardar el resumen del documento: {str(e)}")
+    
     def eliminar(self, documento_id: int) -> bool:
         """Eliminar un documento"""
         try:
@@ -102,11 +289,19 @@ class DocumentoRepositoryImpl(DocumentoRepository):
             
             # Eliminar mensajes asociados al documento primero
             from funcionalidades.chat.infrastructure.mensaje_model import MensajeModel
+            from funcionalidades.chat.infrastructure.resumen_conversacion_model import ResumenConversacionModel
             MensajeModel.query.filter(MensajeModel.documento_id == documento_id).delete()
+            ResumenConversacionModel.query.filter(ResumenConversacionModel.documento_id == documento_id).delete()
+            FragmentoModel.query.filter(FragmentoModel.documento_id == documento_id).delete()
             
             # Eliminar el documento
             db.session.delete(modelo)
             db.session.commit()
+            unidad_trabajo.descartar()
+            
+            indice_fragmentos.eliminar_grupo(documento_id)
+            indice_lexico.eliminar_grupo(documento_id)
+            cache_respuestas.invalidar_documento(documento_id)
             
             return True
             
@@ -114,117 +309,300 @@ class DocumentoRepositoryImpl(DocumentoRepository):
             db.session.rollback()
             raise ProcessingError(f"Error al eliminar documento: {str(e)}")
     
-    def buscar_por_similitud(self, query_embedding: List[float], limite: int = 5) -> List[DocumentoEntity]:
-        """Buscar documentos por similitud de embeddings"""
+    def guardar_fragmentos(self, documento_id: int, fragmentos: List[FragmentoEntity]) -> List[FragmentoEntity]:
+        """Reemplazar los fragmentos de un documento"""
         try:
-            # Obtener todos los documentos con embeddings válidos
-            modelos = DocumentoModel.query.filter(
-                DocumentoModel.embeddings.isnot(None)
-            ).all()
+            FragmentoModel.query.filter(FragmentoModel.documento_id == documento_id).delete()
             
-            if not modelos:
-                return []
+            modelos = [self._crear_modelo_fragmento(fragmento) for fragmento in fragmentos]
+            db.session.add_all(modelos)
+            db.session.flush()
+            self._guardar_vectores(modelos)
             
-            # Filtrar solo documentos con embeddings válidos
-            modelos_con_embeddings = []
-            for modelo in modelos:
-                if modelo.embeddings and len(modelo.embeddings) > 0:
-                    modelos_con_embeddings.append(modelo)
+            # Leer los valores antes del commit para no recargar cada fila después
+            entidades = [self._crear_entidad_fragmento(modelo) for modelo in modelos]
+            db.session.commit()
+            unidad_trabajo.descartar()
+            
+            # Mantener los índices vectorial y léxico sincronizados con la base de datos
+            indexables = [entidad for entidad in entidades if entidad.tiene_embeddings()]
+            indice_fragmentos.eliminar_grupo(documento_id)
+            indice_fragmentos.agregar(
+                [entidad.id for entidad in indexables],
+                [entidad.documento_id for entidad in indexables],
+                [entidad.embeddings for entidad in indexables]
+            )
+            indice_lexico.eliminar_grupo(documento_id)
+            indice_lexico.agregar(
+                [entidad.id for entidad in entidades],
+                [entidad.documento_id for entidad in entidades],
+                [entidad.contenido for entidad in entidades]
+            )
             
-            if not modelos_con_embeddings:
-                return []
+            return entidades
             
-            # Reconstruir lista de embeddings
-            self._reconstruir_embeddings(modelos_con_embeddings)
+        except Exception as e:
+            db.session.rollback()
+            raise ProcessingError(f"Error al guardar fragmentos: {str(e)}")
+    
+    def tiene_fragmentos(self, documento_id: int) -> bool:
+        """Verificar si un documento ya fue fragmentado"""
+        try:
+            return db.session.query(
+                FragmentoModel.query.filter(FragmentoModel.documento_id == documento_id).exists()
+            ).scalar()
             
-            # Verificar que tenemos embeddings válidos
-            if not self.documentos_embeddings:
-                return []
+        except Exception as e:
+            raise ProcessingError(f"Error al verificar fragmentos: {str(e)}")
+    
+    def obtener_embeddings_por_hash(self, hashes: List[str], modelo: str) -> Dict[str, List[float]]:
+        """Embeddings ya guardados de fragmentos con el mismo texto y generados con el mismo modelo, por hash"""
+        try:
+            encontrados = {}
+            hashes = list(set(hashes))
+            
+            # Consultas por bloques para no exceder el límite de parámetros de la base de datos
+            for inicio in range(0, len(hashes), self.HASHES_POR_CONSULTA):
+                filas = db.session.query(FragmentoModel.hash_contenido, FragmentoModel.embeddings).filter(
+                    FragmentoModel.hash_contenido.in_(hashes[inicio:inicio + self.HASHES_POR_CONSULTA]),
+                    FragmentoModel.modelo_embeddings == modelo,
+                    FragmentoModel.embeddings.isnot(None)
+                ).all()
+                for hash_contenido, embeddings in filas:
+                    encontrados.setdefault(hash_contenido, embeddings)
+            
+            return encontrados
             
-            # Buscar documentos similares usando el servicio de embeddings
-            indices_similares = self.embeddings_service.buscar_similares(
-                query_embedding, 
-                self.documentos_embeddings, 
-                limite=limite
+        except Exception as e:
+            raise ProcessingError(f"Error al obtener embeddings por hash: {str(e)}")
+    
+    def _filtro_pendientes(self):
+        """Condición de documento sin embeddings o sin fragmentos"""
+        tiene_fragmentos = db.session.query(FragmentoModel.id).filter(
+            FragmentoModel.documento_id == DocumentoModel.id
+        ).exists()
+        return db.or_(DocumentoModel.embeddings.is_(None), ~tiene_fragmentos)
+    
+    def listar_pendientes(self, limite: int, despues_de_id: int = 0) -> List[DocumentoEntity]:
+        """Listar por páginas (orden de ID) los documentos sin embeddings o sin fragmentos"""
+        try:
+            modelos = DocumentoModel.query.filter(
+                DocumentoModel.id > despues_de_id,
+                self._filtro_pendientes()
+            ).order_by(DocumentoModel.id).limit(limite).all()
+            
+            return [self._crear_entidad_desde_modelo(modelo) for modelo in modelos]
+            
+        except Exception as e:
+            raise ProcessingError(f"Error al listar documentos pendientes: {str(e)}")
+    
+    def contar_pendientes(self) -> int:
+        """Contar los documentos sin embeddings o sin fragmentos"""
+        try:
+            return DocumentoModel.query.filter(self._filtro_pendientes()).count()
+            
+        except Exception as e:
+            raise ProcessingError(f"Error al contar documentos pendientes: {str(e)}")
+    
+    def guardar_lote(self, documentos: List[DocumentoEntity], fragmentos: List[FragmentoEntity]) -> None:
+        """Guardar los embeddings y fragmentos de varios documentos en una sola transacción"""
+        if not documentos:
+            return
+        
+        documentos_ids = [documento.id for documento in documentos]
+        try:
+            FragmentoModel.query.filter(
+                FragmentoModel.documento_id.in_(documentos_ids)
+            ).delete(synchronize_session=False)
+            
+            modelos = [self._crear_modelo_fragmento(fragmento) for fragmento in fragmentos]
+            db.session.add_all(modelos)
+            db.session.flush()
+            self._guardar_vectores(modelos)
+            
+            # UPDATE masivo por clave primaria en lugar de cargar y modificar cada documento
+            db.session.execute(db.update(DocumentoModel), [
+                {
+                    'id': documento.id,
+                    'embeddings': documento.embeddings,
+                    'procesado': documento.tiene_embeddings(),
+                    'fecha_actualizacion': documento.fecha_actualizacion
+                }
+                for documento in documentos
+            ])
+            
+            indexables = [(modelo.id, modelo.documento_id, modelo.embeddings) for modelo in modelos
+                          if modelo.embeddings is not None and len(modelo.embeddings) > 0]
+            textos = [(modelo.id, modelo.documento_id, modelo.contenido) for modelo in modelos]
+            db.session.commit()
+            unidad_trabajo.descartar()
+            
+            for documento_id in documentos_ids:
+                cache_respuestas.invalidar_documento(documento_id)
+            indice_fragmentos.eliminar_grupos(documentos_ids)
+            indice_fragmentos.agregar(
+                [fila[0] for fila in indexables],
+                [fila[1] for fila in indexables],
+                [fila[2] for fila in indexables]
+            )
+            indice_lexico.eliminar_grupos(documentos_ids)
+            indice_lexico.agregar(
+                [fila[0] for fila in textos],
+                [fila[1] for fila in textos],
+                [fila[2] for fila in textos]
             )
             
-            # Obtener documentos correspondientes
-            documentos_similares = []
-            for idx in indices_similares:
-                if idx < len(modelos_con_embeddings):
-                    documento = self._crear_entidad_desde_modelo(modelos_con_embeddings[idx])
-                    documentos_similares.append(documento)
+        except Exception as e:
+            db.session.rollback()
+            raise ProcessingError(f"Error al guardar lote de documentos: {str(e)}")
+    
+    def buscar_por_similitud(self, query_embedding: List[float], limite: int = 5) -> List[FragmentoEntity]:
+        """Buscar los fragmentos más similares entre todos los documentos"""
+        try:
+            self._asegurar_indice()
+            resultados = indice_fragmentos.buscar(query_embedding, limite=limite)
             
-            return documentos_similares
+            return self._obtener_fragmentos([fragmento_id for fragmento_id, _ in resultados])
             
         except Exception as e:
             raise ProcessingError(f"Error en búsqueda por similitud: {str(e)}")
     
-    def buscar_por_similitud_en_documento(self, query_embedding: List[float], documento_id: int, limite: int = 5) -> List[DocumentoEntity]:
-        """Buscar por similitud solo en un documento específico"""
+    def buscar_por_similitud_en_documento(self, query_embedding: List[float], documento_id: int, limite: int = 5) -> List[FragmentoEntity]:
+        """Buscar los fragmentos más similares de un documento específico"""
         try:
             print(f"🔍 Buscando en documento específico ID: {documento_id}")
             
-            # Obtener solo el documento específico
-            modelo = DocumentoModel.query.filter(
-                DocumentoModel.id == documento_id,
-                DocumentoModel.embeddings.isnot(None)
-            ).first()
+            self._asegurar_indice()
             
-            if not modelo:
-                print(f"Documento ID {documento_id} no encontrado o sin embeddings")
-                return []
+            # Usar umbral más bajo para capturar más contenido del documento seleccionado
+            resultados = indice_fragmentos.buscar(query_embedding, limite=limite, umbral=0.1, grupo=documento_id)
+            fragmentos_similares = self._obtener_fragmentos([fragmento_id for fragmento_id, _ in resultados])
             
-            # Verificar que tiene embeddings válidos
-            if not modelo.embeddings or len(modelo.embeddings) == 0:
-                print(f"Documento ID {documento_id} no tiene embeddings válidos")
-                return []
-            
-            print(f"Documento ID {documento_id} encontrado: {modelo.nombre}")
+            print(f"Encontrados {len(fragmentos_similares)} fragmentos similares en documento ID {documento_id}")
             
-            # Crear lista con solo este documento
-            modelos_con_embeddings = [modelo]
+            return fragmentos_similares
             
-            # Reconstruir lista de embeddings con solo este documento
-            self._reconstruir_embeddings(modelos_con_embeddings)
+        except Exception as e:
+            raise ProcessingError(f"Error en búsqueda por similitud en documento: {str(e)}")
+    
+    def buscar_por_similitud_en_documentos(self, query_embedding: List[float], documentos_ids: List[int],
+                                           limite: int = 5) -> List[FragmentoEntity]:
+        """Buscar los fragmentos más similares dentro de un conjunto de documentos"""
+        try:
+            self._asegurar_indice()
             
-            # Verificar que tenemos embeddings válidos
-            if not self.documentos_embeddings:
-                print(f"No se pudieron reconstruir embeddings para documento ID {documento_id}")
-                return []
+            # El filtro se aplica dentro del índice, con el mismo umbral que la búsqueda en un documento
+            resultados = indice_fragmentos.buscar(query_embedding, limite=limite, umbral=0.1, grupos=documentos_ids)
+            return self._obtener_fragmentos([fragmento_id for fragmento_id, _ in resultados])
             
-            # Buscar documentos similares usando el servicio de embeddings
-            # Usar umbral más bajo para preguntas generales
-            indices_similares = self.embeddings_service.buscar_similares(
-                query_embedding, 
-                self.documentos_embeddings, 
-                limite=limite,
-                umbral=0.1  # Umbral más bajo para capturar más contenido
+        except Exception as e:
+            raise ProcessingError(f"Error en búsqueda por similitud en documentos: {str(e)}")
+    
+    def buscar_por_texto(self, consulta: str, limite: int = 5,
+                         documentos_ids: Optional[List[int]] = None) -> List[FragmentoEntity]:
+        """
+        Buscar fragmentos por sus términos (BM25), en todos los documentos o en los indicados
+        
+        Encuentra coincidencias exactas que la búsqueda por similitud pasa por
+        alto: números de factura, artículos, nombres propios.
+        """
+        try:
+            self._asegurar_indice_lexico()
+            resultados = indice_lexico.buscar(
+                consulta, limite=limite, grupos=documentos_ids, minimo=Config.BUSQUEDA_LEXICA_MINIMO
             )
             
-            print(f"Encontrados {len(indices_similares)} fragmentos similares en documento ID {documento_id}")
-            
-            # Obtener documentos correspondientes (solo el documento seleccionado)
-            documentos_similares = []
-            for idx in indices_similares:
-                if idx < len(modelos_con_embeddings):
-                    documento = self._crear_entidad_desde_modelo(modelos_con_embeddings[idx])
-                    documentos_similares.append(documento)
-            
-            return documentos_similares
+            return self._obtener_fragmentos([fragmento_id for fragmento_id, _ in resultados])
             
         except Exception as e:
-            raise ProcessingError(f"Error en búsqueda por similitud en documento: {str(e)}")
+            raise ProcessingError(f"Error en búsqueda por texto: {str(e)}")
     
-    def _reconstruir_embeddings(self, modelos: List[DocumentoModel]):
-        """Reconstruir la lista de embeddings"""
+    def listar_fragmentos_repartidos(self, documento_id: int, cantidad: int) -> List[FragmentoEntity]:
+        """
+        Obtener hasta cantidad fragmentos repartidos a lo largo de un documento
+        
+        Sirve para preguntas generales: en lugar del documento entero se toman
+        fragmentos a intervalos regulares, de modo que el contexto cubra todo
+        el documento. Solo se lee el contenido de los fragmentos elegidos.
+        
+        Returns:
+            List[FragmentoEntity]: Fragmentos en el orden del documento
+        """
         try:
-            self.documentos_embeddings = []
+            if cantidad <= 0:
+                return []
+            
+            ids = [fila.id for fila in db.session.query(FragmentoModel.id).filter(
+                FragmentoModel.documento_id == documento_id
+            ).order_by(FragmentoModel.indice).all()]
             
-            for modelo in modelos:
-                if modelo.embeddings and len(modelo.embeddings) > 0:
-                    self.documentos_embeddings.append(modelo.embeddings)
-                # No agregar nada si no tiene embeddings válidos
+            if len(ids) > cantidad:
+                # Posiciones equiespaciadas que incluyen el primer y el último fragmento
+                paso = (len(ids) - 1) / max(cantidad - 1, 1)
+                ids = [ids[round(i * paso)] for i in range(cantidad)]
+            
+            return self._obtener_fragmentos(ids)
             
         except Exception as e:
-            raise ProcessingError(f"Error al reconstruir embeddings: {str(e)}")
+            raise ProcessingError(f"Error al listar fragmentos del documento: {str(e)}")
+    
+    def _guardar_vectores(self, modelos: List[FragmentoModel]):
+        """Punto de extensión para persistir los vectores en un almacén adicional"""
+        pass
+    
+    def _asegurar_indice(self):
+        """Cargar el índice vectorial una sola vez por proceso"""
+        # Por bloques: con cuantización los vectores float nunca están todos en memoria a la vez
+        indice_fragmentos.asegurar_cargado(self.iterar_embeddings_fragmentos)
+    
+    def iterar_embeddings_fragmentos(self) -> Iterator[Tuple[int, int, List[float]]]:
+        """
+        Recorrer (id, documento_id, embedding) de los fragmentos con embedding, leyendo por bloques
+        
+        Solo se leen las columnas necesarias para el índice, nunca el contenido.
+        """
+        filas = db.session.query(
+            FragmentoModel.id, FragmentoModel.documento_id, FragmentoModel.embeddings
+        ).filter(FragmentoModel.embeddings.isnot(None)).execution_options(yield_per=self.FRAGMENTOS_POR_BLOQUE)
+        
+        for fila in filas:
+            if len(fila.embeddings) > 0:
+                yield fila.id, fila.documento_id, fila.embeddings
+    
+    def _asegurar_indice_lexico(self):
+        """Cargar el índice léxico una sola vez por proceso"""
+        indice_lexico.asegurar_cargado(self._iterar_textos_fragmentos)
+        
+    def _iterar_textos_fragmentos(self) -> Iterator[Tuple[int, int, str]]:
+        """Recorrer (id, documento_id, contenido) de los fragmentos, leyendo por bloques"""
+        filas = db.session.query(
+            FragmentoModel.id, FragmentoModel.documento_id, FragmentoModel.contenido
+        ).execution_options(yield_per=self.FRAGMENTOS_POR_BLOQUE)
+        
+        for fila in filas:
+            yield fila.id, fila.documento_id, fila.contenido
+    
+    def precargar_indices(self):
+        """Cargar los índices en memoria sin esperar a la primera búsqueda"""
+        self._asegurar_indice()
+        if Config.BUSQUEDA_HIBRIDA:
+            self._asegurar_indice_lexico()
+    
+    def _obtener_fragmentos(self, fragmentos_ids: List[int]) -> List[FragmentoEntity]:
+        """
+        Obtener fragmentos por id conservando el orden recibido
+        
+        Dentro de una unidad de trabajo los fragmentos ya leídos (p. ej. por la
+        búsqueda por similitud antes de la léxica) no se vuelven a consultar.
+        """
+        if not fragmentos_ids:
+            return []
+        
+        fragmentos_por_id = unidad_trabajo.obtener_registradas('fragmento', fragmentos_ids)
+        faltantes = [fragmento_id for fragmento_id in fragmentos_ids if fragmento_id not in fragmentos_por_id]
+        if faltantes:
+            for modelo in FragmentoModel.query.filter(FragmentoModel.id.in_(faltantes)).all():
+                fragmentos_por_id[modelo.id] = self._crear_entidad_fragmento(modelo)
+                unidad_trabajo.registrar('fragmento', modelo.id, fragmentos_por_id[modelo.id])
+        
+        return [fragmentos_por_id[fragmento_id] for fragmento_id in fragmentos_ids if fragmento_id in fragmentos_por_id]
@@ -0,0 +1,172 @@
+"""
+Implementación del repositorio de documentos con búsqueda vectorial en PostgreSQL (pgvector)
+"""
+from typing import List, Optional
+import numpy as np
+from funcionalidades.documentos.domain.entities.fragmento_entity import FragmentoEntity
+from funcionalidades.documentos.infrastructure.documento_repository_impl import DocumentoRepositoryImpl
+from funcionalidades.documentos.infrastructure.fragmento_model import FragmentoModel
+from funcionalidades.core.infraestructura.database import db
+from funcionalidades.core.infraestructura.config import Config
+from funcionalidades.core.exceptions.domain_exceptions import ProcessingError
+
+
+class DocumentoRepositoryPgvectorImpl(DocumentoRepositoryImpl):
+    """
+    Repositorio que delega la búsqueda por similitud a PostgreSQL
+    
+    Los vectores se guardan además en la columna ``fragmentos.embedding_vector``
+    (tipo ``vector``), indexada con HNSW o IVFFlat (ver la migración
+    b2d4f6a80002). La búsqueda se resuelve en SQL con el operador de distancia
+    coseno ``<=>``. Si la columna no existe (extensión no instalada o migración
+    sin aplicar) se usa la búsqueda en memoria de DocumentoRepositoryImpl.
+    """
+    
+    COLUMNA_VECTOR = 'embedding_vector'
+    
+    # Resultado de la verificación de pgvector, compartido por todas las instancias
+    _pgvector_disponible: Optional[bool] = None
+    
+    def pgvector_disponible(self) -> bool:
+        """Verificar (una vez por proceso) si la columna vectorial existe"""
+        if DocumentoRepositoryPgvectorImpl._pgvector_disponible is None:
+            try:
+                existe = db.session.execute(
+                    db.text(
+                        "SELECT EXISTS (SELECT 1 FROM information_schema.columns "
+                        "WHERE table_name = 'fragmentos' AND column_name = :columna)"
+                    ),
+                    {'columna': self.COLUMNA_VECTOR}
+                ).scalar()
+                DocumentoRepositoryPgvectorImpl._pgvector_disponible = bool(existe)
+            except Exception as e:
+                db.session.rollback()
+                print(f"Warning: No se pudo verificar pgvector, se usará la búsqueda en memoria: {e}")
+                DocumentoRepositoryPgvectorImpl._pgvector_disponible = False
+        
+        return DocumentoRepositoryPgvectorImpl._pgvector_disponible
+    
+    def _guardar_vectores(self, modelos: List[FragmentoModel]):
+        """Copiar los embeddings a la columna vectorial en la misma transacción"""
+        if not self.pgvector_disponible():
+            return
+        
+        parametros = [
+            {'id': modelo.id, 'vector': self.formatear_vector(modelo.embeddings)}
+            for modelo in modelos if modelo.embeddings is not None
+        ]
+        if parametros:
+            db.session.execute(
+                db.text(f"UPDATE fragmentos SET {self.COLUMNA_VECTOR} = CAST(:vector AS vector) WHERE id = :id"),
+                parametros
+            )
+    
+    def precargar_indices(self):
+        """Con pgvector la búsqueda por similitud no usa el índice en memoria; solo se carga el léxico"""
+        if not self.pgvector_disponible():
+            return super().precargar_indices()
+        
+        if Config.BUSQUEDA_HIBRIDA:
+            self._asegurar_indice_lexico()
+    
+    def buscar_por_similitud(self, query_embedding: List[float], limite: int = 5) -> List[FragmentoEntity]:
+        """Buscar los fragmentos más similares entre todos los documentos"""
+        if not self.pgvector_disponible():
+            return super().buscar_por_similitud(query_embedding, limite)
+        
+        try:
+            return self._buscar_en_postgres(query_embedding, limite, umbral=0.3)
+            
+        except Exception as e:
+            db.session.rollback()
+            raise ProcessingError(f"Error en búsqueda por similitud: {str(e)}")
+    
+    def buscar_por_similitud_en_documento(self, query_embedding: List[float], documento_id: int, limite: int = 5) -> List[FragmentoEntity]:
+        """Buscar los fragmentos más similares de un documento específico"""
+        if not self.pgvector_disponible():
+            return super().buscar_por_similitud_en_documento(query_embedding, documento_id, limite)
+        
+        try:
+            # Usar umbral más bajo para capturar más contenido del documento seleccionado
+            return self._buscar_en_postgres(query_embedding, limite, umbral=0.1, documento_id=documento_id)
+            
+        except Exception as e:
+            db.session.rollback()
+            raise ProcessingError(f"Error en búsqueda por similitud en documento: {str(e)}")
+    
+    def buscar_por_similitud_en_documentos(self, query_embedding: List[float], documentos_ids: List[int],
+                                           limite: int = 5) -> List[FragmentoEntity]:
+        """Buscar los fragmentos más similares dentro de un conjunto de documentos"""
+        if not self.pgvector_disponible():
+            return super().buscar_por_similitud_en_documentos(query_embedding, documentos_ids, limite)
+        
+        try:
+            return self._buscar_en_postgres(query_embedding, limite, umbral=0.1, documentos_ids=documentos_ids)
+            
+        except Exception as e:
+            db.session.rollback()
+            raise ProcessingError(f"Error en búsqueda por similitud en documentos: {str(e)}")
+    
+    def _buscar_en_postgres(self, query_embedding: List[float], limite: int, umbral: float,
+                            documento_id: int = None, documentos_ids: List[int] = None) -> List[FragmentoEntity]:
+        """Ejecutar la búsqueda k-NN en PostgreSQL y aplicar el umbral de similitud"""
+        parametros = {'query': self.formatear_vector(query_embedding), 'limite': limite}
+        if documento_id is not None:
+            parametros['documento_id'] = documento_id
+        if documentos_ids is not None:
+            parametros['documentos_ids'] = list(documentos_ids)
+        
+        filas = db.session.execute(
+            db.text(self.construir_consulta(
+                filtrar_documento=documento_id is not None,
+                filtrar_documentos=documentos_ids is not None
+            )),
+            parametros
+        ).fetchall()
+        
+        fragmentos_ids = [fila.id for fila in filas if fila.similitud >= umbral]
+        return self._obtener_fragmentos(fragmentos_ids)
+    
+    @classmethod
+    def construir_consulta(cls, filtrar_documento: bool = False, filtrar_documentos: bool = False) -> str:
+        """
+        Construir la consulta k-NN
+        
+        Sin filtro, el ORDER BY usa directamente la distancia ``<=>`` para que
+        PostgreSQL pueda resolverlo con el índice HNSW/IVFFlat.
+        
+        Con filtro por documento la búsqueda es exacta. El índice aproximado
+        solo recorre ``hnsw.ef_search`` (o ``ivfflat.probes``) candidatos y el
+        WHERE se aplica después, así que devolvería menos de ``limite`` filas,
+        o ninguna, cuando los fragmentos del documento no están entre ellos.
+        El CTE materializado obliga a leer primero los fragmentos de esos
+        documentos (índice sobre documento_id) y a ordenarlos todos.
+        """
+        distancia = f"{cls.COLUMNA_VECTOR} <=> CAST(:query AS vector)"
+        if not (filtrar_documento or filtrar_documentos):
+            return (
+                f"SELECT id, 1 - ({distancia}) AS similitud "
+                f"FROM fragmentos "
+                f"WHERE {cls.COLUMNA_VECTOR} IS NOT NULL "
+                f"ORDER BY {distancia} "
+                f"LIMIT :limite"
+            )
+        
+        filtro = "AND documento_id = :documento_id " if filtrar_documento else ""
+        if filtrar_documentos:
+            filtro += "AND documento_id = ANY(:documentos_ids) "
+        return (
+            f"WITH candidatos AS MATERIALIZED ("
+            f"SELECT id, {cls.COLUMNA_VECTOR} FROM fragmentos "
+            f"WHERE {cls.COLUMNA_VECTOR} IS NOT NULL {filtro}) "
+            f"SELECT id, 1 - ({distancia}) AS similitud "
+            f"FROM candidatos "
+            f"ORDER BY {distancia} "
+            f"LIMIT :limite"
+        )
+    
+    @staticmethod
+    def formatear_vector(embedding) -> str:
+        """Convertir un embedding al literal de texto de pgvector ('[x1,x2,...]')"""
+        valores = np.asarray(embedding, dtype=np.float32).ravel()
+        return '[' + ','.join(f'{valor:.7g}' for valor in valores) + ']'
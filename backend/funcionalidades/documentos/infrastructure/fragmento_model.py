@@ -0,0 +1,24 @@
+"""
+Modelo SQLAlchemy para fragmentos de documentos
+"""
+from funcionalidades.core.infraestructura.database import db, VectorBinario
+from funcionalidades.core.infraestructura.datetime_utils import get_local_now_naive
+
+
+class FragmentoModel(db.Model):
+    """Modelo de base de datos para fragmentos de documentos"""
+    
+    __tablename__ = 'fragmentos'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    documento_id = db.Column(db.Integer, db.ForeignKey('documentos.id'), nullable=False, index=True)
+    indice = db.Column(db.Integer, nullable=False)  # Posición del fragmento dentro del documento
+    pagina = db.Column(db.Integer, nullable=True)  # Página del PDF (para citar la fuente)
+    contenido = db.Column(db.Text, nullable=False)
+    embeddings = db.Column(VectorBinario, nullable=True)  # Almacenar como bytes float32
+    hash_contenido = db.Column(db.String(64), nullable=True, index=True)  # sha256 del texto del fragmento
+    modelo_embeddings = db.Column(db.String(200), nullable=True)  # Modelo que generó el embedding
+    fecha_creacion = db.Column(db.DateTime, default=get_local_now_naive, nullable=False)
+    
+    def __repr__(self):
+        return f'<Fragmento {self.documento_id}#{self.indice}>'
@@ -0,0 +1,26 @@
+"""
+Modelo SQLAlchemy para trabajos de procesamiento de documentos
+"""
+from funcionalidades.core.infraestructura.database import db
+from funcionalidades.core.infraestructura.datetime_utils import get_local_now_naive
+
+
+class TrabajoModel(db.Model):
+    """Modelo de base de datos para trabajos en segundo plano"""
+    
+    __tablename__ = 'trabajos'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(20), nullable=False)
+    estado = db.Column(db.String(20), nullable=False, index=True)
+    documento_id = db.Column(db.Integer, nullable=True)  # Sin FK: el trabajo sobrevive al documento
+    total = db.Column(db.Integer, nullable=False, default=0)
+    procesados = db.Column(db.Integer, nullable=False, default=0)
+    fallidos = db.Column(db.Integer, nullable=False, default=0)
+    documentos_fallidos = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    fecha_creacion = db.Column(db.DateTime, default=get_local_now_naive, nullable=False)
+    fecha_actualizacion = db.Column(db.DateTime, default=get_local_now_naive, onupdate=get_local_now_naive, nullable=False)
+    
+    def __repr__(self):
+        return f'<Trabajo {self.id}: {self.tipo} {self.estado}>'
@@ -0,0 +1,101 @@
+"""
+Implementación del repositorio de trabajos de procesamiento
+"""
+from typing import Optional
+from funcionalidades.documentos.domain.entities.trabajo_entity import TrabajoEntity
+from funcionalidades.documentos.domain.repositories.trabajo_repository import TrabajoRepository
+from funcionalidades.documentos.infrastructure.trabajo_model import TrabajoModel
+from funcionalidades.core.infraestructura.database import db
+from funcionalidades.core.exceptions.domain_exceptions import ProcessingError
+
+
+class TrabajoRepositoryImpl(TrabajoRepository):
+    """Implementación del repositorio de trabajos"""
+    
+    def _crear_entidad_desde_modelo(self, modelo: TrabajoModel) -> TrabajoEntity:
+        """Convertir modelo de base de datos a entidad del dominio"""
+        return TrabajoEntity(
+            id=modelo.id,
+            tipo=modelo.tipo,
+            estado=modelo.estado,
+            documento_id=modelo.documento_id,
+            total=modelo.total,
+            procesados=modelo.procesados,
+            fallidos=modelo.fallidos,
+            documentos_fallidos=list(modelo.documentos_fallidos or []),
+            error=modelo.error,
+            fecha_creacion=modelo.fecha_creacion,
+            fecha_actualizacion=modelo.fecha_actualizacion
+        )
+    
+    def agregar(self, trabajo: TrabajoEntity) -> TrabajoEntity:
+        """Agregar un nuevo trabajo"""
+        try:
+            modelo = TrabajoModel(
+                tipo=trabajo.tipo,
+                estado=trabajo.estado,
+                documento_id=trabajo.documento_id,
+                total=trabajo.total,
+                procesados=trabajo.procesados,
+                fallidos=trabajo.fallidos,
+                documentos_fallidos=list(trabajo.documentos_fallidos),
+                error=trabajo.error
+            )
+            db.session.add(modelo)
+            db.session.commit()
+            
+            return self._crear_entidad_desde_modelo(modelo)
+            
+        except Exception as e:
+            db.session.rollback()
+            raise ProcessingError(f"Error al agregar trabajo: {str(e)}")
+    
+    def get_by_id(self, trabajo_id: int) -> Optional[TrabajoEntity]:
+        """Obtener un trabajo por ID"""
+        try:
+            modelo = TrabajoModel.query.get(trabajo_id)
+            if modelo:
+                return self._crear_entidad_desde_modelo(modelo)
+            return None
+            
+        except Exception as e:
+            raise ProcessingError(f"Error al obtener trabajo: {str(e)}")
+    
+    def modificar(self, trabajo: TrabajoEntity) -> TrabajoEntity:
+        """Guardar el estado y el progreso de un trabajo"""
+        try:
+            modelo = TrabajoModel.query.get(trabajo.id)
+            if not modelo:
+                raise ProcessingError(f"Trabajo con ID {trabajo.id} no encontrado")
+            
+            modelo.estado = trabajo.estado
+            modelo.total = trabajo.total
+            modelo.procesados = trabajo.procesados
+            modelo.fallidos = trabajo.fallidos
+            modelo.documentos_fallidos = list(trabajo.documentos_fallidos)
+            modelo.error = trabajo.error
+            
+            db.session.commit()
+            
+            return self._crear_entidad_desde_modelo(modelo)
+            
+        except Exception as e:
+            db.session.rollback()
+            raise ProcessingError(f"Error al modificar trabajo: {str(e)}")
+    
+    def marcar_interrumpidos(self) -> int:
+        """Marcar como fallidos los trabajos que quedaron sin terminar (p. ej. tras un reinicio)"""
+        try:
+            cantidad = TrabajoModel.query.filter(
+                TrabajoModel.estado.in_([TrabajoEntity.PENDIENTE, TrabajoEntity.EN_PROCESO])
+            ).update(
+                {'estado': TrabajoEntity.FALLIDO, 'error': 'Trabajo interrumpido por un reinicio del servidor'},
+                synchronize_session=False
+            )
+            db.session.commit()
+            
+            return cantidad
+            
+        except Exception as e:
+            db.session.rollback()
+            raise ProcessingError(f"Error al marcar trabajos interrumpidos: {str(e)}")
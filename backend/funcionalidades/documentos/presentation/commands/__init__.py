@@ -0,0 +1 @@
+# Comandos de consola de documentos
@@ -0,0 +1,30 @@
+"""
+Comandos de consola para el índice vectorial
+"""
+import click
+from flask.cli import with_appcontext
+from funcionalidades.documentos.application.use_cases.evaluar_indice_use_case import EvaluarIndiceUseCase
+from funcionalidades.documentos.infrastructure.documento_repository_impl import DocumentoRepositoryImpl
+from funcionalidades.core.exceptions.domain_exceptions import ValidationError, ProcessingError
+
+
+@click.command('evaluar-indice')
+@click.option('--k', default=10, show_default=True, help='Resultados por consulta')
+@click.option('--consultas', default=200, show_default=True, help='Fragmentos usados como consulta')
+@click.option('--factor', type=int, default=None,
+              help='Candidatos por resultado que se vuelven a puntuar (por defecto INDICE_FACTOR_REVISION)')
+@click.option('--semilla', default=0, show_default=True, help='Semilla de la muestra de consultas')
+@with_appcontext
+def evaluar_indice_command(k, consultas, factor, semilla):
+    """Medir recall@k, latencia y memoria del índice cuantizado frente a la búsqueda exacta"""
+    try:
+        resultados = EvaluarIndiceUseCase(DocumentoRepositoryImpl()).ejecutar(k, consultas, factor, semilla)
+    except (ValidationError, ProcessingError) as e:
+        raise click.ClickException(str(e))
+    
+    click.echo(f"{'Modo':<26}{'recall@' + str(k):>10}{'ms/consulta':>13}{'memoria':>12}{'reducción':>11}")
+    for resultado in resultados:
+        click.echo(
+            f"{resultado['modo']:<26}{resultado['recall']:>10.4f}{resultado['latencia_ms']:>13.3f}"
+            f"{resultado['memoria_bytes'] / 1024 / 1024:>10.1f}MB{resultado['reduccion']:>10.1f}x"
+        )
@@ -1,31 +1,55 @@
 """
 Controlador REST para documentos
 """
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from werkzeug.utils import secure_filename
-import os
-import PyPDF2
-from io import BytesIO
 from funcionalidades.documentos.application.use_cases.crear_documento_use_case import CrearDocumentoUseCase
+from funcionalidades.documentos.application.use_cases.ingestar_documento_use_case import IngestarDocumentoUseCase
 from funcionalidades.documentos.application.use_cases.listar_documentos_use_case import ListarDocumentosUseCase
 from funcionalidades.documentos.application.use_cases.obtener_documento_use_case import ObtenerDocumentoUseCase
 from funcionalidades.documentos.application.use_cases.eliminar_documento_use_case import EliminarDocumentoUseCase
 from funcionalidades.documentos.application.use_cases.procesar_documento_use_case import ProcesarDocumentoUseCase
-from funcionalidades.documentos.infrastructure.documento_repository_impl import DocumentoRepositoryImpl
+from funcionalidades.documentos.application.use_cases.procesar_en_segundo_plano_use_case import ProcesarEnSegundoPlanUseCase
+from funcionalidades.documentos.application.use_cases.resumir_documento_use_case import ResumirDocumentoUseCase
+from funcionalidades.documentos.infrastructure.documento_repository_factory import crear_documento_repository
+from funcionalidades.documentos.infrastructure.trabajo_repository_impl import TrabajoRepositoryImpl
 from funcionalidades.core.infraestructura.embeddings_service import EmbeddingsService
+from funcionalidades.core.infraestructura.openai_service import OpenAIService
+from funcionalidades.core.infraestructura.cola_tareas import ColaTareas
+from funcionalidades.core.infraestructura.extraccion_pdf_service import ExtraccionPdfService
+from funcionalidades.core.infraestructura.config import Config
 from funcionalidades.core.exceptions.domain_exceptions import ValidationError, NotFoundError, ProcessingError
 
 # Crear Blueprint
 documento_bp = Blueprint('documentos', __name__, url_prefix='/api/documentos')
 
 # Inicializar repositorio y casos de uso
-documento_repository = DocumentoRepositoryImpl()
 embeddings_service = EmbeddingsService()
+documento_repository = crear_documento_repository(embeddings_service)
 crear_documento_use_case = CrearDocumentoUseCase(documento_repository)
 listar_documentos_use_case = ListarDocumentosUseCase(documento_repository)
 obtener_documento_use_case = ObtenerDocumentoUseCase(documento_repository)
 eliminar_documento_use_case = EliminarDocumentoUseCase(documento_repository)
-procesar_documento_use_case = ProcesarDocumentoUseCase(documento_repository, embeddings_service)
+resumir_documento_use_case = (
+    ResumirDocumentoUseCase(documento_repository, OpenAIService()) if Config.DOCUMENTOS_RESUMEN else None
+)
+procesar_documento_use_case = ProcesarDocumentoUseCase(
+    documento_repository, embeddings_service, resumir_documento_use_case=resumir_documento_use_case
+)
+ingestar_documento_use_case = IngestarDocumentoUseCase(crear_documento_use_case, procesar_documento_use_case)
+trabajo_repository = TrabajoRepositoryImpl()
+extraccion_pdf_service = ExtraccionPdfService()
+procesar_en_segundo_plano_use_case = ProcesarEnSegundoPlanUseCase(
+    trabajo_repository, documento_repository, procesar_documento_use_case
+)
+
+# Grupo de hilos que ejecuta los trabajos de procesamiento fuera de las peticiones HTTP
+cola_trabajos = ColaTareas(
+    max_trabajadores=Config.TRABAJOS_TRABAJADORES,
+    max_pendientes=Config.TRABAJOS_COLA_MAXIMA,
+    max_por_cliente=Config.TRABAJOS_COLA_MAXIMA,
+    nombre='trabajos'
+)
 
 
 @documento_bp.route('/', methods=['POST'])
@@ -54,28 +78,37 @@ def crear_documento():
         if file_size > max_size:
             return jsonify({'error': f'El archivo no puede ser mayor a 10MB. Tamaño actual: {file_size / (1024*1024):.2f}MB'}), 400
         
-        # Leer contenido del archivo PDF
-        contenido = _extraer_texto_pdf(archivo)
-        if not contenido.strip():
-            return jsonify({'error': 'No se pudo extraer texto del archivo PDF'}), 400
+        # Copiar el PDF a disco calculando su huella; un archivo idéntico no se vuelve a extraer
+        ruta, hash_archivo = extraccion_pdf_service.guardar_temporal(archivo.stream)
+        try:
+            existente = crear_documento_use_case.buscar_duplicado(hash_archivo=hash_archivo)
+            if existente:
+                return _responder_duplicado(existente)
+            
+            # Fragmentar y codificar cada página mientras se extraen las siguientes;
+            # otro archivo con el mismo texto (p. ej. el mismo PDF guardado de nuevo) es un duplicado
+            documento, duplicado = ingestar_documento_use_case.ejecutar(
+                nombre=secure_filename(archivo.filename),
+                paginas=extraccion_pdf_service.iterar_paginas(ruta),
+                hash_archivo=hash_archivo
+            )
+        finally:
+            extraccion_pdf_service.eliminar_temporal(ruta)
         
-        # Crear documento
-        documento = crear_documento_use_case.ejecutar(
-            nombre=secure_filename(archivo.filename),
-            contenido=contenido
-        )
+        if duplicado:
+            return _responder_duplicado(documento)
         
-        return jsonify({
-            'id': documento.id,
-            'nombre': documento.nombre,
-            'fecha_creacion': documento.fecha_creacion.isoformat(),
-            'fecha_actualizacion': documento.fecha_actualizacion.isoformat(),
-            'tiene_embeddings': documento.tiene_embeddings(),
-            'procesado': documento.tiene_embeddings(),
-            'embeddings_generados': documento.tiene_embeddings(),
-            'tamaño': len(documento.contenido.encode('utf-8')) if documento.contenido else 0,
+        # El documento ya se puede buscar; el resumen se genera en segundo plano
+        respuesta = {
+            **_serializar_documento_creado(documento),
+            'duplicado': False,
             'mensaje': 'Documento creado exitosamente'
-        }), 201
+        }
+        if resumir_documento_use_case and documento.tiene_embeddings():
+            trabajo = _enviar_a_la_cola(procesar_en_segundo_plano_use_case.crear_trabajo(documento.id))
+            respuesta['trabajo_id'] = trabajo.id
+        
+        return jsonify(respuesta), 201
         
     except ValidationError as e:
         return jsonify({'error': str(e)}), 400
@@ -87,9 +120,19 @@ def crear_documento():
 
 @documento_bp.route('/', methods=['GET'])
 def listar_documentos():
-    """Listar todos los documentos"""
+    """
+    Listar documentos por páginas, del más reciente al más antiguo
+    
+    Parámetros: limite, antes_de (cursor devuelto en 'siguiente'), procesado
+    (true/false) y nombre (texto contenido en el nombre).
+    """
     try:
-        documentos = listar_documentos_use_case.ejecutar()
+        documentos, siguiente = listar_documentos_use_case.ejecutar(
+            limite=_leer_entero('limite'),
+            antes_de=_leer_entero('antes_de'),
+            procesado=_leer_booleano('procesado'),
+            nombre=request.args.get('nombre', '').strip() or None
+        )
         
         return jsonify({
             'documentos': [{
@@ -97,13 +140,17 @@ def listar_documentos():
                 'nombre': doc.nombre,
                 'fecha_creacion': doc.fecha_creacion.isoformat(),
                 'fecha_actualizacion': doc.fecha_actualizacion.isoformat(),
-                'tiene_embeddings': doc.tiene_embeddings(),
-                'procesado': doc.tiene_embeddings(),  # Un documento está procesado si tiene embeddings
-                'embeddings_generados': doc.tiene_embeddings(),  # Alias para consistencia con frontend
-                'tamaño': len(doc.contenido.encode('utf-8')) if doc.contenido else 0  # Tamaño en bytes
-            } for doc in documentos]
+                'tiene_embeddings': doc.procesado,
+                'procesado': doc.procesado,  # Un documento está procesado si tiene embeddings
+                'embeddings_generados': doc.procesado,  # Alias para consistencia con frontend
+                'tamaño': doc.tamano_bytes  # Tamaño en bytes
+            } for doc in documentos],
+            'siguiente': siguiente,
+            'hay_mas': siguiente is not None
         }), 200
         
+    except ValidationError as e:
+        return jsonify({'error': str(e)}), 400
     except ProcessingError as e:
         return jsonify({'error': str(e)}), 500
     except Exception as e:
@@ -122,7 +169,8 @@ def obtener_documento(documento_id):
             'contenido': documento.contenido,
             'fecha_creacion': documento.fecha_creacion.isoformat(),
             'fecha_actualizacion': documento.fecha_actualizacion.isoformat(),
-            'tiene_embeddings': documento.tiene_embeddings()
+            'tiene_embeddings': documento.tiene_embeddings(),
+            'resumen': documento.resumen
         }), 200
         
     except NotFoundError as e:
@@ -151,20 +199,10 @@ def eliminar_documento(documento_id):
 
 @documento_bp.route('/<int:documento_id>/procesar', methods=['POST'])
 def procesar_documento(documento_id):
-    """Procesar un documento y generar embeddings"""
+    """Encolar el procesamiento de un documento y devolver el trabajo creado"""
     try:
-        documento_procesado = procesar_documento_use_case.ejecutar(documento_id)
-        
-        return jsonify({
-            'id': documento_procesado.id,
-            'nombre': documento_procesado.nombre,
-            'tiene_embeddings': documento_procesado.tiene_embeddings(),
-            'procesado': documento_procesado.tiene_embeddings(),
-            'embeddings_generados': documento_procesado.tiene_embeddings(),
-            'tamaño': len(documento_procesado.contenido.encode('utf-8')) if documento_procesado.contenido else 0,
-            'fecha_actualizacion': documento_procesado.fecha_actualizacion.isoformat(),
-            'mensaje': 'Documento procesado exitosamente'
-        }), 200
+        trabajo = procesar_en_segundo_plano_use_case.crear_trabajo(documento_id)
+        return _encolar_trabajo(trabajo)
         
     except NotFoundError as e:
         return jsonify({'error': str(e)}), 404
@@ -176,14 +214,10 @@ def procesar_documento(documento_id):
 
 @documento_bp.route('/procesar-todos', methods=['POST'])
 def procesar_todos_documentos():
-    """Procesar todos los documentos que no tienen embeddings"""
+    """Encolar el procesamiento de todos los documentos que no tienen embeddings"""
     try:
-        documentos_procesados = procesar_documento_use_case.procesar_todos_los_documentos()
-        
-        return jsonify({
-            'documentos_procesados': len(documentos_procesados),
-            'mensaje': f'Se procesaron {len(documentos_procesados)} documentos exitosamente'
-        }), 200
+        trabajo = procesar_en_segundo_plano_use_case.crear_trabajo()
+        return _encolar_trabajo(trabajo)
         
     except ProcessingError as e:
         return jsonify({'error': str(e)}), 500
@@ -191,24 +225,123 @@ def procesar_todos_documentos():
         return jsonify({'error': f'Error interno: {str(e)}'}), 500
 
 
-def _extraer_texto_pdf(archivo):
-    """Extraer texto de un archivo PDF"""
+@documento_bp.route('/jobs/<int:trabajo_id>', methods=['GET'])
+def obtener_trabajo(trabajo_id):
+    """Obtener el estado y el progreso de un trabajo de procesamiento"""
     try:
-        # Leer el archivo en memoria
-        archivo_bytes = archivo.read()
-        archivo.seek(0)  # Resetear posición del archivo
-        
-        # Crear objeto PDF
-        pdf_reader = PyPDF2.PdfReader(BytesIO(archivo_bytes))
+        trabajo = procesar_en_segundo_plano_use_case.obtener(trabajo_id)
+        return jsonify(_serializar_trabajo(trabajo)), 200
         
-        # Extraer texto de todas las páginas
-        texto_completo = ""
-        for pagina in pdf_reader.pages:
-            texto_completo += pagina.extract_text() + "\n"
+    except NotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except ProcessingError as e:
+        return jsonify({'error': str(e)}), 500
+    except Exception as e:
+        return jsonify({'error': f'Error interno: {str(e)}'}), 500
+
+
+def _encolar_trabajo(trabajo):
+    """Enviar un trabajo al grupo de hilos y responder 202 con su ID"""
+    trabajo = _enviar_a_la_cola(trabajo)
+    if trabajo.error:
+        return jsonify({**_serializar_trabajo(trabajo), 'error': trabajo.error}), 503
+    
+    return jsonify({
+        **_serializar_trabajo(trabajo),
+        'mensaje': 'Procesamiento encolado',
+        'url_estado': f'{documento_bp.url_prefix}/jobs/{trabajo.id}'
+    }), 202
+
+
+def _enviar_a_la_cola(trabajo):
+    """Enviar un trabajo al grupo de hilos, o marcarlo fallido si la cola está llena"""
+    app = current_app._get_current_object()
+    
+    if not cola_trabajos.enviar('trabajos', _ejecutar_trabajo, app, trabajo.id):
+        return procesar_en_segundo_plano_use_case.marcar_fallido(
+            trabajo, 'La cola de procesamiento está llena, intenta de nuevo más tarde'
+        )
+    return trabajo
+
+
+def _ejecutar_trabajo(app, trabajo_id):
+    """Ejecutar un trabajo en segundo plano emitiendo su progreso por Socket.IO"""
+    with app.app_context():
+        socketio = app.extensions.get('socketio')
         
-        return texto_completo.strip()
+        def al_progresar(trabajo, documento_id):
+            if socketio:
+                socketio.emit('trabajo_progreso', {**_serializar_trabajo(trabajo), 'documento_id_actual': documento_id})
         
-    except Exception as e:
-        raise ProcessingError(f"Error al extraer texto del PDF: {str(e)}")
+        procesar_en_segundo_plano_use_case.ejecutar(trabajo_id, al_progresar)
+
+
+def _serializar_trabajo(trabajo):
+    """Convertir un trabajo al formato de respuesta"""
+    datos = {
+        'trabajo_id': trabajo.id,
+        'tipo': trabajo.tipo,
+        'estado': trabajo.estado,
+        'documento_id': trabajo.documento_id,
+        'total': trabajo.total,
+        'procesados': trabajo.procesados,
+        'fallidos': trabajo.fallidos,
+        'documentos_fallidos': trabajo.documentos_fallidos,
+        'progreso': trabajo.progreso(),
+        'error': trabajo.error,
+        'fecha_creacion': trabajo.fecha_creacion.isoformat() if trabajo.fecha_creacion else None,
+        'fecha_actualizacion': trabajo.fecha_actualizacion.isoformat() if trabajo.fecha_actualizacion else None
+    }
+    
+    # Rendimiento del trabajo terminado
+    if trabajo.esta_terminado() and trabajo.fecha_creacion and trabajo.fecha_actualizacion:
+        segundos = (trabajo.fecha_actualizacion - trabajo.fecha_creacion).total_seconds()
+        datos['documentos_por_segundo'] = round(trabajo.procesados / segundos, 2) if segundos > 0 else None
+    
+    return datos
+
+
+def _responder_duplicado(documento):
+    """Responder con el documento que ya existía en lugar de crear otro"""
+    return jsonify({
+        **_serializar_documento_creado(documento),
+        'duplicado': True,
+        'mensaje': 'El documento ya había sido subido'
+    }), 200
+
+
+def _serializar_documento_creado(documento):
+    """Convertir un documento al formato de respuesta de la subida"""
+    return {
+        'id': documento.id,
+        'nombre': documento.nombre,
+        'fecha_creacion': documento.fecha_creacion.isoformat(),
+        'fecha_actualizacion': documento.fecha_actualizacion.isoformat(),
+        'tiene_embeddings': documento.tiene_embeddings(),
+        'procesado': documento.tiene_embeddings(),
+        'embeddings_generados': documento.tiene_embeddings(),
+        'tamaño': len(documento.contenido.encode('utf-8')) if documento.contenido else 0
+    }
+
+
+def _leer_entero(nombre):
+    """Leer un parámetro entero opcional de la URL"""
+    valor = request.args.get(nombre)
+    if valor is None or valor == '':
+        return None
+    try:
+        return int(valor)
+    except ValueError:
+        raise ValidationError(f"El parámetro '{nombre}' debe ser un número entero")
 
 
+def _leer_booleano(nombre):
+    """Leer un parámetro booleano opcional de la URL (true/false)"""
+    valor = request.args.get(nombre)
+    if valor is None or valor == '':
+        return None
+    if valor.lower() in ('true', '1', 'si', 'sí'):
+        return True
+    if valor.lower() in ('false', '0', 'no'):
+        return False
+    raise ValidationError(f"El parámetro '{nombre}' debe ser true o false")
@@ -0,0 +1,103 @@
+"""Almacenar embeddings como bytes float32 en lugar de JSON
+
+Revision ID: a1c3e5f70001
+Revises:
+Create Date: 2026-10-18 10:00:00.000000
+
+Convierte la columna ``embeddings`` de ``documentos`` y ``fragmentos`` de JSON
+a LargeBinary (float32, 4 bytes por dimensión). Las tablas que no existen aún
+o que ya usan la columna binaria se omiten, por lo que la migración se puede
+aplicar tanto sobre una base creada con ``db.create_all()`` como sobre una
+base nueva.
+
+"""
+import json
+from alembic import op
+import numpy as np
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1c3e5f70001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+TABLAS = ('documentos', 'fragmentos')
+TAMANO_LOTE = 500
+
+
+def _columna_embeddings(tabla):
+    """Obtener la definición reflejada de la columna embeddings, si existe"""
+    inspector = sa.inspect(op.get_bind())
+    if tabla not in inspector.get_table_names():
+        return None
+    
+    for columna in inspector.get_columns(tabla):
+        if columna['name'] == 'embeddings':
+            return columna
+    return None
+
+
+def _convertir(tabla, origen, destino, convertir_valor):
+    """Copiar la columna origen en destino aplicando convertir_valor por lotes"""
+    conexion = op.get_bind()
+    ultimo_id = 0
+    
+    while True:
+        filas = conexion.execute(
+            sa.text(
+                f"SELECT id, {origen} FROM {tabla} "
+                f"WHERE id > :ultimo_id AND {origen} IS NOT NULL ORDER BY id LIMIT :limite"
+            ),
+            {'ultimo_id': ultimo_id, 'limite': TAMANO_LOTE}
+        ).fetchall()
+        
+        if not filas:
+            break
+        
+        conexion.execute(
+            sa.text(f"UPDATE {tabla} SET {destino} = :valor WHERE id = :id"),
+            [{'id': fila[0], 'valor': convertir_valor(fila[1])} for fila in filas]
+        )
+        ultimo_id = filas[-1][0]
+
+
+def _json_a_bytes(valor):
+    if isinstance(valor, (str, bytes)):
+        valor = json.loads(valor)
+    return np.asarray(valor, dtype=np.float32).tobytes()
+
+
+def _bytes_a_json(valor):
+    return json.dumps(np.frombuffer(valor, dtype=np.float32).tolist())
+
+
+def _reemplazar_columna(tabla, tipo_nuevo, convertir_valor):
+    """Crear la columna con el tipo nuevo, migrar los datos y renombrarla"""
+    with op.batch_alter_table(tabla) as batch_op:
+        batch_op.add_column(sa.Column('embeddings_nuevo', tipo_nuevo, nullable=True))
+    
+    _convertir(tabla, 'embeddings', 'embeddings_nuevo', convertir_valor)
+    
+    with op.batch_alter_table(tabla) as batch_op:
+        batch_op.drop_column('embeddings')
+        batch_op.alter_column('embeddings_nuevo', new_column_name='embeddings')
+
+
+def upgrade():
+    for tabla in TABLAS:
+        columna = _columna_embeddings(tabla)
+        if columna is None or isinstance(columna['type'], sa.LargeBinary):
+            continue
+        
+        _reemplazar_columna(tabla, sa.LargeBinary(), _json_a_bytes)
+
+
+def downgrade():
+    for tabla in TABLAS:
+        columna = _columna_embeddings(tabla)
+        if columna is None or not isinstance(columna['type'], sa.LargeBinary):
+            continue
+        
+        _reemplazar_columna(tabla, sa.JSON(), _bytes_a_json)
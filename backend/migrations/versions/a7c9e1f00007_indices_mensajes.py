@@ -0,0 +1,51 @@
+"""Índices para el historial de mensajes
+
+Revision ID: a7c9e1f00007
+Revises: f6b8d0e00006
+Create Date: 2026-10-18 16:00:00.000000
+
+El historial se lee ordenado por fecha, en general y por documento. Sin
+índices cada página ordenaba la tabla completa de mensajes.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c9e1f00007'
+down_revision = 'f6b8d0e00006'
+branch_labels = None
+depends_on = None
+
+INDICES = {
+    'ix_mensajes_documento_id_fecha_creacion': ['documento_id', 'fecha_creacion'],
+    'ix_mensajes_fecha_creacion': ['fecha_creacion'],
+}
+
+
+def _indices(tabla):
+    inspector = sa.inspect(op.get_bind())
+    if tabla not in inspector.get_table_names():
+        return None
+    return {indice['name'] for indice in inspector.get_indexes(tabla)}
+
+
+def upgrade():
+    existentes = _indices('mensajes')
+    if existentes is None:
+        return
+    
+    for nombre, columnas in INDICES.items():
+        if nombre not in existentes:
+            op.create_index(nombre, 'mensajes', columnas)
+
+
+def downgrade():
+    existentes = _indices('mensajes')
+    if existentes is None:
+        return
+    
+    for nombre in INDICES:
+        if nombre in existentes:
+            op.drop_index(nombre, table_name='mensajes')
@@ -0,0 +1,84 @@
+"""Columna pgvector con índice ANN para fragmentos (solo PostgreSQL)
+
+Revision ID: b2d4f6a80002
+Revises: a1c3e5f70001
+Create Date: 2026-10-18 11:00:00.000000
+
+Instala la extensión ``vector``, agrega ``fragmentos.embedding_vector`` con la
+dimensión de Config.EMBEDDINGS_DIMENSION, copia los embeddings existentes y
+crea un índice HNSW o IVFFlat (Config.PGVECTOR_INDICE) con distancia coseno.
+En SQLite no hace nada: la búsqueda sigue resolviéndose en memoria.
+
+"""
+from alembic import op
+import numpy as np
+import sqlalchemy as sa
+from funcionalidades.core.infraestructura.config import Config
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2d4f6a80002'
+down_revision = 'a1c3e5f70001'
+branch_labels = None
+depends_on = None
+
+TAMANO_LOTE = 500
+
+
+def _es_postgres():
+    return op.get_bind().dialect.name == 'postgresql'
+
+
+def _formatear_vector(valor):
+    valores = np.frombuffer(valor, dtype=np.float32)
+    return '[' + ','.join(f'{v:.7g}' for v in valores) + ']'
+
+
+def upgrade():
+    if not _es_postgres():
+        return
+    
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    op.execute(
+        f"ALTER TABLE fragmentos ADD COLUMN IF NOT EXISTS embedding_vector vector({Config.EMBEDDINGS_DIMENSION})"
+    )
+    
+    # Copiar los embeddings binarios existentes a la columna vectorial
+    conexion = op.get_bind()
+    ultimo_id = 0
+    while True:
+        filas = conexion.execute(
+            sa.text(
+                "SELECT id, embeddings FROM fragmentos "
+                "WHERE id > :ultimo_id AND embeddings IS NOT NULL ORDER BY id LIMIT :limite"
+            ),
+            {'ultimo_id': ultimo_id, 'limite': TAMANO_LOTE}
+        ).fetchall()
+        
+        if not filas:
+            break
+        
+        conexion.execute(
+            sa.text("UPDATE fragmentos SET embedding_vector = CAST(:vector AS vector) WHERE id = :id"),
+            [{'id': fila[0], 'vector': _formatear_vector(fila[1])} for fila in filas]
+        )
+        ultimo_id = filas[-1][0]
+    
+    if Config.PGVECTOR_INDICE == 'ivfflat':
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_fragmentos_embedding_vector ON fragmentos "
+            "USING ivfflat (embedding_vector vector_cosine_ops) WITH (lists = 100)"
+        )
+    else:
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_fragmentos_embedding_vector ON fragmentos "
+            "USING hnsw (embedding_vector vector_cosine_ops)"
+        )
+
+
+def downgrade():
+    if not _es_postgres():
+        return
+    
+    op.execute("DROP INDEX IF EXISTS ix_fragmentos_embedding_vector")
+    op.execute("ALTER TABLE fragmentos DROP COLUMN IF EXISTS embedding_vector")
@@ -0,0 +1,48 @@
+"""Tabla de resúmenes de conversación
+
+Revision ID: b8d0f2a00008
+Revises: a7c9e1f00007
+Create Date: 2026-10-18 17:00:00.000000
+
+Crea la tabla ``resumenes_conversacion`` con el resumen acumulado de los turnos
+antiguos de cada conversación (una por documento y una general). Si la tabla ya
+existe (creada con ``db.create_all()``) no se modifica.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8d0f2a00008'
+down_revision = 'a7c9e1f00007'
+branch_labels = None
+depends_on = None
+
+
+def _existe_tabla(tabla):
+    return tabla in sa.inspect(op.get_bind()).get_table_names()
+
+
+def upgrade():
+    if _existe_tabla('resumenes_conversacion'):
+        return
+    
+    op.create_table(
+        'resumenes_conversacion',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('conversacion', sa.String(length=64), nullable=False, unique=True),
+        sa.Column('documento_id', sa.Integer(), nullable=True),
+        sa.Column('resumen', sa.Text(), nullable=False),
+        sa.Column('ultimo_mensaje_id', sa.Integer(), nullable=False),
+        sa.Column('fecha_actualizacion', sa.DateTime(), nullable=False)
+    )
+    op.create_index('ix_resumenes_conversacion_documento_id', 'resumenes_conversacion', ['documento_id'])
+
+
+def downgrade():
+    if not _existe_tabla('resumenes_conversacion'):
+        return
+    
+    op.drop_index('ix_resumenes_conversacion_documento_id', table_name='resumenes_conversacion')
+    op.drop_table('resumenes_conversacion')
@@ -0,0 +1,53 @@
+"""Tabla de trabajos de procesamiento en segundo plano
+
+Revision ID: c3e5a7b90003
+Revises: b2d4f6a80002
+Create Date: 2026-10-18 12:00:00.000000
+
+Crea la tabla ``trabajos`` con el estado y el progreso de cada procesamiento
+encolado desde /procesar y /procesar-todos. Si la tabla ya existe (creada con
+``db.create_all()``) no se modifica.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e5a7b90003'
+down_revision = 'b2d4f6a80002'
+branch_labels = None
+depends_on = None
+
+
+def _existe_tabla(tabla):
+    return tabla in sa.inspect(op.get_bind()).get_table_names()
+
+
+def upgrade():
+    if _existe_tabla('trabajos'):
+        return
+    
+    op.create_table(
+        'trabajos',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('tipo', sa.String(length=20), nullable=False),
+        sa.Column('estado', sa.String(length=20), nullable=False),
+        sa.Column('documento_id', sa.Integer(), nullable=True),
+        sa.Column('total', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('procesados', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('fallidos', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('documentos_fallidos', sa.JSON(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('fecha_creacion', sa.DateTime(), nullable=False),
+        sa.Column('fecha_actualizacion', sa.DateTime(), nullable=False)
+    )
+    op.create_index('ix_trabajos_estado', 'trabajos', ['estado'])
+
+
+def downgrade():
+    if not _existe_tabla('trabajos'):
+        return
+    
+    op.drop_index('ix_trabajos_estado', table_name='trabajos')
+    op.drop_table('trabajos')
@@ -0,0 +1,45 @@
+"""Resumen generado de cada documento
+
+Revision ID: c9e1a3b00009
+Revises: b8d0f2a00008
+Create Date: 2026-10-18 18:00:00.000000
+
+Agrega ``documentos.resumen``, el resumen jerárquico generado al procesar el
+documento, con el que se responden las preguntas generales. Los documentos ya
+procesados lo reciben la próxima vez que se procesan.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9e1a3b00009'
+down_revision = 'b8d0f2a00008'
+branch_labels = None
+depends_on = None
+
+
+def _columnas(tabla):
+    inspector = sa.inspect(op.get_bind())
+    if tabla not in inspector.get_table_names():
+        return None
+    return {columna['name'] for columna in inspector.get_columns(tabla)}
+
+
+def upgrade():
+    columnas = _columnas('documentos')
+    if columnas is None or 'resumen' in columnas:
+        return
+    
+    with op.batch_alter_table('documentos') as batch_op:
+        batch_op.add_column(sa.Column('resumen', sa.Text(), nullable=True))
+
+
+def downgrade():
+    columnas = _columnas('documentos')
+    if columnas is None or 'resumen' not in columnas:
+        return
+    
+    with op.batch_alter_table('documentos') as batch_op:
+        batch_op.drop_column('resumen')
@@ -0,0 +1,46 @@
+"""Modelo de embeddings de cada fragmento
+
+Revision ID: d0f2b4c00010
+Revises: c9e1a3b00009
+Create Date: 2026-10-18 20:00:00.000000
+
+Agrega ``fragmentos.modelo_embeddings``, el modelo que generó el embedding del
+fragmento: un fragmento con el mismo texto solo reutiliza embeddings del mismo
+modelo. No se sabe con qué modelo se generaron las filas existentes, así que
+quedan vacías y no se reutilizan hasta que su documento se vuelve a procesar.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd0f2b4c00010'
+down_revision = 'c9e1a3b00009'
+branch_labels = None
+depends_on = None
+
+
+def _columnas(tabla):
+    inspector = sa.inspect(op.get_bind())
+    if tabla not in inspector.get_table_names():
+        return None
+    return {columna['name'] for columna in inspector.get_columns(tabla)}
+
+
+def upgrade():
+    columnas = _columnas('fragmentos')
+    if columnas is None or 'modelo_embeddings' in columnas:
+        return
+    
+    with op.batch_alter_table('fragmentos') as batch_op:
+        batch_op.add_column(sa.Column('modelo_embeddings', sa.String(length=200), nullable=True))
+
+
+def downgrade():
+    columnas = _columnas('fragmentos')
+    if columnas is None or 'modelo_embeddings' not in columnas:
+        return
+    
+    with op.batch_alter_table('fragmentos') as batch_op:
+        batch_op.drop_column('modelo_embeddings')
@@ -0,0 +1,45 @@
+"""Número de página en los fragmentos
+
+Revision ID: d4f6b8c00004
+Revises: c3e5a7b90003
+Create Date: 2026-10-18 13:00:00.000000
+
+Agrega ``fragmentos.pagina`` para citar la página del PDF de la que proviene
+cada fragmento. Los fragmentos existentes quedan sin página hasta que su
+documento se vuelva a subir y procesar.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4f6b8c00004'
+down_revision = 'c3e5a7b90003'
+branch_labels = None
+depends_on = None
+
+
+def _columnas(tabla):
+    inspector = sa.inspect(op.get_bind())
+    if tabla not in inspector.get_table_names():
+        return None
+    return {columna['name'] for columna in inspector.get_columns(tabla)}
+
+
+def upgrade():
+    columnas = _columnas('fragmentos')
+    if columnas is None or 'pagina' in columnas:
+        return
+    
+    with op.batch_alter_table('fragmentos') as batch_op:
+        batch_op.add_column(sa.Column('pagina', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    columnas = _columnas('fragmentos')
+    if columnas is None or 'pagina' not in columnas:
+        return
+    
+    with op.batch_alter_table('fragmentos') as batch_op:
+        batch_op.drop_column('pagina')
@@ -0,0 +1,57 @@
+"""Sesión de los mensajes y de los resúmenes de conversación
+
+Revision ID: e1a3c5d00011
+Revises: d0f2b4c00010
+Create Date: 2026-10-18 21:00:00.000000
+
+Agrega ``mensajes.sesion`` y ``resumenes_conversacion.sesion``: la memoria de
+la conversación (turnos recientes y resumen) es de cada sesión del cliente, no
+de todos los que preguntan sobre el mismo documento. Los mensajes existentes
+no tienen sesión y siguen en el historial, pero no forman parte de la memoria
+de ninguna conversación nueva.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1a3c5d00011'
+down_revision = 'd0f2b4c00010'
+branch_labels = None
+depends_on = None
+
+INDICE_SESION = 'ix_mensajes_sesion_documento_id_fecha_creacion'
+
+
+def _columnas(tabla):
+    inspector = sa.inspect(op.get_bind())
+    if tabla not in inspector.get_table_names():
+        return None
+    return {columna['name'] for columna in inspector.get_columns(tabla)}
+
+
+def upgrade():
+    columnas = _columnas('mensajes')
+    if columnas is not None and 'sesion' not in columnas:
+        with op.batch_alter_table('mensajes') as batch_op:
+            batch_op.add_column(sa.Column('sesion', sa.String(length=32), nullable=True))
+            batch_op.create_index(INDICE_SESION, ['sesion', 'documento_id', 'fecha_creacion'])
+    
+    columnas = _columnas('resumenes_conversacion')
+    if columnas is not None and 'sesion' not in columnas:
+        with op.batch_alter_table('resumenes_conversacion') as batch_op:
+            batch_op.add_column(sa.Column('sesion', sa.String(length=32), nullable=True))
+
+
+def downgrade():
+    columnas = _columnas('resumenes_conversacion')
+    if columnas is not None and 'sesion' in columnas:
+        with op.batch_alter_table('resumenes_conversacion') as batch_op:
+            batch_op.drop_column('sesion')
+    
+    columnas = _columnas('mensajes')
+    if columnas is not None and 'sesion' in columnas:
+        with op.batch_alter_table('mensajes') as batch_op:
+            batch_op.drop_index(INDICE_SESION)
+            batch_op.drop_column('sesion')
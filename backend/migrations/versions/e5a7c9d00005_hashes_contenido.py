@@ -0,0 +1,91 @@
+"""Huellas de contenido en documentos y fragmentos
+
+Revision ID: e5a7c9d00005
+Revises: d4f6b8c00004
+Create Date: 2026-10-18 14:00:00.000000
+
+Agrega ``documentos.hash_archivo`` y ``documentos.hash_contenido`` (sha256 del
+PDF subido y del texto extraído) para reconocer subidas repetidas, y
+``fragmentos.hash_contenido`` para reutilizar el embedding de fragmentos con el
+mismo texto. Los hashes de texto de las filas existentes se calculan aquí; el
+del archivo no se puede recuperar y queda vacío.
+
+"""
+import hashlib
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a7c9d00005'
+down_revision = 'd4f6b8c00004'
+branch_labels = None
+depends_on = None
+
+FILAS_POR_LOTE = 500
+
+
+def _columnas(tabla):
+    inspector = sa.inspect(op.get_bind())
+    if tabla not in inspector.get_table_names():
+        return None
+    return {columna['name'] for columna in inspector.get_columns(tabla)}
+
+
+def _rellenar_hashes(tabla):
+    """Calcular hash_contenido de las filas existentes por lotes"""
+    bind = op.get_bind()
+    tabla_sa = sa.table(tabla, sa.column('id', sa.Integer), sa.column('contenido', sa.Text),
+                        sa.column('hash_contenido', sa.String))
+    ultimo_id = 0
+    
+    while True:
+        filas = bind.execute(
+            sa.select(tabla_sa.c.id, tabla_sa.c.contenido)
+            .where(tabla_sa.c.id > ultimo_id, tabla_sa.c.hash_contenido.is_(None))
+            .order_by(tabla_sa.c.id)
+            .limit(FILAS_POR_LOTE)
+        ).fetchall()
+        if not filas:
+            return
+        ultimo_id = filas[-1].id
+        
+        bind.execute(
+            tabla_sa.update().where(tabla_sa.c.id == sa.bindparam('fila_id')),
+            [{'fila_id': fila.id, 'hash_contenido': hashlib.sha256((fila.contenido or '').encode('utf-8')).hexdigest()}
+             for fila in filas]
+        )
+
+
+def upgrade():
+    columnas = _columnas('documentos')
+    if columnas is not None and 'hash_contenido' not in columnas:
+        with op.batch_alter_table('documentos') as batch_op:
+            batch_op.add_column(sa.Column('hash_archivo', sa.String(length=64), nullable=True))
+            batch_op.add_column(sa.Column('hash_contenido', sa.String(length=64), nullable=True))
+            batch_op.create_index('ix_documentos_hash_archivo', ['hash_archivo'])
+            batch_op.create_index('ix_documentos_hash_contenido', ['hash_contenido'])
+        _rellenar_hashes('documentos')
+    
+    columnas = _columnas('fragmentos')
+    if columnas is not None and 'hash_contenido' not in columnas:
+        with op.batch_alter_table('fragmentos') as batch_op:
+            batch_op.add_column(sa.Column('hash_contenido', sa.String(length=64), nullable=True))
+            batch_op.create_index('ix_fragmentos_hash_contenido', ['hash_contenido'])
+        _rellenar_hashes('fragmentos')
+
+
+def downgrade():
+    columnas = _columnas('fragmentos')
+    if columnas is not None and 'hash_contenido' in columnas:
+        with op.batch_alter_table('fragmentos') as batch_op:
+            batch_op.drop_index('ix_fragmentos_hash_contenido')
+            batch_op.drop_column('hash_contenido')
+    
+    columnas = _columnas('documentos')
+    if columnas is not None and 'hash_contenido' in columnas:
+        with op.batch_alter_table('documentos') as batch_op:
+            batch_op.drop_index('ix_documentos_hash_contenido')
+            batch_op.drop_index('ix_documentos_hash_archivo')
+            batch_op.drop_column('hash_contenido')
+            batch_op.drop_column('hash_archivo')
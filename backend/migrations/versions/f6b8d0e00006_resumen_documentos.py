@@ -0,0 +1,57 @@
+"""Tamaño y estado de procesamiento guardados en documentos
+
+Revision ID: f6b8d0e00006
+Revises: e5a7c9d00005
+Create Date: 2026-10-18 15:00:00.000000
+
+Agrega ``documentos.tamano_bytes`` y ``documentos.procesado``, calculados al
+escribir, para listar documentos sin leer su contenido ni sus embeddings, y un
+índice (procesado, id) para la paginación filtrada. Los valores de las filas
+existentes se calculan en la propia base de datos.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6b8d0e00006'
+down_revision = 'e5a7c9d00005'
+branch_labels = None
+depends_on = None
+
+
+def _columnas(tabla):
+    inspector = sa.inspect(op.get_bind())
+    if tabla not in inspector.get_table_names():
+        return None
+    return {columna['name'] for columna in inspector.get_columns(tabla)}
+
+
+def upgrade():
+    columnas = _columnas('documentos')
+    if columnas is None or 'procesado' in columnas:
+        return
+    
+    with op.batch_alter_table('documentos') as batch_op:
+        batch_op.add_column(sa.Column('tamano_bytes', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('procesado', sa.Boolean(), nullable=False, server_default=sa.false()))
+        batch_op.create_index('ix_documentos_procesado_id', ['procesado', 'id'])
+    
+    # Longitud en bytes del texto UTF-8
+    if op.get_bind().dialect.name == 'postgresql':
+        tamano = 'octet_length(contenido)'
+    else:
+        tamano = 'length(CAST(contenido AS BLOB))'
+    op.execute(f"UPDATE documentos SET tamano_bytes = {tamano}, procesado = (embeddings IS NOT NULL)")
+
+
+def downgrade():
+    columnas = _columnas('documentos')
+    if columnas is None or 'procesado' not in columnas:
+        return
+    
+    with op.batch_alter_table('documentos') as batch_op:
+        batch_op.drop_index('ix_documentos_procesado_id')
+        batch_op.drop_column('procesado')
+        batch_op.drop_column('tamano_bytes')
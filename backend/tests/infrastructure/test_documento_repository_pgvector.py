@@ -0,0 +1,104 @@
+"""
+Tests de la consulta k-NN del repositorio con pgvector
+
+No necesitan PostgreSQL: se comprueba el SQL generado, los parámetros que
+se envían y el umbral que se aplica a las filas devueltas.
+"""
+from types import SimpleNamespace
+import pytest
+from sqlalchemy import text
+from funcionalidades.documentos.infrastructure import documento_repository_pgvector_impl as modulo
+from funcionalidades.documentos.infrastructure.documento_repository_pgvector_impl import DocumentoRepositoryPgvectorImpl
+
+
+class SesionFalsa:
+    """Sesión que guarda la consulta ejecutada y devuelve filas fijas"""
+    
+    def __init__(self, filas):
+        self.filas = filas
+        self.consultas = []
+    
+    def execute(self, consulta, parametros):
+        self.consultas.append((str(consulta), parametros))
+        return SimpleNamespace(fetchall=lambda: self.filas)
+    
+    def rollback(self):
+        pass
+
+
+@pytest.fixture
+def sesion(monkeypatch):
+    sesion = SesionFalsa([
+        SimpleNamespace(id=11, similitud=0.9),
+        SimpleNamespace(id=12, similitud=0.35),
+        SimpleNamespace(id=13, similitud=0.05)
+    ])
+    monkeypatch.setattr(modulo, 'db', SimpleNamespace(session=sesion, text=text))
+    return sesion
+
+
+@pytest.fixture
+def repositorio(monkeypatch):
+    repositorio = DocumentoRepositoryPgvectorImpl()
+    monkeypatch.setattr(repositorio, 'pgvector_disponible', lambda: True)
+    monkeypatch.setattr(repositorio, '_obtener_fragmentos', lambda ids: ids)
+    return repositorio
+
+
+def parametros_de(consulta: str) -> set:
+    return set(text(consulta).compile().params)
+
+
+def test_consulta_sin_filtro_ordena_por_distancia_para_usar_el_indice():
+    consulta = DocumentoRepositoryPgvectorImpl.construir_consulta()
+    
+    assert "ORDER BY embedding_vector <=> CAST(:query AS vector) LIMIT :limite" in consulta
+    assert "MATERIALIZED" not in consulta
+    assert parametros_de(consulta) == {'query', 'limite'}
+
+
+def test_consulta_por_documento_filtra_antes_de_ordenar():
+    consulta = DocumentoRepositoryPgvectorImpl.construir_consulta(filtrar_documento=True)
+    
+    cte, seleccion = consulta.split(') SELECT ', 1)
+    assert cte.startswith("WITH candidatos AS MATERIALIZED (")
+    assert "documento_id = :documento_id" in cte
+    assert "FROM candidatos ORDER BY embedding_vector <=> CAST(:query AS vector) LIMIT :limite" in seleccion
+    assert parametros_de(consulta) == {'query', 'limite', 'documento_id'}
+
+
+def test_consulta_por_varios_documentos_usa_any():
+    consulta = DocumentoRepositoryPgvectorImpl.construir_consulta(filtrar_documentos=True)
+    
+    assert "documento_id = ANY(:documentos_ids)" in consulta.split(') SELECT ', 1)[0]
+    assert parametros_de(consulta) == {'query', 'limite', 'documentos_ids'}
+
+
+def test_formatear_vector():
+    assert DocumentoRepositoryPgvectorImpl.formatear_vector([0.5, -1, 2.25]) == '[0.5,-1,2.25]'
+
+
+def test_buscar_en_todos_aplica_el_umbral(sesion, repositorio):
+    resultado = repositorio.buscar_por_similitud([1.0, 0.0], limite=3)
+    
+    consulta, parametros = sesion.consultas[0]
+    assert "MATERIALIZED" not in consulta
+    assert parametros == {'query': '[1,0]', 'limite': 3}
+    assert resultado == [11, 12]
+
+
+def test_buscar_en_documento_envia_el_id_y_usa_umbral_bajo(sesion, repositorio):
+    resultado = repositorio.buscar_por_similitud_en_documento([1.0, 0.0], 7, limite=3)
+    
+    consulta, parametros = sesion.consultas[0]
+    assert "documento_id = :documento_id" in consulta
+    assert parametros == {'query': '[1,0]', 'limite': 3, 'documento_id': 7}
+    assert resultado == [11, 12]
+
+
+def test_buscar_en_documentos_envia_la_lista(sesion, repositorio):
+    repositorio.buscar_por_similitud_en_documentos([1.0, 0.0], (3, 5), limite=2)
+    
+    consulta, parametros = sesion.consultas[0]
+    assert "ANY(:documentos_ids)" in consulta
+    assert parametros == {'query': '[1,0]', 'limite': 2, 'documentos_ids': [3, 5]}
@@ -0,0 +1,134 @@
+"""
+Tests del índice léxico BM25 en memoria
+"""
+import random
+import pytest
+from funcionalidades.core.infraestructura.indice_lexico import IndiceLexico, tokenizar
+
+PALABRAS = "contrato factura cliente pago plazo entrega garantia precio multa servicio proveedor anexo".split()
+
+
+def textos_aleatorios(cantidad: int, semilla: int = 7):
+    rng = random.Random(semilla)
+    return [" ".join(rng.choice(PALABRAS) for _ in range(rng.randint(5, 30))) for _ in range(cantidad)]
+
+
+def assert_consistente(indice: IndiceLexico):
+    assert indice._longitud_total == sum(indice._longitudes.values())
+    assert set(indice._grupo_de) == set(indice._longitudes) == set(indice._terminos)
+    miembros = {}
+    for elemento_id, grupo in indice._grupo_de.items():
+        miembros.setdefault(grupo, set()).add(elemento_id)
+    assert {grupo: elementos for grupo, elementos in indice._miembros.items() if elementos} == miembros
+    for termino, postings in indice._postings.items():
+        assert postings and all(termino in indice._terminos[elemento_id] for elemento_id in postings)
+
+
+def test_tokenizar_quita_tildes_y_mayusculas():
+    assert tokenizar("Facturación ÉXITO Añadir") == ["facturacion", "exito", "anadir"]
+
+
+def test_tokenizar_conserva_numeros_y_codigos():
+    assert tokenizar("Factura FAC-98765 del lote A23") == ["factura", "fac", "98765", "lote", "a23"]
+
+
+def test_tokenizar_descarta_palabras_vacias():
+    assert tokenizar("¿Cuál es el plazo de entrega para los pedidos?") == ["plazo", "entrega", "pedidos"]
+    assert tokenizar("de la que y") == []
+    assert tokenizar(None) == []
+
+
+def test_buscar_encuentra_el_codigo_exacto():
+    indice = IndiceLexico()
+    indice.cargar([1, 2, 3], [1, 1, 2], [
+        "La factura FAC-98765 vence en marzo",
+        "La factura FAC-12345 vence en abril",
+        "Condiciones generales del contrato"
+    ])
+    
+    assert indice.buscar("¿Cuándo vence la FAC-98765?", limite=1)[0][0] == 1
+    assert [elemento_id for elemento_id, _ in indice.buscar("factura", limite=5, grupo=1)] in ([1, 2], [2, 1])
+    assert indice.buscar("factura", grupos=[2]) == []
+
+
+def test_minimo_descarta_coincidencias_parciales():
+    textos = [f"documento de la empresa sobre facturas numero {i}" for i in range(199)]
+    textos.append("la capital de francia es paris")
+    indice = IndiceLexico()
+    indice.cargar(list(range(200)), [0] * 200, textos)
+    
+    # Sin mínimo, compartir una palabra común de la pregunta basta para aparecer
+    assert len(indice.buscar("documento empresa luna", limite=3)) == 3
+    assert indice.buscar("documento empresa luna", limite=3, minimo=0.25) == []
+    
+    # Una coincidencia real supera el mínimo
+    assert [elemento_id for elemento_id, _ in indice.buscar("capital de Francia", limite=3, minimo=0.25)] == [199]
+
+
+def test_minimo_cero_no_filtra():
+    indice = IndiceLexico()
+    indice.cargar([1, 2], [1, 1], ["pago del servicio", "anexo del contrato"])
+    
+    assert indice.buscar("pago luna", minimo=0.0) == indice.buscar("pago luna")
+
+
+def test_agregar_y_eliminar_mantienen_el_indice_consistente():
+    textos = textos_aleatorios(300)
+    indice = IndiceLexico()
+    indice.cargar(list(range(100)), [i % 5 for i in range(100)], textos[:100])
+    
+    indice.agregar(list(range(100, 200)), [5 + i % 3 for i in range(100)], textos[100:200])
+    # Reemplazar ids existentes, también cambiándolos de grupo
+    indice.agregar(list(range(50, 60)), [9] * 10, textos[200:210])
+    indice.eliminar_grupo(0)
+    indice.eliminar_grupos([6, 42])
+    assert_consistente(indice)
+    
+    # El resultado es el mismo que cargar desde cero el contenido final
+    contenido = {}
+    for elemento_id in range(200):
+        contenido[elemento_id] = ((elemento_id % 5) if elemento_id < 100 else 5 + (elemento_id - 100) % 3, textos[elemento_id])
+    for elemento_id in range(50, 60):
+        contenido[elemento_id] = (9, textos[150 + elemento_id])
+    contenido = {elemento_id: valor for elemento_id, valor in contenido.items() if valor[0] not in (0, 6)}
+    
+    desde_cero = IndiceLexico()
+    desde_cero.cargar(list(contenido), [grupo for grupo, _ in contenido.values()], [texto for _, texto in contenido.values()])
+    
+    assert len(indice) == len(desde_cero)
+    assert indice._longitud_total == desde_cero._longitud_total
+    for consulta in ("factura cliente", "multa plazo entrega", "anexo"):
+        esperado = desde_cero.buscar(consulta, limite=10)
+        assert [elemento_id for elemento_id, _ in indice.buscar(consulta, limite=10)] == [elemento_id for elemento_id, _ in esperado]
+        assert [puntuacion for _, puntuacion in indice.buscar(consulta, limite=10)] == pytest.approx([puntuacion for _, puntuacion in esperado])
+
+
+def test_eliminar_todo_deja_el_indice_vacio():
+    indice = IndiceLexico()
+    indice.cargar([1, 2], [1, 2], ["pago del servicio", "anexo del contrato"])
+    
+    indice.eliminar_grupos([1, 2])
+    
+    assert len(indice) == 0
+    assert indice._longitud_total == 0
+    assert indice._postings == {}
+    assert indice.buscar("pago") == []
+
+
+def test_agregar_durante_la_carga_se_aplica_al_terminar():
+    indice = IndiceLexico()
+    
+    def filas():
+        for elemento_id in range(100):
+            if elemento_id == 50:
+                indice.agregar([999], [7], ["garantia extendida del proveedor"])
+                indice.eliminar_grupo(0)
+            yield elemento_id, elemento_id % 10, f"contrato numero {elemento_id}"
+    
+    indice.asegurar_cargado(filas)
+    
+    assert indice.cargado
+    assert len(indice) == 91
+    assert indice.buscar("garantia")[0][0] == 999
+    assert indice.buscar("contrato", limite=100, grupo=0) == []
+    assert_consistente(indice)
@@ -0,0 +1,210 @@
+"""
+Tests del índice vectorial en memoria y de su cuantización
+
+Usan un corpus sintético con semilla fija: vectores agrupados alrededor de
+unos centros, como los embeddings de fragmentos de unos pocos temas.
+"""
+import threading
+import numpy as np
+import pytest
+from funcionalidades.core.infraestructura.indice_vectorial import IndiceVectorial
+from funcionalidades.core.exceptions.domain_exceptions import ProcessingError
+
+DIMENSION = 64
+ELEMENTOS = 4000
+GRUPOS = 10
+
+
+@pytest.fixture(scope='module')
+def corpus():
+    rng = np.random.default_rng(42)
+    centros = rng.normal(size=(40, DIMENSION))
+    vectores = centros[rng.integers(40, size=ELEMENTOS)] + rng.normal(size=(ELEMENTOS, DIMENSION)) * 0.6
+    consultas = vectores[rng.integers(ELEMENTOS, size=50)] + rng.normal(size=(50, DIMENSION)) * 0.3
+    return vectores.astype(np.float32), consultas.astype(np.float32)
+
+
+def crear_indice(corpus, cuantizacion: str, factor_revision: int = 4, revisar: bool = True) -> IndiceVectorial:
+    vectores, _ = corpus
+    indice = IndiceVectorial(
+        cuantizacion, factor_revision=factor_revision,
+        leer_vectores=(lambda ids: [vectores[elemento_id] for elemento_id in ids]) if revisar else None
+    )
+    indice.cargar(list(range(ELEMENTOS)), [elemento_id % GRUPOS for elemento_id in range(ELEMENTOS)], vectores)
+    return indice
+
+
+def recall(corpus, indice: IndiceVectorial, k: int = 10) -> float:
+    vectores, consultas = corpus
+    normalizados = vectores / np.linalg.norm(vectores, axis=1, keepdims=True)
+    aciertos = 0
+    for consulta in consultas:
+        exactos = set(np.argsort(-(normalizados @ (consulta / np.linalg.norm(consulta))))[:k].tolist())
+        encontrados = {elemento_id for elemento_id, _ in indice.buscar(consulta.tolist(), limite=k, umbral=-1)}
+        aciertos += len(exactos & encontrados)
+    return aciertos / (k * len(consultas))
+
+
+def test_sin_cuantizar_es_exacto(corpus):
+    assert recall(corpus, crear_indice(corpus, 'ninguna')) == 1.0
+
+
+def test_recall_int8_con_revision(corpus):
+    indice = crear_indice(corpus, 'int8')
+    
+    assert recall(corpus, indice) >= 0.98
+    assert indice.memoria_bytes() < ELEMENTOS * DIMENSION * 4 / 3
+
+
+def test_recall_binaria_con_revision(corpus):
+    sin_revision = recall(corpus, crear_indice(corpus, 'binaria', factor_revision=10, revisar=False))
+    con_revision = recall(corpus, crear_indice(corpus, 'binaria', factor_revision=10))
+    
+    assert con_revision >= 0.95
+    assert con_revision > sin_revision
+
+
+def test_revision_devuelve_la_similitud_exacta(corpus):
+    vectores, consultas = corpus
+    indice = crear_indice(corpus, 'int8')
+    
+    elemento_id, similitud = indice.buscar(consultas[0].tolist(), limite=1, umbral=-1)[0]
+    esperada = vectores[elemento_id] @ consultas[0] / (np.linalg.norm(vectores[elemento_id]) * np.linalg.norm(consultas[0]))
+    assert similitud == pytest.approx(float(esperada), abs=1e-5)
+
+
+@pytest.mark.parametrize('cuantizacion', ['ninguna', 'int8', 'binaria'])
+def test_filtra_por_grupo_y_grupos(corpus, cuantizacion):
+    _, consultas = corpus
+    indice = crear_indice(corpus, cuantizacion)
+    
+    por_grupo = indice.buscar(consultas[0].tolist(), limite=20, umbral=-1, grupo=3)
+    por_grupos = indice.buscar(consultas[0].tolist(), limite=20, umbral=-1, grupos=[2, 5])
+    
+    assert len(por_grupo) == 20 and all(elemento_id % GRUPOS == 3 for elemento_id, _ in por_grupo)
+    assert len(por_grupos) == 20 and all(elemento_id % GRUPOS in (2, 5) for elemento_id, _ in por_grupos)
+    assert indice.buscar(consultas[0].tolist(), grupo=GRUPOS + 1) == []
+
+
+def test_calibracion_binaria_es_la_media(corpus):
+    vectores, _ = corpus
+    indice = crear_indice(corpus, 'binaria')
+    
+    normalizados = vectores / np.linalg.norm(vectores, axis=1, keepdims=True)
+    np.testing.assert_allclose(indice._version.calibracion, normalizados[:IndiceVectorial.FILAS_POR_BLOQUE].mean(axis=0), atol=1e-6)
+
+
+def test_calibracion_provisional_hasta_filas_calibracion(corpus):
+    vectores, _ = corpus
+    indice = IndiceVectorial('int8')
+    indice.cargar([], [], [])
+    
+    mitad = IndiceVectorial.FILAS_CALIBRACION // 2
+    indice.agregar(list(range(mitad)), [0] * mitad, vectores[:mitad])
+    assert indice._version.vectores is not None
+    
+    indice.agregar(list(range(mitad, 2 * mitad)), [1] * mitad, vectores[mitad:2 * mitad])
+    assert indice._version.vectores is None
+    
+    # La escala definitiva es la de todas las filas, no la del primer documento
+    normalizados = vectores[:2 * mitad] / np.linalg.norm(vectores[:2 * mitad], axis=1, keepdims=True)
+    np.testing.assert_allclose(indice._version.calibracion, np.abs(normalizados).max(axis=0) / 127, rtol=1e-5)
+
+
+def test_eliminar_grupo_con_calibracion_provisional(corpus):
+    vectores, _ = corpus
+    indice = IndiceVectorial('int8')
+    indice.cargar(list(range(30)), [0] * 10 + [1] * 20, vectores[:30])
+    
+    indice.eliminar_grupo(0)
+    assert len(indice) == 20
+    assert indice._version.vectores.shape[0] == 20
+    
+    # La siguiente escritura recalibra solo con las filas que quedan
+    indice.agregar([100], [2], vectores[100:101])
+    restantes = np.vstack([vectores[10:30], vectores[100:101]])
+    restantes = restantes / np.linalg.norm(restantes, axis=1, keepdims=True)
+    np.testing.assert_allclose(indice._version.calibracion, np.abs(restantes).max(axis=0) / 127, rtol=1e-5)
+    assert {elemento_id for elemento_id, _ in indice.buscar(vectores[0].tolist(), limite=50, umbral=-1)} == set(range(10, 30)) | {100}
+
+
+def test_int8_amplia_la_escala_si_se_satura(corpus):
+    vectores, _ = corpus
+    indice = IndiceVectorial('int8')
+    base = vectores[:2000].copy()
+    base[:, 0] *= 0.01
+    indice.cargar(list(range(2000)), [0] * 2000, base)
+    escala = indice._version.calibracion.copy()
+    
+    # Documentos nuevos con valores mucho mayores en la primera dimensión
+    nuevos = vectores[2000:2100].copy()
+    nuevos[:, 0] = np.abs(nuevos[:, 0]) * 50
+    indice.agregar(list(range(2000, 2100)), [1] * 100, nuevos)
+    
+    ampliada = indice._version.calibracion
+    assert ampliada[0] > escala[0] * 10
+    np.testing.assert_array_equal(ampliada[1:] >= escala[1:], True)
+    
+    # Sin leer los vectores float, la similitud aproximada no se queda saturada
+    for elemento_id in (0, 2050):
+        consulta = base[0] if elemento_id == 0 else nuevos[50]
+        encontrado, similitud = indice.buscar(consulta.tolist(), limite=1, umbral=-1)[0]
+        assert encontrado == elemento_id
+        assert similitud == pytest.approx(1.0, abs=0.05)
+
+
+def test_agregar_durante_la_carga_se_aplica_al_terminar(corpus):
+    vectores, _ = corpus
+    indice = IndiceVectorial('int8')
+    
+    def filas():
+        for elemento_id in range(2000):
+            if elemento_id == 1000:
+                indice.agregar([9999], [7], vectores[:1])
+                indice.eliminar_grupo(0)
+            yield elemento_id, elemento_id % GRUPOS, vectores[elemento_id]
+    
+    hilos = [threading.Thread(target=indice.asegurar_cargado, args=(filas,)) for _ in range(3)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    
+    assert indice.cargado
+    assert len(indice) == 2000 - 200 + 1
+    assert indice.buscar(vectores[0].tolist(), limite=1, umbral=-1, grupo=7)[0][0] == 9999
+    assert indice.buscar(vectores[0].tolist(), grupo=0) == []
+
+
+def test_carga_fallida_conserva_el_indice(corpus):
+    vectores, _ = corpus
+    indice = IndiceVectorial('int8')
+    indice.cargar([1, 2], [1, 1], vectores[:2])
+    
+    def filas():
+        yield 3, 1, vectores[3]
+        raise RuntimeError("conexión perdida")
+    
+    with pytest.raises(RuntimeError):
+        indice.cargar_filas(filas())
+    
+    assert len(indice) == 2 and indice.cargado
+    indice.agregar([4], [1], vectores[4:5])
+    assert len(indice) == 3
+
+
+def test_escritura_pendiente_fallida_deja_el_indice_sin_cargar(corpus):
+    vectores, _ = corpus
+    indice = IndiceVectorial('int8')
+    
+    def filas():
+        indice.agregar([100], [1], [[1.0, 0.0, 0.0]])
+        yield 1, 1, vectores[1]
+    
+    with pytest.raises(ProcessingError):
+        indice.cargar_filas(filas())
+    
+    assert not indice.cargado
+    indice.asegurar_cargado(lambda: iter([(1, 1, vectores[1])]))
+    indice.agregar([2], [1], vectores[2:3])
+    assert indice.cargado and len(indice) == 2
@@ -13,16 +13,38 @@ export const useApi = () => {
     return response
   }
 
+  const getJob = async (jobId) => {
+    const response = await $fetch(`${config.public.apiBase}/api/documentos/jobs/${jobId}`)
+    return response
+  }
+
+  // El procesamiento se ejecuta en segundo plano: esperar a que el trabajo termine
+  const waitForJob = async (jobId, intervalMs = 1000) => {
+    while (true) {
+      const job = await getJob(jobId)
+      if (job.estado === 'completado') {
+        return job
+      }
+      if (job.estado === 'fallido') {
+        throw { data: { message: job.error || 'Error al procesar documento' } }
+      }
+      await new Promise(resolve => setTimeout(resolve, intervalMs))
+    }
+  }
+
   const processDocument = async (documentId) => {
-    const response = await $fetch(`${config.public.apiBase}/api/documentos/${documentId}/procesar`, {
+    const job = await $fetch(`${config.public.apiBase}/api/documentos/${documentId}/procesar`, {
       method: 'POST'
     })
     
-    return response
+    return await waitForJob(job.trabajo_id)
   }
 
-  const getDocuments = async () => {
-    const response = await $fetch(`${config.public.apiBase}/api/documentos/`)
+  // Listado paginado: pasar como antesDe el valor `siguiente` de la página anterior
+  const getDocuments = async ({ limite, antesDe, procesado, nombre } = {}) => {
+    const response = await $fetch(`${config.public.apiBase}/api/documentos/`, {
+      query: { limite, antes_de: antesDe, procesado, nombre }
+    })
     return response
   }
 
@@ -39,14 +61,19 @@ export const useApi = () => {
     }
   }
 
-  const getMessagesByDocument = async (documentId) => {
-    const response = await $fetch(`${config.public.apiBase}/api/chat/historial/${documentId}`)
+  // Página del historial: sin antesDe los mensajes más recientes, con antesDe los anteriores a ese mensaje
+  const getMessagesByDocument = async (documentId, { limite, antesDe } = {}) => {
+    const response = await $fetch(`${config.public.apiBase}/api/chat/historial/${documentId}`, {
+      query: { limite, antes_de: antesDe }
+    })
     return response
   }
 
   return {
     uploadDocument,
     processDocument,
+    getJob,
+    waitForJob,
     getDocuments,
     deleteDocument,
     getMessagesByDocument